@@ -0,0 +1,396 @@
+# A stand-in for the parts of bpy the material build path uses, to run it without Blender.
+#
+# It mimics bpy.data.materials, images and node_groups, node trees with their nodes, sockets
+# and links, closely enough for utils/materials.py and utils/node_groups.py to build complete
+# materials. Every operation is counted and timed, see `calls` and `seconds`, so that the
+# benchmarks can check what building a material costs. Lookups that scan a collection also
+# count the items they went through, which is what gives a quadratic build away.
+#
+# It is installed in place of bpy before the add-on modules are imported:
+#   sys.modules['bpy'] = bpy_stand_in
+
+import time
+import types
+from functools import wraps
+from collections import Counter
+
+calls = Counter()
+seconds = Counter()
+
+
+def recorded(name):
+    # Counts and times every call of a method under the given name
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds[name] += time.perf_counter() - start
+        return wrapper
+    return decorate
+
+
+def reset_counters():
+    calls.clear()
+    seconds.clear()
+
+
+# Sockets of the stand-in nodes. The real nodes have many more sockets than the generator uses,
+# the padding makes the lookups by name cost what they cost in Blender.
+SOCKET_PADDING = 30
+NODE_TYPES = {
+    'OctaneUniversalMaterial': (['Transmission', 'Albedo', 'Metallic', 'Specular', 'Roughness', 'Opacity', 'Bump', 'Normal', 'Displacement', 'Emission'], ['Material out'], SOCKET_PADDING),
+    'ShaderNodeOutputMaterial': (['Surface', 'Volume', 'Displacement'], [], 0),
+    'ShaderNodeBsdfPrincipled': (['Base Color', 'Roughness', 'Normal'], ['BSDF'], SOCKET_PADDING),
+    'OctaneRGBImage': (['UV transform', 'Legacy gamma'], ['Texture out'], SOCKET_PADDING // 2),
+    'OctaneTextureEmission': (['Texture'], ['Emission out'], SOCKET_PADDING // 3),
+    'OctaneTextureDisplacement': (['Texture', 'Mid level', 'Height'], ['Displacement out'], SOCKET_PADDING // 3),
+    'OctaneVertexDisplacement': (['Texture', 'Mid level', 'Height'], ['Displacement out'], SOCKET_PADDING // 3),
+    'Octane3DTransformation': ([], ['Transform out'], SOCKET_PADDING // 3),
+    'OctaneMultiplyTexture': (['Texture 1', 'Texture 2'], ['Texture out'], 0),
+    'ShaderNodeGroup': ([], [], 0),
+    'NodeGroupInput': ([], [], 0),
+    'NodeGroupOutput': ([], [], 0),
+}
+
+
+class Collection:
+    # A collection of named items, looked up by name by scanning it like a Blender collection
+    label = 'collection'
+
+    def __init__(self):
+        self.items = []
+
+    def __len__(self):
+        # Blender counts the items of an ID collection by walking its list
+        calls[self.label + '.items_scanned'] += len(self.items)
+        return len(self.items)
+
+    def __iter__(self):
+        calls[self.label + '.iterate'] += 1
+        calls[self.label + '.items_scanned'] += len(self.items)
+        return iter(list(self.items))
+
+    def find(self, name):
+        for index, item in enumerate(self.items):
+            if item.name == name:
+                calls[self.label + '.items_scanned'] += index + 1
+                return item
+        calls[self.label + '.items_scanned'] += len(self.items)
+        return None
+
+    def get(self, name, default=None):
+        calls[self.label + '.get'] += 1
+        item = self.find(name)
+        return default if item is None else item
+
+    def __contains__(self, item):
+        calls[self.label + '.contains'] += 1
+        if isinstance(item, str):
+            return self.find(item) is not None
+        return item in self.items
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            calls[self.label + '.get'] += 1
+            item = self.find(key)
+            if item is None:
+                raise KeyError(key)
+            return item
+        calls[self.label + '.index'] += 1
+        return self.items[key]
+
+    def taken_names(self):
+        return {item.name for item in self.items}
+
+    def unique_name(self, name):
+        # Blender appends .001, .002... to a name already taken
+        names = self.taken_names()
+        unique_name = name
+        index = 1
+        while unique_name in names:
+            unique_name = f"{name}.{index:03d}"
+            index += 1
+        return unique_name
+
+
+class IDCollection(Collection):
+    # The datablocks of a file, whose names Blender keeps in a hash map to make new names unique.
+    # Renaming a datablock isn't tracked, the build path doesn't.
+    def __init__(self):
+        super().__init__()
+        self.names = set()
+
+    def taken_names(self):
+        return self.names
+
+    def add(self, item):
+        self.items.append(item)
+        self.names.add(item.name)
+        return item
+
+    def discard(self, item):
+        self.items.remove(item)
+        self.names.discard(item.name)
+
+
+class ID:
+    # A datablock with custom properties
+    def __init__(self, name):
+        self.name = name
+        self.properties = {}
+        self.use_fake_user = False
+        self.asset_data = None
+
+    def __getitem__(self, key):
+        return self.properties[key]
+
+    def __setitem__(self, key, value):
+        self.properties[key] = value
+
+    def __delitem__(self, key):
+        del self.properties[key]
+
+    def __contains__(self, key):
+        return key in self.properties
+
+    def get(self, key, default=None):
+        return self.properties.get(key, default)
+
+    def asset_mark(self):
+        self.asset_data = types.SimpleNamespace(catalog_id='', tags=types.SimpleNamespace(new=lambda *args, **kwargs: None))
+
+
+class Socket:
+    def __init__(self, node, name, is_output, bl_idname='NodeSocketFloat'):
+        self.node = node
+        self.name = name
+        self.is_output = is_output
+        self.bl_idname = bl_idname
+        self.default_value = 0.0
+        self.links = []
+
+    @property
+    def is_linked(self):
+        return bool(self.links)
+
+
+class Sockets(Collection):
+    label = 'sockets'
+
+    def __init__(self, node, names, is_output):
+        super().__init__()
+        self.items = [Socket(node, name, is_output) for name in names]
+
+
+class Node:
+    def __init__(self, tree, bl_idname):
+        input_names, output_names, padding = NODE_TYPES[bl_idname]
+        self.tree = tree
+        self.bl_idname = bl_idname
+        self._name = bl_idname
+        self.label = ''
+        self.location = (0, 0)
+        self.hide = False
+        self.mute = False
+        self.image = None
+        self._node_tree = None
+        # Padding sockets come first, the sockets the generator uses aren't the first ones found
+        self.inputs = Sockets(self, [f"Input {index}" for index in range(padding)] + input_names, False)
+        self.outputs = Sockets(self, output_names, True)
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        # Node names are unique within a tree
+        self._name = self.tree.nodes.unique_name(value) if value != self._name else value
+
+    @property
+    def node_tree(self):
+        return self._node_tree
+
+    @node_tree.setter
+    def node_tree(self, group):
+        # A group node gets the sockets of the interface of its group
+        self._node_tree = group
+        self.inputs.items = [Socket(self, name, False, socket_type) for name, in_out, socket_type in group.interface.items if in_out == 'INPUT']
+        self.outputs.items = [Socket(self, name, True, socket_type) for name, in_out, socket_type in group.interface.items if in_out == 'OUTPUT']
+
+
+class Nodes(Collection):
+    label = 'nodes'
+
+    def __init__(self, tree):
+        super().__init__()
+        self.tree = tree
+
+    @recorded('nodes.new')
+    def new(self, bl_idname):
+        if bl_idname not in NODE_TYPES:
+            raise RuntimeError(f"Node type {bl_idname} undefined")
+        node = Node(self.tree, bl_idname)
+        node._name = self.unique_name(bl_idname)
+        self.items.append(node)
+        return node
+
+    @recorded('nodes.remove')
+    def remove(self, node):
+        for link in [link for link in self.tree.links.items if link.from_node is node or link.to_node is node]:
+            self.tree.links.remove(link)
+        self.items.remove(node)
+
+    @recorded('nodes.clear')
+    def clear(self):
+        self.tree.links.items.clear()
+        self.items.clear()
+
+    def update(self):
+        pass
+
+
+class Link:
+    def __init__(self, to_socket, from_socket):
+        self.to_socket = to_socket
+        self.from_socket = from_socket
+        self.to_node = to_socket.node
+        self.from_node = from_socket.node
+
+
+class Links(Collection):
+    label = 'links'
+
+    @recorded('links.new')
+    def new(self, input_socket, output_socket):
+        if input_socket.is_output:
+            input_socket, output_socket = output_socket, input_socket
+        # An input takes a single link, linking it again replaces its link
+        for link in list(input_socket.links):
+            self.unlink(link)
+        link = Link(input_socket, output_socket)
+        input_socket.links.append(link)
+        output_socket.links.append(link)
+        self.items.append(link)
+        return link
+
+    @recorded('links.remove')
+    def remove(self, link):
+        self.unlink(link)
+
+    def unlink(self, link):
+        link.to_socket.links.remove(link)
+        link.from_socket.links.remove(link)
+        self.items.remove(link)
+
+    def update(self):
+        pass
+
+
+class Interface:
+    def __init__(self, tree):
+        self.tree = tree
+        self.items = []
+
+    @recorded('interface.new_socket')
+    def new_socket(self, name, in_out='INPUT', socket_type='NodeSocketFloat'):
+        self.items.append((name, in_out, socket_type))
+        # The group input and output nodes of the tree get the new socket
+        for node in self.tree.nodes.items:
+            if node.bl_idname == 'NodeGroupInput' and in_out == 'INPUT':
+                node.outputs.items.append(Socket(node, name, True, socket_type))
+            elif node.bl_idname == 'NodeGroupOutput' and in_out == 'OUTPUT':
+                node.inputs.items.append(Socket(node, name, False, socket_type))
+
+
+class NodeTree(ID):
+    def __init__(self, name='Shader Nodetree'):
+        super().__init__(name)
+        self.nodes = Nodes(self)
+        self.links = Links()
+        self.interface = Interface(self)
+
+
+class Material(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.node_tree = None
+        self._use_nodes = False
+
+    @property
+    def use_nodes(self):
+        return self._use_nodes
+
+    @use_nodes.setter
+    def use_nodes(self, value):
+        # Like Blender, a material gets a default node tree the first time it uses nodes
+        self._use_nodes = value
+        if value and self.node_tree is None:
+            self.node_tree = NodeTree()
+            bsdf = self.node_tree.nodes.new('ShaderNodeBsdfPrincipled')
+            output = self.node_tree.nodes.new('ShaderNodeOutputMaterial')
+            self.node_tree.links.new(output.inputs['Surface'], bsdf.outputs['BSDF'])
+
+
+class Image(ID):
+    def __init__(self, name, filepath):
+        super().__init__(name)
+        self.filepath = filepath
+        self.size = (0, 0)
+
+
+class Materials(IDCollection):
+    label = 'materials'
+
+    @recorded('materials.new')
+    def new(self, name):
+        return self.add(Material(self.unique_name(name)))
+
+    @recorded('materials.remove')
+    def remove(self, mat):
+        self.discard(mat)
+
+
+class Images(IDCollection):
+    label = 'images'
+
+    @recorded('images.load')
+    def load(self, filepath, check_existing=False):
+        if check_existing:
+            for image in self.items:
+                if image.filepath == filepath:
+                    return image
+        image = Image(self.unique_name(filepath.replace('\\', '/').split('/')[-1]), filepath)
+        self.add(image)
+        return image
+
+    @recorded('images.remove')
+    def remove(self, image):
+        self.discard(image)
+
+
+class NodeGroups(IDCollection):
+    label = 'node_groups'
+
+    @recorded('node_groups.new')
+    def new(self, name, tree_type):
+        return self.add(NodeTree(self.unique_name(name)))
+
+
+data = types.SimpleNamespace(filepath='', materials=Materials(), images=Images(), node_groups=NodeGroups())
+context = types.SimpleNamespace(scene=types.SimpleNamespace())
+path = types.SimpleNamespace(abspath=lambda filepath: filepath)
+
+
+def reset_data():
+    """
+    Empties the stand-in file, and its counters.
+    """
+    data.materials = Materials()
+    data.images = Images()
+    data.node_groups = NodeGroups()
+    reset_counters()
@@ -0,0 +1,145 @@
+# Measures what building a material costs, and fails when it costs more than its budget.
+#
+# Runs with plain Python, without Blender, from anywhere:
+#   python benchmarks/material_build.py [materials]
+#
+# The material build path (utils/materials.py, utils/node_groups.py) runs against a recording
+# stand-in of bpy, see bpy_stand_in.py, on synthetic libraries of the given size (2000 materials
+# by default) and of a tenth of it. For every counted operation, the calls per material must
+# stay within its budget, and must not grow with the size of the library: a lookup scanning
+# every material or image of the file shows up as a cost per material that grows. The time per
+# material is reported, and the run fails when it grows too much with the library size.
+#
+# Exits with code 1 when a budget is exceeded.
+
+import sys
+import time
+import importlib
+from pathlib import Path
+
+import bpy_stand_in
+
+sys.modules['bpy'] = bpy_stand_in
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+materials = importlib.import_module("utils.materials")
+sockets = importlib.import_module("utils.sockets")
+
+SETTINGS = {
+    'texture_setup': 'Both',
+    'displacement_type': 'TextureDisplacement',
+    'displacement_midlevel': 0.5,
+    'displacement_height': 0.1,
+    'gamma': 2.2,
+}
+
+# Texture types of the synthetic materials, used in turn. Albedo twice is a material with an alternative color map.
+TEXTURE_MIXES = [
+    ('Albedo', 'Roughness', 'Normal'),
+    ('Albedo', 'Ambient Occlusion', 'Roughness', 'Normal', 'Displacement'),
+    ('Albedo', 'Metallic', 'Roughness', 'Bump', 'Normal', 'Displacement'),
+    ('Albedo', 'Opacity', 'Roughness', 'Normal', 'Emission'),
+    ('Albedo', 'Albedo', 'Specular', 'Roughness', 'Normal'),
+]
+
+# Every few materials share a texture with the others, it is loaded once
+SHARED_TEXTURE_EVERY = 10
+
+# Calls per material allowed, on average over the synthetic library
+BUDGETS = {
+    'nodes.new': 11,
+    'links.new': 14.5,
+    'links.remove': 0,
+    'images.load': 5,
+    'nodes.clear': 1,
+    'materials.new': 1,
+    'materials.contains': 0,
+    'materials.items_scanned': 0,
+    'images.items_scanned': 0,
+    'sockets.get': 10,
+    'sockets.items_scanned': 15,
+    'sockets.index': 33,
+}
+
+# Growth of the calls per material from the small to the large library that is tolerated
+CALLS_GROWTH_TOLERANCE = 1.05
+
+# Growth of the time per material from the small to the large library that is tolerated, timings are noisy
+TIME_GROWTH_TOLERANCE = 3.0
+
+
+def make_library(count):
+    """
+    Returns the (name, sockets) of the materials of a synthetic library, like build_material_plans would.
+    """
+    library = []
+    for index in range(count):
+        folder = f"/library/Vendor{index % 7}/Material{index}"
+        plan_sockets = []
+        for texture_type in dict.fromkeys(TEXTURE_MIXES[index % len(TEXTURE_MIXES)]):
+            paths = [f"{folder}/Material{index}_{texture_type}.jpg"]
+            if texture_type == 'Albedo' and TEXTURE_MIXES[index % len(TEXTURE_MIXES)].count('Albedo') > 1:
+                paths.append(f"{folder}/Material{index}_{texture_type}_Alt.jpg")
+            if texture_type == 'Roughness' and index % SHARED_TEXTURE_EVERY == 0:
+                paths = ["/library/Shared/Roughness.jpg"]
+            plan_sockets.append({'type': texture_type, 'paths': paths})
+        library.append((f"Material {index}", plan_sockets))
+    return library
+
+
+def build_library(count, node_groups):
+    """
+    Builds a synthetic library in an empty stand-in file.
+
+    Returns:
+    - tuple: The calls per material of every counted operation, and the seconds per material.
+    """
+    library = make_library(count)
+    settings = dict(SETTINGS, node_groups=node_groups)
+    bpy_stand_in.reset_data()
+    materials.invalidate_image_index()
+    # Resolved once per session, before the build
+    sockets.get_socket_schema.cache_clear()
+    sockets.get_socket_schema()
+    bpy_stand_in.reset_counters()
+
+    start = time.perf_counter()
+    for name, plan_sockets in library:
+        materials.create_material_nodes(name, plan_sockets, settings)
+    elapsed = time.perf_counter() - start
+    return {operation: value / count for operation, value in bpy_stand_in.calls.items()}, elapsed / count
+
+
+def main():
+    argv = sys.argv[1:]
+    large = int(argv[0]) if argv else 2000
+    small = max(large // 10, len(TEXTURE_MIXES) * SHARED_TEXTURE_EVERY)
+
+    failures = []
+    for node_groups in (False, True):
+        mode = "node groups" if node_groups else "nodes"
+        small_calls, small_seconds = build_library(small, node_groups)
+        large_calls, large_seconds = build_library(large, node_groups)
+
+        print(f"Building {large} materials with {mode}: {large_seconds * 1e6:.0f} us per material ({small_seconds * 1e6:.0f} us for {small})")
+        for operation in sorted(set(small_calls) | set(large_calls) | set(BUDGETS)):
+            per_material = large_calls.get(operation, 0)
+            budget = BUDGETS.get(operation)
+            print(f"  {operation:<28}{per_material:>8.2f}" + (f"  (budget {budget})" if budget is not None else ""))
+            if budget is not None and per_material > budget:
+                failures.append(f"{mode}: {operation} takes {per_material:.2f} calls per material, the budget is {budget}")
+            if per_material > small_calls.get(operation, 0) * CALLS_GROWTH_TOLERANCE + 1e-9:
+                failures.append(f"{mode}: {operation} grows from {small_calls.get(operation, 0):.2f} to {per_material:.2f} calls per material with the library size")
+
+        if large_seconds > small_seconds * TIME_GROWTH_TOLERANCE:
+            failures.append(f"{mode}: the time per material grows from {small_seconds * 1e6:.0f} to {large_seconds * 1e6:.0f} us with the library size")
+
+    if failures:
+        print("Over budget:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("Within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Measures how long enabling the add-on takes, the part paid on every Blender start.
+#
+# Run it with Blender in background mode, from anywhere:
+#   blender -b --factory-startup --python benchmarks/startup.py -- [repeat]
+#
+# Each round imports the add-on package from scratch, registers and unregisters it, and
+# reports the timings. It also fails if enabling the add-on imported the generation modules,
+# which must stay deferred until the operator first runs.
+
+import bpy
+import sys
+import time
+import importlib
+from pathlib import Path
+
+addon_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(addon_dir.parent))
+package_name = addon_dir.name
+
+argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+repeat = int(argv[0]) if argv else 20
+
+import_times = []
+register_times = []
+for _ in range(repeat):
+    # Forget every module of the add-on so that each round is a cold import
+    for name in [name for name in sys.modules if name == package_name or name.startswith(package_name + ".")]:
+        del sys.modules[name]
+
+    start = time.perf_counter()
+    addon = importlib.import_module(package_name)
+    imported = time.perf_counter()
+    addon.register()
+    registered = time.perf_counter()
+
+    loaded_utils = sorted(name for name in sys.modules if name.startswith(package_name + ".utils"))
+    addon.unregister()
+
+    if loaded_utils:
+        print("Enabling the add-on imported generation modules:", ", ".join(loaded_utils))
+        sys.exit(1)
+
+    import_times.append(imported - start)
+    register_times.append(registered - imported)
+
+import_times.sort()
+register_times.sort()
+print(f"rounds: {repeat}")
+print(f"import   median {import_times[repeat // 2] * 1000:.3f} ms, min {import_times[0] * 1000:.3f} ms")
+print(f"register median {register_times[repeat // 2] * 1000:.3f} ms, min {register_times[0] * 1000:.3f} ms")
@@ -0,0 +1,247 @@
+# Runs the generator without the user interface, for build machines.
+#
+# Open the library .blend in background mode and run this script, the settings saved in the
+# file's scene are used and can be overridden from the command line:
+#   blender -b library.blend --python <add-on folder>/headless.py -- [options]
+#
+# Options:
+#   --folder PATH      Library folder, defaults to the one selected in the file. Without it, a single run
+#                      generates the enabled library roots of the file when it has some
+#   --only PATTERN     Regenerate only this sub-path or glob pattern of the library, can be repeated,
+#                      with --watch only the changes of the matching folders are ingested
+#   --validate-textures  Check every texture in background processes before building, even when the file doesn't enable it
+#   --watch            Keep running and ingest material folders as they are added, changed or removed
+#   --interval SEC     Watch mode: seconds between two polls (default 10)
+#   --debounce SEC     Watch mode: seconds a folder must stay unchanged before it is ingested (default 30)
+#   --render-previews  Render the previews left for later by Render Previews Later, saving the .blend every 20 previews
+#   --sample N         Classify and build a stratified sample of N folders and print its statistics, the .blend isn't saved
+#   --seed N           Sample mode: changes which folders are sampled (default 0)
+#   --distribute DIR   Coordinate a build spread over several machines, through a job queue in the shared folder DIR
+#   --worker DIR       Build the jobs of the queue in the shared folder DIR until none is left
+#   --job-size N       Distributed build: material folders per job (default 25)
+#   --stale-timeout SEC  Distributed build: seconds after which the job of a silent worker is given to another (default 600)
+#   --metrics-port PORT  Serve live metrics on http://127.0.0.1:PORT/metrics (Prometheus) and /metrics.json
+#   --status-file PATH   Also write the live metrics to this JSON file, every --status-interval seconds (default 10)
+#
+# The .blend is saved after every run or ingested batch. A single run exits with code 2 when
+# some folders failed, their errors are in the run report.
+#
+# A distributed build is started with --distribute on the machine that owns the library .blend,
+# and --worker on any number of machines opening the same .blend. The coordinator splits the
+# library into jobs, waits for the workers, then appends their materials and saves. Workers
+# never save the .blend, and --folder tells them where the library is when the share is
+# mounted elsewhere. Running the coordinator again on the same queue resumes it.
+#
+# Live metrics (folders discovered, processed and failed, materials per second, current folder
+# and phase, queue depths, memory) are served from a background thread, they are available in
+# every mode and never slow the build down.
+
+import os
+import sys
+import time
+import argparse
+import importlib
+import bpy
+
+# Number of rendered previews between two saves of the .blend
+PREVIEW_SAVE_INTERVAL = 20
+
+def import_addon():
+    # The script isn't run as part of the package, import the add-on it belongs to
+    addon_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(addon_dir))
+    addon = importlib.import_module(os.path.basename(addon_dir))
+    # Register it unless the file's preferences already enabled it
+    if not hasattr(bpy.types.Scene, "catalog_generator"):
+        addon.register()
+    return addon
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(prog="headless.py", description="Generate Octane material catalogs without the user interface.")
+    parser.add_argument("--folder", help="library folder, defaults to the one selected in the file")
+    parser.add_argument("--only", action="append", default=[], metavar="PATTERN", help="regenerate only this sub-path or glob pattern of the library, can be repeated")
+    parser.add_argument("--validate-textures", action="store_true", help="check every texture before building, leaving out the invalid ones")
+    parser.add_argument("--watch", action="store_true", help="keep running and ingest folders as they change")
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between two polls in watch mode")
+    parser.add_argument("--debounce", type=float, default=30.0, help="seconds a folder must stay unchanged before it is ingested")
+    parser.add_argument("--render-previews", action="store_true", help="render the previews left for later, without generating")
+    parser.add_argument("--sample", type=int, metavar="N", help="classify and build a stratified sample of N folders and print its statistics")
+    parser.add_argument("--seed", type=int, default=0, help="changes which folders are sampled")
+    parser.add_argument("--distribute", metavar="DIR", help="coordinate a distributed build through a job queue in this shared folder")
+    parser.add_argument("--worker", metavar="DIR", help="build the jobs of the queue in this shared folder")
+    parser.add_argument("--job-size", type=int, default=25, help="material folders per job of a distributed build")
+    parser.add_argument("--stale-timeout", type=float, default=600.0, help="seconds after which the job of a silent worker is given to another")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT", help="serve live metrics on this local port, 0 for any free port")
+    parser.add_argument("--status-file", metavar="PATH", help="also write the live metrics to this JSON file")
+    parser.add_argument("--status-interval", type=float, default=10.0, help="seconds between two writes of the status file")
+    return parser.parse_args(argv)
+
+def run_coordinator(addon, folder_path, patterns, args):
+    # Splits the library into jobs, waits for the workers to build them, then merges their shards
+    distributed = importlib.import_module(addon.__name__ + ".utils.distributed")
+    jobqueue = importlib.import_module(addon.__name__ + ".utils.jobqueue")
+    metrics = importlib.import_module(addon.__name__ + ".utils.metrics")
+
+    if jobqueue.read_queue(args.distribute) is None:
+        partitions = distributed.get_build_partitions(folder_path, patterns, args.job_size)
+        jobqueue.create_job_queue(args.distribute, folder_path, partitions)
+        print(f"Queued {len(partitions)} jobs in {args.distribute}")
+    else:
+        print(f"Resuming the queue in {args.distribute}")
+
+    # Claims of dead workers are released here too, in case no worker is left to do it
+    while True:
+        jobqueue.release_stale_claims(args.distribute, args.stale_timeout)
+        status = jobqueue.get_queue_status(args.distribute)
+        distributed.record_queue_depths(status)
+        print(f"{status[jobqueue.PENDING]} pending, {status[jobqueue.CLAIMED]} building, {status[jobqueue.DONE] + status[jobqueue.MERGED]} done")
+        if not status[jobqueue.PENDING] and not status[jobqueue.CLAIMED]:
+            break
+        metrics.start_phase('waiting')
+        time.sleep(args.interval)
+
+    merged = distributed.merge_queue_shards(args.distribute, folder_path)
+    metrics.start_phase('save')
+    bpy.ops.wm.save_mainfile()
+    metrics.end_phase()
+    for _, record_path in merged:
+        jobqueue.mark_job_merged(args.distribute, record_path)
+    print(f"Merged {len(merged)} jobs")
+    return [os.path.join(folder_path, failed_folder) for record, _ in merged for failed_folder in record['failed_folders']]
+
+def run_worker(addon, props, args):
+    # Builds jobs until the queue is empty, the opened .blend is only used for its settings
+    distributed = importlib.import_module(addon.__name__ + ".utils.distributed")
+    if bpy.context.scene.render.engine != 'octane':
+        print("This addon requires the Octane render engine.")
+        sys.exit(1)
+    if props.preview_type == 'Render' and (not props.object_mock or props.object_mock.type != 'MESH'):
+        print("Please select a mesh object to mock.")
+        sys.exit(1)
+    # The coordinator indexes the merged materials, workers don't write to the shared index
+    props.use_search_index = False
+    try:
+        built = distributed.run_queue_worker(args.worker, args.folder, args.stale_timeout, args.interval)
+    except FileNotFoundError as e:
+        print(e)
+        sys.exit(1)
+    print(f"Built {built} jobs")
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    args = parse_arguments(argv)
+
+    addon = import_addon()
+
+    # Served from background threads for the whole run, the last status is written on exit
+    metrics = None
+    if args.metrics_port is not None or args.status_file:
+        metrics = importlib.import_module(addon.__name__ + ".utils.metrics")
+        port = metrics.start_metrics_server(args.metrics_port, status_path=args.status_file, status_interval=args.status_interval)
+        if port is not None:
+            print(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+    try:
+        run(addon, args)
+    finally:
+        if metrics:
+            metrics.stop_metrics_server()
+
+def run(addon, args):
+    generator = importlib.import_module(addon.__name__ + ".utils.generator")
+    watch = importlib.import_module(addon.__name__ + ".utils.watch")
+
+    props = bpy.context.scene.catalog_generator
+    if args.validate_textures:
+        props.validate_textures = True
+
+    if args.worker:
+        run_worker(addon, props, args)
+        return
+
+    folder_path = args.folder or bpy.path.abspath(props.selected_folder)
+    # A single run generates the library roots of the file instead of the selected folder, unless a folder is given
+    single_run = not (args.watch or args.distribute or args.sample or args.render_previews)
+    roots = generator.get_library_roots(props) if single_run and not args.folder else []
+
+    if bpy.context.scene.render.engine != 'octane':
+        print("This addon requires the Octane render engine.")
+        sys.exit(1)
+    for library_folder in [root['folder'] for root in roots] or [folder_path]:
+        if not library_folder or not os.path.isdir(library_folder):
+            print(f"Selected folder {library_folder} is not valid.")
+            sys.exit(1)
+    if (props.preview_type == 'Render' or any(root['overrides'].get('preview_type') == 'Render' for root in roots)) and (not props.object_mock or props.object_mock.type != 'MESH'):
+        print("Please select a mesh object to mock.")
+        sys.exit(1)
+
+    if args.render_previews:
+        if not props.object_mock or props.object_mock.type != 'MESH':
+            print("Please select a mesh object to mock.")
+            sys.exit(1)
+        preview_queue = importlib.import_module(addon.__name__ + ".utils.preview_queue")
+        # Saved regularly, an interrupted run only loses the last previews
+        def on_progress(rendered):
+            if rendered % PREVIEW_SAVE_INTERVAL == 0:
+                bpy.ops.wm.save_mainfile()
+        rendered = preview_queue.render_all_queued_previews(on_progress)
+        bpy.ops.wm.save_mainfile()
+        print(f"Rendered {rendered} previews, {len(preview_queue.get_queued_previews())} failed")
+        return
+
+    if args.sample:
+        sampling = importlib.import_module(addon.__name__ + ".utils.sampling")
+        report = sampling.run_sample_build(folder_path, generator.get_texture_naming_conventions(props), generator.get_generation_settings(props), args.sample, args.seed)
+        sampling.print_sample_report(report)
+        sampling.save_sample_report(report)
+        return
+
+    try:
+        # Patterns are parsed for each library root, an absolute path only targets the root it is inside
+        if roots:
+            roots = generator.get_targeted_roots(";".join(args.only), roots)
+        else:
+            patterns = generator.parse_folder_patterns(";".join(args.only), folder_path)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    if not args.watch:
+        if args.distribute:
+            failed_folders = run_coordinator(addon, folder_path, patterns, args)
+        elif roots:
+            report = generator.create_library_roots(roots)
+            bpy.ops.wm.save_mainfile()
+            for summary in report['roots']:
+                print(f"{summary['folder']}: {summary['materials']} materials from {summary['folders']} folders in {summary['seconds']:.1f} s, {len(summary['failed_folders'])} failed")
+            failed_folders = report['failed_folders']
+        else:
+            failed_folders = generator.create_shaders_tree(folder_path, patterns=patterns)['failed_folders']
+            bpy.ops.wm.save_mainfile()
+        # Failed folders are listed in the run report, the exit code lets build scripts notice them
+        if failed_folders:
+            print(f"{len(failed_folders)} folders failed:")
+            for failed_folder in failed_folders:
+                print(f"  {failed_folder}")
+            sys.exit(2)
+        return
+
+    def on_change(added, changed, removed):
+        # The whole library is watched, only the changes of the folders matching the patterns are ingested
+        if patterns:
+            added, changed, removed = [{path for path in paths if generator.match_folder_patterns(os.path.relpath(path, folder_path), patterns)} for paths in (added, changed, removed)]
+            if not (added or changed or removed):
+                return
+        print(f"Ingesting {len(added)} added, {len(changed)} changed and {len(removed)} removed folders")
+        if removed:
+            generator.remove_folders_materials(removed)
+        if added or changed:
+            # Changed folders are patched in place rather than duplicated
+            generator.create_shaders_tree(folder_path, only_folders=added | changed, update_existing=True)
+        bpy.ops.wm.save_mainfile()
+
+    settings = generator.get_generation_settings(props)
+    print(f"Watching {folder_path}")
+    watch.watch_library(folder_path, settings['file_types'], on_change, args.interval, args.debounce)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,9 @@
 import bpy
 import os
-from pathlib import Path
-from bpy.props import IntProperty, BoolProperty, StringProperty, EnumProperty, FloatProperty, PointerProperty
-from .utils.materials import create_materials_according_settings
-from .utils.parsing import format_material_name
-from .utils.catalog import get_or_create_catalog, set_material_preview_with_operator
-from .utils.render import render_and_save
+import sys
+from bpy.props import PointerProperty
+from bpy.app.handlers import persistent
+from .properties import CUSTOM_PG_LibraryRoot, CUSTOM_PG_GenerateCatalogsSettings
 
 class CUSTOM_OT_GenerateShaderCatalog(bpy.types.Operator):
     # Metadata about this operator, including its identifier and label
@@ -19,121 +17,280 @@ class CUSTOM_OT_GenerateShaderCatalog(bpy.types.Operator):
             self.report({'ERROR'}, "This addon requires the Octane render engine.")
             return {'CANCELLED'}
 
-        selected_folder = context.scene.selected_folder
-
-        if not selected_folder:
-            self.report({'ERROR'}, "Please select a folder.")
-            return {'CANCELLED'}
+        props = context.scene.catalog_generator
+        selected_folder = props.selected_folder
+
+        # Deferred import: the generation modules are only loaded once the operator first runs
+        from .utils.generator import create_shaders_tree, create_library_roots, get_library_roots, get_targeted_roots, parse_folder_patterns
+
+        # The enabled library roots of the list are generated instead of the selected folder
+        roots = get_library_roots(props)
+        if roots:
+            for root in roots:
+                if not os.path.isdir(root['folder']):
+                    self.report({'ERROR'}, f"Library root {root['folder']} is not a valid folder.")
+                    return {'CANCELLED'}
+        else:
+            if not selected_folder:
+                self.report({'ERROR'}, "Please select a folder.")
+                return {'CANCELLED'}
 
-        if not os.path.isdir(selected_folder):
-            self.report({'ERROR'}, "Selected folder is not valid.")
-            return {'CANCELLED'}
+            if not os.path.isdir(selected_folder):
+                self.report({'ERROR'}, "Selected folder is not valid.")
+                return {'CANCELLED'}
 
         # Additional checks for the 'Render' preview type, ensuring a valid object is selected for mockups.
-        if bpy.context.scene.preview_type == 'Render':
-            if not bpy.context.scene.object_mock:
+        if props.preview_type == 'Render' or any(root['overrides'].get('preview_type') == 'Render' for root in roots):
+            if not props.object_mock:
                 self.report({'ERROR'}, "Please select an object to mock.")
                 return {'CANCELLED'}
-            if bpy.context.scene.object_mock.type != 'MESH':
+            if props.object_mock.type != 'MESH':
                 self.report({'ERROR'}, "Selected object is not a mesh.")
                 return {'CANCELLED'}
 
-        self.create_shaders_tree(selected_folder)
+        # Patterns are parsed for each library root, an absolute path only targets the root it is inside
+        try:
+            if roots:
+                roots = get_targeted_roots(props.only_folders, roots)
+            else:
+                patterns = parse_folder_patterns(props.only_folders, selected_folder)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        try:
+            if roots:
+                report = create_library_roots(roots)
+            else:
+                report = create_shaders_tree(selected_folder, patterns=patterns)
+        except RuntimeError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        if len(report['roots']) > 1:
+            for summary in report['roots']:
+                print(f"{summary['folder']}: {summary['materials']} materials from {summary['folders']} folders in {summary['seconds']:.1f} s, {len(summary['failed_folders'])} failed")
+        if report['failed_folders']:
+            self.report({'WARNING'}, f"{len(report['failed_folders'])} folders failed, see the errors in the run report.")
+
+        # The library is usable with color map previews, the renders replace them in the background
+        if (props.preview_type == 'Render' or any(root['overrides'].get('preview_type') == 'Render' for root in roots)) and props.deferred_previews:
+            from .utils.preview_queue import start_preview_queue
+            queued = start_preview_queue()
+            if queued:
+                self.report({'INFO'}, f"Rendering {queued} previews in the background, save the file to keep them.")
         return {'FINISHED'}
 
-    def create_assets(self, name, folder_path, texture_naming_conventions, settings, catalog_id ,tags):
-        formatted_name = format_material_name(name)
-        data_array = create_materials_according_settings(formatted_name, texture_naming_conventions, settings, folder_path)
-        mat_array = []
-        for data in data_array:
-            mat = data['material']
-            if not mat:
-                return None
-            mat.use_fake_user = True
-            mat.asset_mark()
-
-            if catalog_id:
-                mat.asset_data.catalog_id = catalog_id
-
-            for tag in tags:
-                mat.asset_data.tags.new(tag, skip_if_exists=True)
-
-            # Sets up the material preview based on the provided settings.
-            preview_image_path = data['albedo']
-            if settings['preview_type'] == 'UseColorMap' and preview_image_path:
-                set_material_preview_with_operator(bpy.context, mat, preview_image_path)
-
-            elif settings['preview_type'] == 'Render':
-                # For render previews, checks if a rerender is necessary and performs it if so.
-                preview_path = os.path.join(folder_path, "preview.png")
-                preview_exist = os.path.exists(preview_path)
-                if not preview_exist or bpy.context.scene.force_rerender:
-                    obj = bpy.context.scene.object_mock
-                    if obj.data.materials:
-                        obj.data.materials[0] = mat
-                    else:
-                        obj.data.materials.append(mat)
-                    render_and_save(folder_path, "preview", bpy.context.scene.resolution_x, bpy.context.scene.resolution_y)
-                set_material_preview_with_operator(bpy.context, mat, preview_path)
-
-
-            mat_array.append(mat)
-
-        return mat_array
-
-    def create_shaders_tree(self, folder_path):
-        use_catalog_tree = bpy.context.scene.use_catalog_tree
-        use_tags = bpy.context.scene.use_tags
-
-        # Extracts naming conventions from scene properties
-        texture_naming_conventions = {
-            "transmission": bpy.context.scene.transmission.split(' '),
-            "albedo": bpy.context.scene.albedo.split(' '),
-            "ambiant_occlusion": bpy.context.scene.ambiant_occlusion.split(' '),
-            "metallic": bpy.context.scene.metallic.split(' '),
-            "specular": bpy.context.scene.specular.split(' '),
-            "roughness": bpy.context.scene.roughness.split(' '),
-            "opacity": bpy.context.scene.opacity.split(' '),
-            "bump": bpy.context.scene.bump.split(' '),
-            "normal": bpy.context.scene.normal.split(' '),
-            "displacement": bpy.context.scene.displacement.split(' '),
-            "emission": bpy.context.scene.emission.split(' ')
-        }
-
-        # Compiles material and rendering settings from scene properties
-        extensions_list = bpy.context.scene.file_type.split(' ')
-        extensions_tuple = tuple(['.' + ext for ext in extensions_list])
-        settings = {
-            "file_types": extensions_tuple,
-            "resolution_priority": bpy.context.scene.resolution_priority,
-            "alt_col_handling": bpy.context.scene.alt_col_handling,
-            "texture_setup": bpy.context.scene.default_texture_setup,
-            "displacement_type": bpy.context.scene.texture_setup_displacement,
-            "displacement_midlevel": bpy.context.scene.displacement_mid_level,
-            "displacement_height": bpy.context.scene.displacement_height,
-            "gamma": bpy.context.scene.texture_setup_default_gamma,
-            "preview_type": bpy.context.scene.preview_type
-        }
-
-        # Formats the folder name and initiates asset creation for the root folder
-        folder_name = format_material_name(os.path.basename(folder_path))
-        if folder_path.endswith('\\') or folder_path.endswith('/'):
-            folder_name = format_material_name(os.path.basename(folder_path[:-1]))
-        self.create_assets(folder_name, folder_path, texture_naming_conventions, settings, None, [])
-
-        # Iterates over subfolders to create assets, applying tags and possibly catalog IDs
-        for root, dirs, _ in os.walk(folder_path, topdown=True):
-            if use_tags:
-                relative_path = Path(root).relative_to(folder_path)
-                tags = [format_material_name(part) for part in relative_path.parts]
-
-            for name in dirs:
-                path = os.path.join(root, name)
-                catalog_id = None
-                # Only modify blender_assets.cats.txt and set catalog_id if use_catalog_tree is True
-                if use_catalog_tree:
-                    catalog_id = get_or_create_catalog(os.path.join(root, name), folder_path)
-                self.create_assets(name, path, texture_naming_conventions, settings, catalog_id, tags)
+class CUSTOM_OT_AddLibraryRoot(bpy.types.Operator):
+    # Adds a library root to the list, starting from the selected folder
+    bl_idname = "custom.add_library_root"
+    bl_label = "Add Library Root"
+    bl_description = "Add a library root generated along with the others in a single run"
+
+    def execute(self, context):
+        props = context.scene.catalog_generator
+        root = props.library_roots.add()
+        root.folder = props.selected_folder
+        props.library_roots_index = len(props.library_roots) - 1
+        return {'FINISHED'}
+
+class CUSTOM_OT_RemoveLibraryRoot(bpy.types.Operator):
+    # Removes the active library root from the list
+    bl_idname = "custom.remove_library_root"
+    bl_label = "Remove Library Root"
+    bl_description = "Remove the active library root"
+
+    @classmethod
+    def poll(cls, context):
+        return len(context.scene.catalog_generator.library_roots) > 0
+
+    def execute(self, context):
+        props = context.scene.catalog_generator
+        props.library_roots.remove(props.library_roots_index)
+        props.library_roots_index = min(props.library_roots_index, len(props.library_roots) - 1)
+        return {'FINISHED'}
+
+class CUSTOM_UL_LibraryRoots(bpy.types.UIList):
+    # Lists the library roots, each with its checkbox and catalog prefix
+    bl_idname = "CUSTOM_UL_library_roots"
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row(align=True)
+        row.prop(item, "enabled", text="")
+        row.label(text=item.folder or "No folder", icon='FILE_FOLDER')
+        if item.catalog_prefix:
+            row.label(text=item.catalog_prefix, icon='ASSET_MANAGER')
+
+class CUSTOM_OT_RenderQueuedPreviews(bpy.types.Operator):
+    # Starts or stops the background rendering of the previews left for later
+    bl_idname = "custom.render_queued_previews"
+    bl_label = "Render Queued Previews"
+
+    def execute(self, context):
+        props = context.scene.catalog_generator
+        from .utils.preview_queue import start_preview_queue, stop_preview_queue, is_preview_queue_running
+
+        if is_preview_queue_running():
+            stop_preview_queue()
+            self.report({'INFO'}, "Preview rendering paused, the remaining previews stay queued.")
+            return {'FINISHED'}
+
+        if context.scene.render.engine != 'octane':
+            self.report({'ERROR'}, "This addon requires the Octane render engine.")
+            return {'CANCELLED'}
+        if not props.object_mock or props.object_mock.type != 'MESH':
+            self.report({'ERROR'}, "Please select a mesh object to mock.")
+            return {'CANCELLED'}
+
+        queued = start_preview_queue()
+        self.report({'INFO'}, f"Rendering {queued} previews in the background." if queued else "No preview left to render.")
+        return {'FINISHED'}
+
+@persistent
+def resume_preview_queue(_):
+    # Previews still queued when the file was saved are rendered again once it is opened
+    props = getattr(bpy.context.scene, "catalog_generator", None)
+    if bpy.app.background or props is None or not props.deferred_previews:
+        return
+    if bpy.context.scene.render.engine != 'octane' or not props.object_mock or props.object_mock.type != 'MESH':
+        return
+    from .utils.preview_queue import start_preview_queue
+    start_preview_queue()
+
+class CUSTOM_OT_PreflightReport(bpy.types.Operator):
+    # Estimates the cost of a build (materials, textures, memory, time) without creating anything
+    bl_idname = "custom.preflight_report"
+    bl_label = "Preflight Report"
+
+    def execute(self, context):
+        props = context.scene.catalog_generator
+        selected_folder = props.selected_folder
+
+        if not selected_folder or not os.path.isdir(selected_folder):
+            self.report({'ERROR'}, "Selected folder is not valid.")
+            return {'CANCELLED'}
+
+        # Deferred import, like the generation modules
+        from .utils.generator import get_texture_naming_conventions, get_generation_settings
+        from .utils.preflight import run_preflight, print_preflight_report, save_preflight_report, format_bytes
+
+        report = run_preflight(selected_folder, get_texture_naming_conventions(props), get_generation_settings(props))
+        print_preflight_report(report)
+        save_preflight_report(report)
+
+        estimate = "unknown time" if report['estimated_seconds'] is None else f"~{report['estimated_seconds'] / 60:.0f} min"
+        self.report({'INFO'}, f"{report['materials']} materials, {report['textures']} textures, {format_bytes(report['decoded_bytes'])} decoded, {estimate} (details in console).")
+        return {'FINISHED'}
+
+class CUSTOM_OT_SampleBuild(bpy.types.Operator):
+    # Classifies and builds a small stratified sample of the library, to tune naming conventions and settings quickly
+    bl_idname = "custom.sample_build"
+    bl_label = "Sample Build"
+
+    def execute(self, context):
+        props = context.scene.catalog_generator
+        selected_folder = props.selected_folder
+
+        if not selected_folder or not os.path.isdir(selected_folder):
+            self.report({'ERROR'}, "Selected folder is not valid.")
+            return {'CANCELLED'}
+
+        from .utils.generator import get_texture_naming_conventions, get_generation_settings
+        from .utils.sampling import run_sample_build, print_sample_report, save_sample_report
+
+        report = run_sample_build(selected_folder, get_texture_naming_conventions(props), get_generation_settings(props), props.sample_size, props.sample_seed)
+        print_sample_report(report)
+        save_sample_report(report)
+
+        self.report({'INFO'}, f"{report['sampled_folders']} folders, {report['unmatched_files']} unmatched files, {len(report['multi_albedo_folders'])} with several albedos, {len(report['errors'])} failed in {report['seconds']:.1f} s (details in console).")
+        return {'FINISHED'}
+
+class CUSTOM_OT_SearchLibraryIndex(bpy.types.Operator):
+    # Queries the SQLite search index written by the generator, no library .blend needs to be loaded
+    bl_idname = "custom.search_library_index"
+    bl_label = "Search Library Index"
+
+    def execute(self, context):
+        props = context.scene.catalog_generator
+
+        # Deferred import, like the generation modules
+        from .utils.search_index import INDEX_FILE_NAME, open_search_index, search_materials
+
+        index_file = bpy.path.abspath(props.index_file) if props.index_file else None
+        if not index_file and bpy.data.filepath:
+            index_file = os.path.join(os.path.dirname(bpy.data.filepath), INDEX_FILE_NAME)
+        if not index_file or not os.path.isfile(index_file):
+            self.report({'ERROR'}, "No search index found.")
+            return {'CANCELLED'}
+
+        conn = open_search_index(index_file)
+        try:
+            results = search_materials(conn, props.index_query)
+        finally:
+            conn.close()
+
+        # The full list goes to the console, the first names to the status bar
+        for result in results:
+            print(f"{result['name']}\t{result['catalog_path'] or ''}\t{result['tags']}\t{result['source_folder']}")
+        names = ", ".join(result['name'] for result in results[:10])
+        more = f" (+{len(results) - 10} more, see console)" if len(results) > 10 else ""
+        self.report({'INFO'}, f"{len(results)} materials found: {names}{more}")
+        return {'FINISHED'}
+
+class CUSTOM_OT_GenerateTextureProxies(bpy.types.Operator):
+    # Builds the missing proxy tiers of the textures used by generated materials
+    bl_idname = "custom.generate_texture_proxies"
+    bl_label = "Build Texture Proxies"
+
+    def execute(self, context):
+        props = context.scene.catalog_generator
+
+        # Deferred import, like the generation modules
+        from .utils.proxy import parse_proxy_tiers, get_proxy_folder, get_generated_materials, get_material_images, get_full_resolution_path, generate_proxies
+
+        tiers = parse_proxy_tiers(props.proxy_tiers)
+        if not tiers:
+            self.report({'ERROR'}, "Please set at least one proxy tier.")
+            return {'CANCELLED'}
+        try:
+            proxy_folder = get_proxy_folder(props.proxy_folder)
+        except FileNotFoundError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        materials = get_generated_materials(context, props.proxy_scope)
+        texture_paths = [get_full_resolution_path(image) for image in get_material_images(materials)]
+        built, failed = generate_proxies(texture_paths, tiers, proxy_folder, props.proxy_workers)
+        if failed:
+            self.report({'WARNING'}, f"Proxies built for {built} textures, {failed} batches failed (see console).")
+        else:
+            self.report({'INFO'}, f"Proxies built for {built} textures.")
+        return {'FINISHED'}
+
+class CUSTOM_OT_SwitchTextureResolution(bpy.types.Operator):
+    # Repoints the images of generated materials to a proxy tier or back to full resolution
+    bl_idname = "custom.switch_texture_resolution"
+    bl_label = "Switch Texture Resolution"
+
+    def execute(self, context):
+        props = context.scene.catalog_generator
+
+        # Deferred import, like the generation modules
+        from .utils.proxy import get_proxy_folder, get_generated_materials, switch_texture_resolution
+
+        try:
+            proxy_folder = get_proxy_folder(props.proxy_folder)
+        except FileNotFoundError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        longest_edge = None if props.proxy_resolution == 'Full' else int(props.proxy_resolution)
+        materials = get_generated_materials(context, props.proxy_scope)
+        switched, missing = switch_texture_resolution(materials, longest_edge, proxy_folder)
+        if missing:
+            self.report({'WARNING'}, f"{switched} textures switched, {missing} without a proxy at this resolution.")
+        else:
+            self.report({'INFO'}, f"{switched} textures switched.")
+        return {'FINISHED'}
 
 class CUSTOM_PT_GenerateCatalogsPanel(bpy.types.Panel):
     bl_label = "Octane Catalog Generator"
@@ -148,20 +305,77 @@ class CUSTOM_PT_GenerateCatalogsPanel(bpy.types.Panel):
 
     def draw(self, context):
         layout = self.layout
-        scene = context.scene
+        scene = context.scene.catalog_generator
 
         # Draw the folder selection UI
         row = layout.row()
         row.prop(scene, "selected_folder", text="Selected Folder")
 
+        # Draw the library roots, generated in a single run instead of the selected folder when enabled
+        layout.label(text="Library Roots:")
+        row = layout.row()
+        row.template_list(CUSTOM_UL_LibraryRoots.bl_idname, "", scene, "library_roots", scene, "library_roots_index", rows=2)
+        column = row.column(align=True)
+        column.operator(CUSTOM_OT_AddLibraryRoot.bl_idname, text="", icon='ADD')
+        column.operator(CUSTOM_OT_RemoveLibraryRoot.bl_idname, text="", icon='REMOVE')
+        if 0 <= scene.library_roots_index < len(scene.library_roots):
+            root = scene.library_roots[scene.library_roots_index]
+            box = layout.box()
+            box.prop(root, "folder", text="Folder")
+            box.prop(root, "catalog_prefix", text="Catalog Prefix")
+            box.prop(root, "resolution_priority", text="Priority")
+            box.prop(root, "alt_col_handling", text="On multiple color maps")
+            box.prop(root, "preview_type", text="Preview Type")
+
+        # Draw the sub-paths to regenerate, the whole library when empty
+        row = layout.row()
+        row.prop(scene, "only_folders", text="Only Folders")
+
         # Draw the checkbox for using the catalog tree
         row = layout.row()
         row.prop(scene, "use_catalog_tree", text="Create Catalog Tree")
+        if scene.use_catalog_tree:
+            box = layout.box()
+            box.prop(scene, "deterministic_catalog_ids", text="Deterministic Catalog IDs")
+            if scene.deterministic_catalog_ids:
+                box.prop(scene, "catalog_namespace", text="Library Namespace")
 
         # Draw the new checkbox for using tags
         row = layout.row()
         row.prop(scene, "use_tags", text="Create Tags")
 
+        # Draw the checkbox for updating materials generated by a previous run
+        row = layout.row()
+        row.prop(scene, "update_existing", text="Update Existing Materials")
+
+        # Draw the checkbox for retrying the folders that failed
+        row = layout.row()
+        row.prop(scene, "retry_failed_folders", text="Retry Failed Folders")
+
+        # Draw the checkbox for validating textures before building
+        row = layout.row()
+        row.prop(scene, "validate_textures", text="Validate Textures")
+        if scene.validate_textures:
+            box = layout.box()
+            box.prop(scene, "validation_workers", text="Workers")
+
+        # Draw the settings of the built material cache
+        row = layout.row()
+        row.prop(scene, "use_material_cache", text="Use Material Cache")
+        if scene.use_material_cache:
+            box = layout.box()
+            box.prop(scene, "material_cache_folder", text="Folder")
+            box.prop(scene, "material_cache_max_size", text="Max Size (MB)")
+            box.prop(scene, "material_cache_max_age", text="Max Age (Days)")
+
+        # Draw the checkbox for writing the search index
+        row = layout.row()
+        row.prop(scene, "use_search_index", text="Write Search Index")
+
+        # Draw the folder textures are extracted to from zip archives
+        row = layout.row()
+        row.prop(scene, "archive_cache_folder", text="Archive Cache")
+
         layout.separator()
         layout.label(text="Name formating:")
         # Draw the checkbox for formatting name
@@ -182,12 +396,16 @@ class CUSTOM_PT_GenerateCatalogsPanel(bpy.types.Panel):
         box = layout.box()
         box.prop(scene, "file_type", text="File type and priority")
         box.prop(scene, "resolution_priority", text="Priority")
+        if scene.resolution_priority == 'TargetRes':
+            box.prop(scene, "target_resolution", text="Target")
+        box.prop(scene, "flat_folders", text="Split Flat Folders")
         box.prop(scene, "alt_col_handling", text="On multiple color maps")
         box.prop(scene, "default_texture_setup", text="If both available, use")
         box.prop(scene, "texture_setup_displacement", text="Setup Displacement")
         box.prop(scene, "displacement_mid_level", text="Displacement Mid Level")
         box.prop(scene, "displacement_height", text="Displacement Height")
         box.prop(scene, "texture_setup_default_gamma", text="Setup Gamma")
+        box.prop(scene, "use_node_groups", text="Shared Node Groups")
 
         layout.separator()
 
@@ -198,11 +416,28 @@ class CUSTOM_PT_GenerateCatalogsPanel(bpy.types.Panel):
         if scene.preview_type == 'Render':
             box.prop(scene, "object_mock", text="Lock to Object")
             box.prop(scene, "force_rerender", text="Render preview even if it exists")
+            row = box.row()
+            row.prop(scene, "deferred_previews", text="Render Later")
+            row.operator(CUSTOM_OT_RenderQueuedPreviews.bl_idname, text="Render Queued / Pause")
             box.prop(scene, "resolution_x", text="Resolution X")
             box.prop(scene, "resolution_y", text="Resolution Y")
             box.label(text="Warning: Be sure to check alpha render")
         layout.separator()
 
+        # Draw the settings for texture proxies
+        layout.label(text="Texture Proxies:")
+        box = layout.box()
+        box.prop(scene, "build_proxies", text="Build proxies after generating")
+        box.prop(scene, "proxy_folder", text="Proxy Folder")
+        box.prop(scene, "proxy_tiers", text="Tiers")
+        box.prop(scene, "proxy_workers", text="Workers")
+        box.prop(scene, "proxy_scope", text="Materials")
+        box.operator(CUSTOM_OT_GenerateTextureProxies.bl_idname, text="Build Proxies")
+        row = box.row()
+        row.prop(scene, "proxy_resolution", text="")
+        row.operator(CUSTOM_OT_SwitchTextureResolution.bl_idname, text="Switch")
+        layout.separator()
+
         # UI for texture naming conventions
         layout.label(text="Texture Naming Conventions:")
         box = layout.box()
@@ -221,10 +456,26 @@ class CUSTOM_PT_GenerateCatalogsPanel(bpy.types.Panel):
         layout.separator()
         layout.label(text="Warning: Start OctaneServer before")
 
+        # Draw the sample build, a quick check of the settings on a few folders
+        row = layout.row()
+        row.prop(scene, "sample_size", text="Sample Size")
+        row.prop(scene, "sample_seed", text="Seed")
+        row.operator(CUSTOM_OT_SampleBuild.bl_idname, text="Sample Build")
+
         # Draw the button to generate catalogs
         row = layout.row()
+        row.operator(CUSTOM_OT_PreflightReport.bl_idname, text="Preflight Report")
         row.operator(CUSTOM_OT_GenerateShaderCatalog.bl_idname, text="Generate Catalogs")
 
+        layout.separator()
+
+        # Draw the search of the library index
+        layout.label(text="Search Library:")
+        box = layout.box()
+        box.prop(scene, "index_file", text="Index File")
+        box.prop(scene, "index_query", text="")
+        box.operator(CUSTOM_OT_SearchLibraryIndex.bl_idname, text="Search")
+
 
 def menu_func(self, _):
     self.layout.operator(CUSTOM_OT_GenerateShaderCatalog.bl_idname)
@@ -233,231 +484,44 @@ def menu_func(self, _):
 
 def register_ui():
     # Registers the operator and UI components with Blender, making them available to the user.
-    # Also defines custom properties that appear in the Blender UI, allowing users to configure the add-on's behavior.
+    # The settings live in a single property group pointed to by the scene, see properties.py.
+    bpy.utils.register_class(CUSTOM_PG_LibraryRoot)
+    bpy.utils.register_class(CUSTOM_PG_GenerateCatalogsSettings)
     bpy.utils.register_class(CUSTOM_OT_GenerateShaderCatalog)
+    bpy.utils.register_class(CUSTOM_OT_PreflightReport)
+    bpy.utils.register_class(CUSTOM_OT_SampleBuild)
+    bpy.utils.register_class(CUSTOM_OT_RenderQueuedPreviews)
+    bpy.utils.register_class(CUSTOM_OT_AddLibraryRoot)
+    bpy.utils.register_class(CUSTOM_OT_RemoveLibraryRoot)
+    bpy.utils.register_class(CUSTOM_UL_LibraryRoots)
+    bpy.utils.register_class(CUSTOM_OT_SearchLibraryIndex)
+    bpy.utils.register_class(CUSTOM_OT_GenerateTextureProxies)
+    bpy.utils.register_class(CUSTOM_OT_SwitchTextureResolution)
     bpy.utils.register_class(CUSTOM_PT_GenerateCatalogsPanel)
-    bpy.types.Scene.selected_folder = StringProperty(subtype="DIR_PATH")
-    bpy.types.Scene.use_catalog_tree = BoolProperty(
-        name="Create Catalog Tree",
-        description="Create and organize materials into a catalog tree",
-        default=True  # Checked by default
-    )
-    bpy.types.Scene.use_tags = BoolProperty(
-        name="Create Tags",
-        description="Tag materials based on folder structure",
-        default=True  # Checked by default
-    )
-    bpy.types.Scene.format_name = BoolProperty(
-        name="Format Name",
-        description="Format material names based on rules",
-        default=True  # Checked by default
-    )
-    bpy.types.Scene.replace_by_space = StringProperty(
-        name="Replace by Space",
-        description="Characters to replace by spaces",
-        default="_"  # Default characters
-    )
-    bpy.types.Scene.add_space_by_caps = BoolProperty(
-        name="Add Space by Caps",
-        description="Add space before capital letters",
-        default=True  # Checked by default
-    )
-    bpy.types.Scene.add_space_between_word_and_number = BoolProperty(
-        name="Add Space Between Word and Number",
-        description="Add space between words and numbers",
-        default=True  # Checked by default
-    )
-    bpy.types.Scene.file_type = StringProperty(
-        name="File Type and Priority",
-        default="jpg jpeg png exr hdr tiff tif",
-        description="File types to look for and their priority"
-    )
-    bpy.types.Scene.resolution_priority = EnumProperty(
-        name="Resolution Priority",
-        items=(
-            ('FileType', 'File type', 'Take first file type in the list'),
-            ('FileName', 'File name', 'Take first file name in the list'),
-            ("SmallerRes", "Smaller resolution", "Take the smaller resolution"),
-            ("BiggerRes", "Bigger resolution", "Take the bigger resolution"),
-        ),
-        default='SmallerRes',
-        description="Select the resolution priority when multiple files are found"
-    )
-    bpy.types.Scene.alt_col_handling = EnumProperty(
-        name="Alternative Color handling",
-        items=(
-            ("NewNode", "Create a disabled node", "Add a new node to the shader tree, but it's disabled"),
-            ("NewMaterial", "Create a new material", "Create a new material with the new color map"),
-            ("First", "Take the first one", "Use the first color map found"),
-            ("Last", "Take the last one", "Use the last color map found"),
-        ),
-        default='NewNode',
-        description="What happens when multiple color maps are found"
-    )
-    bpy.types.Scene.default_texture_setup = EnumProperty(
-        name="Shader's texture setup displacement",
-        items=(
-            ("Both", "Both", "Setup node will use both Bump and Displacement nodes"),
-            ("Bump", "Bump", "Setup node will use Bump node"),
-            ("Displacement", "Displacement", "Setup node will use Displacement node"),
-        ),
-        default='Displacement',
-        description="If both available, use this node for setup textures for shader"
-    )
-    bpy.types.Scene.texture_setup_displacement = EnumProperty(
-        name="Shader's texture setup displacement",
-        items=(
-            ("TextureDisplacement", "Texture Displacement", "Setup node will use Texture Displacement node"),
-            ("VertexDisplacement", "Vertex Displacement", "Setup node will use Vertex Displacement node")
-        ),
-        default='TextureDisplacement',
-        description="When setup textures for shader, for displacement it'll use this node"
-    )
-    bpy.types.Scene.texture_setup_default_gamma = FloatProperty(
-        name="Shader's texture setup default gamma",
-        default=2.2,
-        min=0.0,
-        description="When setup textures for shader, it'll use this gamma for all textures"
-    )
-    bpy.types.Scene.displacement_mid_level = FloatProperty(
-        name="Displacement Mid Level",
-        default=0.05,
-        min=0.0,
-        description="When displacement is used, it'll use this mid level for all textures"
-    )
-    bpy.types.Scene.displacement_height = FloatProperty(
-        name="Displacement Height",
-        default=0.05,
-        min=0.0,
-        description="When displacement is used, it'll use this height for all textures"
-    )
-    bpy.types.Scene.preview_type = EnumProperty(
-        name="Preview Type",
-        items=(
-            ("NoPreview", "No preview (Fast)", "Don't set any preview image"),
-            ("UseColorMap", "Use color map (Fast)", "Use the first color map as preview image"),
-            ("Render", "Render (Slow)", "Render an image for the preview")
-        ),
-        default='Render',
-        description="How to set the preview image for the material"
-    )
-    bpy.types.Scene.object_mock = PointerProperty(
-        name="Object Mock",
-        type=bpy.types.Object
-    )
-    bpy.types.Scene.force_rerender = BoolProperty(
-        name="Force re-render preview",
-        description="Force re-render the preview image for the material",
-        default=False
-    )
-    bpy.types.Scene.resolution_x = IntProperty(
-        name="Resolution X",
-        default=200,
-        min=1,
-        description="Resolution X for the preview render",
-        subtype='PIXEL'
-    )
-    bpy.types.Scene.resolution_y = IntProperty(
-        name="Resolution X",
-        default=200,
-        min=1,
-        description="Resolution X for the preview render",
-        subtype='PIXEL'
-    )
-    bpy.types.Scene.transmission = StringProperty(
-        name="Transmission",
-        default="transmission transparency",
-        description="Naming Components for Transmission maps"
-    )
-    bpy.types.Scene.albedo = StringProperty(
-        name="Albedo",
-        default="diffuse diff albedo base col color basecolor",
-        description="Naming Components for color maps"
-    )
-    bpy.types.Scene.ambiant_occlusion = StringProperty(
-        name='Ambient Occlusion',
-        default='ao ambient occlusion',
-        description='Naming Components for AO maps'
-    )
-    bpy.types.Scene.metallic = StringProperty(
-        name="Metallic",
-        default="metallic metalness metal mtl",
-        description="Naming Components for Metallic maps"
-    )
-    bpy.types.Scene.specular = StringProperty(
-        name="Specular",
-        default="specularity specular spec spc reflectivity reflectivity refl",
-        description="Naming Components for Specular maps"
-    )
-    bpy.types.Scene.roughness = StringProperty(
-        name="Roughness",
-        default="roughness rough rgh gloss glossiness gls",
-        description="Naming Components for Roughness maps"
-    )
-    bpy.types.Scene.opacity = StringProperty(
-        name="Opacity",
-        default="alpha opacity mask",
-        description="Naming Components for Alpha maps"
-    )
-    bpy.types.Scene.bump = StringProperty(
-        name="Bump",
-        default="bump bmp",
-        description="Naming Components for Bump maps"
-    )
-    bpy.types.Scene.normal = StringProperty(
-        name="Normal",
-        default="normal nor nrm nrml norm",
-        description="Naming Components for Normal maps"
-    )
-    bpy.types.Scene.displacement = StringProperty(
-        name="Displacement",
-        default="displacement displace disp dsp height heightmap",
-        description="Naming Components for Displacement maps"
-    )
-    bpy.types.Scene.emission = StringProperty(
-        name="Emission",
-        default="emission emissive emit",
-        description="Naming Components for Emission maps"
-    )
-    bpy.types.Scene.emission = StringProperty(
-        name="Emission",
-        default="emission emissive emit",
-        description="Naming Components for Emission maps"
-    )
+    bpy.types.Scene.catalog_generator = PointerProperty(type=CUSTOM_PG_GenerateCatalogsSettings)
     bpy.types.FILEBROWSER_MT_context_menu.append(menu_func)
+    bpy.app.handlers.load_post.append(resume_preview_queue)
 
 def unregister_ui():
     # Unregisters the operator and UI components from Blender, cleaning up on add-on disable.
-    # Also removes the custom properties from the Blender UI.
-    del bpy.types.Scene.selected_folder
-    del bpy.types.Scene.use_catalog_tree
-    del bpy.types.Scene.use_tags
-    del bpy.types.Scene.format_name
-    del bpy.types.Scene.replace_by_space
-    del bpy.types.Scene.add_space_by_caps
-    del bpy.types.Scene.add_space_between_word_and_number
-    del bpy.types.Scene.file_type
-    del bpy.types.Scene.resolution_priority
-    del bpy.types.Scene.default_texture_setup
-    del bpy.types.Scene.texture_setup_displacement
-    del bpy.types.Scene.displacement_mid_level
-    del bpy.types.Scene.displacement_height
-    del bpy.types.Scene.texture_setup_default_gamma
-    del bpy.types.Scene.preview_type
-    del bpy.types.Scene.object_mock
-    del bpy.types.Scene.force_rerender
-    del bpy.types.Scene.resolution_x
-    del bpy.types.Scene.resolution_y
-    del bpy.types.Scene.transmission
-    del bpy.types.Scene.albedo
-    del bpy.types.Scene.metallic
-    del bpy.types.Scene.specular
-    del bpy.types.Scene.roughness
-    del bpy.types.Scene.opacity
-    del bpy.types.Scene.bump
-    del bpy.types.Scene.normal
-    del bpy.types.Scene.displacement
-    del bpy.types.Scene.emission
+    # Also removes the settings pointer from the scene.
+    del bpy.types.Scene.catalog_generator
     bpy.utils.unregister_class(CUSTOM_OT_GenerateShaderCatalog)
+    bpy.utils.unregister_class(CUSTOM_OT_PreflightReport)
+    bpy.utils.unregister_class(CUSTOM_OT_SampleBuild)
+    bpy.utils.unregister_class(CUSTOM_OT_RenderQueuedPreviews)
+    bpy.utils.unregister_class(CUSTOM_OT_AddLibraryRoot)
+    bpy.utils.unregister_class(CUSTOM_OT_RemoveLibraryRoot)
+    bpy.utils.unregister_class(CUSTOM_UL_LibraryRoots)
+    bpy.utils.unregister_class(CUSTOM_OT_SearchLibraryIndex)
+    bpy.utils.unregister_class(CUSTOM_OT_GenerateTextureProxies)
+    bpy.utils.unregister_class(CUSTOM_OT_SwitchTextureResolution)
     bpy.utils.unregister_class(CUSTOM_PT_GenerateCatalogsPanel)
-    bpy.types.FILEBROWSER_MT_context_menu.remove(menu_func)
\ No newline at end of file
+    bpy.utils.unregister_class(CUSTOM_PG_GenerateCatalogsSettings)
+    bpy.utils.unregister_class(CUSTOM_PG_LibraryRoot)
+    bpy.types.FILEBROWSER_MT_context_menu.remove(menu_func)
+    bpy.app.handlers.load_post.remove(resume_preview_queue)
+    # A running preview queue would keep calling into the disabled add-on
+    preview_queue = sys.modules.get(__package__ + ".utils.preview_queue")
+    if preview_queue:
+        preview_queue.stop_preview_queue()
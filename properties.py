@@ -0,0 +1,403 @@
+import bpy
+from bpy.props import IntProperty, BoolProperty, StringProperty, EnumProperty, FloatProperty, PointerProperty, CollectionProperty
+
+# Items of the settings a library root can override, see CUSTOM_PG_LibraryRoot
+RESOLUTION_PRIORITY_ITEMS = (
+    ('FileType', 'File type', 'Take first file type in the list'),
+    ('FileName', 'File name', 'Take first file name in the list'),
+    ("SmallerRes", "Smaller resolution", "Take the smaller resolution"),
+    ("BiggerRes", "Bigger resolution", "Take the bigger resolution"),
+    ("TargetRes", "Target resolution", "Take the resolution closest to the target, read from the file names"),
+)
+ALT_COL_HANDLING_ITEMS = (
+    ("NewNode", "Create a disabled node", "Add a new node to the shader tree, but it's disabled"),
+    ("NewMaterial", "Create a new material", "Create a new material with the new color map"),
+    ("First", "Take the first one", "Use the first color map found"),
+    ("Last", "Take the last one", "Use the last color map found"),
+)
+PREVIEW_TYPE_ITEMS = (
+    ("NoPreview", "No preview (Fast)", "Don't set any preview image"),
+    ("UseColorMap", "Use color map (Fast)", "Use the first color map as preview image"),
+    ("Render", "Render (Slow)", "Render an image for the preview")
+)
+SCENE_SETTING_ITEM = ("SCENE", "Scene setting", "Use the setting of the scene")
+
+class CUSTOM_PG_LibraryRoot(bpy.types.PropertyGroup):
+    # A library root generated along with the others in a single run, with its own catalog prefix
+    # and settings overriding the scene ones
+    enabled: BoolProperty(
+        name="Enabled",
+        description="Generate this library root",
+        default=True
+    )
+    folder: StringProperty(
+        name="Folder",
+        description="Folder of the library root",
+        subtype="DIR_PATH"
+    )
+    catalog_prefix: StringProperty(
+        name="Catalog Prefix",
+        description="Catalog the catalogs of this root are nested in, e.g. Vendors/Poliigon, leave empty for none",
+        default=""
+    )
+    resolution_priority: EnumProperty(
+        name="Resolution Priority",
+        items=(SCENE_SETTING_ITEM,) + RESOLUTION_PRIORITY_ITEMS,
+        default='SCENE',
+        description="Resolution priority of this root"
+    )
+    alt_col_handling: EnumProperty(
+        name="Alternative Color handling",
+        items=(SCENE_SETTING_ITEM,) + ALT_COL_HANDLING_ITEMS,
+        default='SCENE',
+        description="What happens when multiple color maps are found in this root"
+    )
+    preview_type: EnumProperty(
+        name="Preview Type",
+        items=(SCENE_SETTING_ITEM,) + PREVIEW_TYPE_ITEMS,
+        default='SCENE',
+        description="How to set the preview image for the materials of this root"
+    )
+
+class CUSTOM_PG_GenerateCatalogsSettings(bpy.types.PropertyGroup):
+    # All the add-on settings, registered on the scene through a single pointer property
+    # so that enabling the add-on only registers one type instead of one property per setting.
+    selected_folder: StringProperty(subtype="DIR_PATH")
+    library_roots: CollectionProperty(
+        name="Library Roots",
+        description="Library roots generated in a single run instead of the selected folder",
+        type=CUSTOM_PG_LibraryRoot
+    )
+    library_roots_index: IntProperty(
+        name="Active Library Root",
+        default=0
+    )
+    only_folders: StringProperty(
+        name="Only Folders",
+        description="Regenerate only these sub-paths or glob patterns of the selected folder, separated by semicolons (e.g. Vendor/Wood; Vendor/*/Oak*)",
+        default=""
+    )
+    use_catalog_tree: BoolProperty(
+        name="Create Catalog Tree",
+        description="Create and organize materials into a catalog tree",
+        default=True  # Checked by default
+    )
+    deterministic_catalog_ids: BoolProperty(
+        name="Deterministic Catalog IDs",
+        description="Derive new catalog IDs from the library namespace and the catalog path, so separate runs agree on them",
+        default=False
+    )
+    catalog_namespace: StringProperty(
+        name="Library Namespace",
+        description="Name identifying the library for deterministic catalog IDs, leave empty to use the selected folder name",
+        default=""
+    )
+    use_tags: BoolProperty(
+        name="Create Tags",
+        description="Tag materials based on folder structure",
+        default=True  # Checked by default
+    )
+    update_existing: BoolProperty(
+        name="Update Existing Materials",
+        description="Patch the materials generated from the same folders instead of creating duplicates",
+        default=False
+    )
+    retry_failed_folders: BoolProperty(
+        name="Retry Failed Folders",
+        description="Try the folders that failed once more at the end of the run",
+        default=True
+    )
+    validate_textures: BoolProperty(
+        name="Validate Textures",
+        description="Before building, check every texture in background processes and leave out the truncated or unsupported ones",
+        default=False
+    )
+    validation_workers: IntProperty(
+        name="Validation Workers",
+        default=4,
+        min=1,
+        description="Number of background processes checking textures"
+    )
+    use_material_cache: BoolProperty(
+        name="Use Material Cache",
+        description="Append materials built by any project from the same textures and settings instead of building them again",
+        default=False
+    )
+    material_cache_folder: StringProperty(
+        name="Material Cache",
+        description="Folder of the built material cache, leave empty to use the one in Blender's user data files",
+        subtype="DIR_PATH",
+        default=""
+    )
+    material_cache_max_size: IntProperty(
+        name="Max Cache Size (MB)",
+        description="Least recently used entries are removed above this size, 0 for no limit",
+        default=2048,
+        min=0
+    )
+    material_cache_max_age: IntProperty(
+        name="Max Entry Age (Days)",
+        description="Entries unused for longer are removed, 0 for no limit",
+        default=30,
+        min=0
+    )
+    sample_size: IntProperty(
+        name="Sample Size",
+        description="Number of folders classified and built by a sample build",
+        default=50,
+        min=1
+    )
+    sample_seed: IntProperty(
+        name="Sample Seed",
+        description="Changes which folders a sample build picks, the same seed picks the same folders",
+        default=0,
+        min=0
+    )
+    use_search_index: BoolProperty(
+        name="Write Search Index",
+        description="Record the generated materials, their textures and tags in a SQLite index next to the library",
+        default=True
+    )
+    index_file: StringProperty(
+        name="Index File",
+        description="Search index to query, leave empty to use the one next to the current file",
+        subtype="FILE_PATH"
+    )
+    index_query: StringProperty(
+        name="Search",
+        description="Words to find in names, tags and catalogs, with optional texture:<text>, socket:<socket> and missing:<socket> filters",
+        default=""
+    )
+    archive_cache_folder: StringProperty(
+        name="Archive Cache",
+        description="Folder the textures used from zip archives are extracted to, leave empty to use a folder next to the current file",
+        subtype="DIR_PATH",
+        default=""
+    )
+    format_name: BoolProperty(
+        name="Format Name",
+        description="Format material names based on rules",
+        default=True  # Checked by default
+    )
+    replace_by_space: StringProperty(
+        name="Replace by Space",
+        description="Characters to replace by spaces",
+        default="_"  # Default characters
+    )
+    add_space_by_caps: BoolProperty(
+        name="Add Space by Caps",
+        description="Add space before capital letters",
+        default=True  # Checked by default
+    )
+    add_space_between_word_and_number: BoolProperty(
+        name="Add Space Between Word and Number",
+        description="Add space between words and numbers",
+        default=True  # Checked by default
+    )
+    file_type: StringProperty(
+        name="File Type and Priority",
+        default="jpg jpeg png exr hdr tiff tif",
+        description="File types to look for and their priority"
+    )
+    resolution_priority: EnumProperty(
+        name="Resolution Priority",
+        items=RESOLUTION_PRIORITY_ITEMS,
+        default='SmallerRes',
+        description="Select the resolution priority when multiple files are found"
+    )
+    target_resolution: EnumProperty(
+        name="Target Resolution",
+        items=(
+            ("512", "512 px", "Prefer 512 px textures"),
+            ("1024", "1K", "Prefer 1K textures"),
+            ("2048", "2K", "Prefer 2K textures"),
+            ("4096", "4K", "Prefer 4K textures"),
+            ("8192", "8K", "Prefer 8K textures"),
+        ),
+        default='2048',
+        description="Resolution picked when several resolutions of a texture are found"
+    )
+    flat_folders: BoolProperty(
+        name="Split Flat Folders",
+        description="Build one material per texture set when a folder holds several sets side by side (Brick01_Albedo, Brick02_Albedo...)",
+        default=False
+    )
+    alt_col_handling: EnumProperty(
+        name="Alternative Color handling",
+        items=ALT_COL_HANDLING_ITEMS,
+        default='NewNode',
+        description="What happens when multiple color maps are found"
+    )
+    default_texture_setup: EnumProperty(
+        name="Shader's texture setup displacement",
+        items=(
+            ("Both", "Both", "Setup node will use both Bump and Displacement nodes"),
+            ("Bump", "Bump", "Setup node will use Bump node"),
+            ("Displacement", "Displacement", "Setup node will use Displacement node"),
+        ),
+        default='Displacement',
+        description="If both available, use this node for setup textures for shader"
+    )
+    texture_setup_displacement: EnumProperty(
+        name="Shader's texture setup displacement",
+        items=(
+            ("TextureDisplacement", "Texture Displacement", "Setup node will use Texture Displacement node"),
+            ("VertexDisplacement", "Vertex Displacement", "Setup node will use Vertex Displacement node")
+        ),
+        default='TextureDisplacement',
+        description="When setup textures for shader, for displacement it'll use this node"
+    )
+    use_node_groups: BoolProperty(
+        name="Shared Node Groups",
+        description="Build the transform, AO multiply, displacement and emission nodes once as node groups shared by all materials",
+        default=False
+    )
+    texture_setup_default_gamma: FloatProperty(
+        name="Shader's texture setup default gamma",
+        default=2.2,
+        min=0.0,
+        description="When setup textures for shader, it'll use this gamma for all textures"
+    )
+    displacement_mid_level: FloatProperty(
+        name="Displacement Mid Level",
+        default=0.05,
+        min=0.0,
+        description="When displacement is used, it'll use this mid level for all textures"
+    )
+    displacement_height: FloatProperty(
+        name="Displacement Height",
+        default=0.05,
+        min=0.0,
+        description="When displacement is used, it'll use this height for all textures"
+    )
+    preview_type: EnumProperty(
+        name="Preview Type",
+        items=PREVIEW_TYPE_ITEMS,
+        default='Render',
+        description="How to set the preview image for the material"
+    )
+    object_mock: PointerProperty(
+        name="Object Mock",
+        type=bpy.types.Object
+    )
+    deferred_previews: BoolProperty(
+        name="Render Previews Later",
+        description="Use the color map as preview while generating, and render the previews afterwards in the background of the interface. Previews left to render are saved with the file and resumed when it is opened",
+        default=False
+    )
+    force_rerender: BoolProperty(
+        name="Force re-render preview",
+        description="Force re-render the preview image for the material",
+        default=False
+    )
+    resolution_x: IntProperty(
+        name="Resolution X",
+        default=200,
+        min=1,
+        description="Resolution X for the preview render",
+        subtype='PIXEL'
+    )
+    resolution_y: IntProperty(
+        name="Resolution Y",
+        default=200,
+        min=1,
+        description="Resolution Y for the preview render",
+        subtype='PIXEL'
+    )
+    build_proxies: BoolProperty(
+        name="Build Texture Proxies",
+        description="After generating, build downscaled proxies of every bound texture in background processes",
+        default=False
+    )
+    proxy_folder: StringProperty(
+        name="Proxy Folder",
+        description="Where proxies are cached, leave empty to use a folder next to the current file",
+        subtype="DIR_PATH"
+    )
+    proxy_tiers: StringProperty(
+        name="Proxy Tiers",
+        default="512 1024 2048",
+        description="Longest edge in pixels of each proxy tier"
+    )
+    proxy_workers: IntProperty(
+        name="Proxy Workers",
+        default=4,
+        min=1,
+        description="Number of background processes building proxies"
+    )
+    proxy_resolution: EnumProperty(
+        name="Texture Resolution",
+        items=(
+            ("Full", "Full resolution", "Use the original textures, for final renders"),
+            ("512", "512 px", "Use the 512 px proxies"),
+            ("1024", "1K", "Use the 1K proxies"),
+            ("2048", "2K", "Use the 2K proxies"),
+            ("4096", "4K", "Use the 4K proxies"),
+        ),
+        default='Full',
+        description="Resolution the generated materials are switched to"
+    )
+    proxy_scope: EnumProperty(
+        name="Switch Scope",
+        items=(
+            ("All", "All generated materials", "Switch every material created by the generator"),
+            ("Selected", "Selected objects", "Switch the generated materials of the selected objects"),
+        ),
+        default='All',
+        description="Which materials are switched"
+    )
+    transmission: StringProperty(
+        name="Transmission",
+        default="transmission transparency",
+        description="Naming Components for Transmission maps"
+    )
+    albedo: StringProperty(
+        name="Albedo",
+        default="diffuse diff albedo base col color basecolor",
+        description="Naming Components for color maps"
+    )
+    ambiant_occlusion: StringProperty(
+        name='Ambient Occlusion',
+        default='ao ambient occlusion',
+        description='Naming Components for AO maps'
+    )
+    metallic: StringProperty(
+        name="Metallic",
+        default="metallic metalness metal mtl",
+        description="Naming Components for Metallic maps"
+    )
+    specular: StringProperty(
+        name="Specular",
+        default="specularity specular spec spc reflectivity reflectivity refl",
+        description="Naming Components for Specular maps"
+    )
+    roughness: StringProperty(
+        name="Roughness",
+        default="roughness rough rgh gloss glossiness gls",
+        description="Naming Components for Roughness maps"
+    )
+    opacity: StringProperty(
+        name="Opacity",
+        default="alpha opacity mask",
+        description="Naming Components for Alpha maps"
+    )
+    bump: StringProperty(
+        name="Bump",
+        default="bump bmp",
+        description="Naming Components for Bump maps"
+    )
+    normal: StringProperty(
+        name="Normal",
+        default="normal nor nrm nrml norm",
+        description="Naming Components for Normal maps"
+    )
+    displacement: StringProperty(
+        name="Displacement",
+        default="displacement displace disp dsp height heightmap",
+        description="Naming Components for Displacement maps"
+    )
+    emission: StringProperty(
+        name="Emission",
+        default="emission emissive emit",
+        description="Naming Components for Emission maps"
+    )
@@ -0,0 +1,119 @@
+import os
+import re
+import shutil
+import hashlib
+import zipfile
+from functools import lru_cache
+from contextlib import contextmanager
+
+# A path pointing inside an archive, e.g. '/library/Bricks.zip/4K/Bricks_Color.jpg'
+ARCHIVE_PATH = re.compile(r"^(.*?\.zip)[\\/](.+)$", re.IGNORECASE)
+
+ARCHIVE_CACHE_FOLDER_NAME = "archive_cache"
+
+
+def is_archive(path):
+    """
+    Returns True if the path is an archive that can be used as a material folder.
+    """
+    return path.lower().endswith(".zip")
+
+
+def split_archive_path(path):
+    """
+    Splits a path pointing inside an archive into (archive path, entry name), or returns None for a regular path.
+    """
+    match = ARCHIVE_PATH.match(path)
+    if not match or not os.path.isfile(match.group(1)):
+        return None
+    return match.group(1), match.group(2).replace("\\", "/")
+
+
+def is_safe_entry_name(entry_name):
+    """
+    Returns True if an archive entry name stays inside the folder it is extracted to.
+
+    Absolute names, names with a drive letter and names with a '..' part are rejected, an
+    archive can't have a file written outside the extraction cache.
+    """
+    parts = entry_name.replace("\\", "/").split("/")
+    return bool(entry_name) and not entry_name.startswith(("/", "\\")) and ":" not in parts[0] and ".." not in parts
+
+
+@lru_cache(maxsize=256)
+def read_central_directory(archive_path, size, mtime):
+    # Cached on the archive size and mtime, so a replaced archive is read again
+    with zipfile.ZipFile(archive_path) as archive:
+        return {info.filename: info.file_size for info in archive.infolist() if not info.is_dir() and is_safe_entry_name(info.filename)}
+
+
+def list_archive_entries(archive_path):
+    """
+    Returns the files of an archive and their uncompressed sizes, read from its central directory only.
+    """
+    stat = os.stat(archive_path)
+    return read_central_directory(archive_path, stat.st_size, stat.st_mtime_ns)
+
+
+def get_archive_entry_size(path):
+    """
+    Returns the uncompressed size of a file inside an archive, or 0 if it isn't there.
+
+    The archive can have been moved or deleted since it was listed, its files then aren't there either.
+    """
+    archive_location = split_archive_path(path)
+    if archive_location is None:
+        return 0
+    archive_path, entry_name = archive_location
+    return list_archive_entries(archive_path).get(entry_name, 0)
+
+
+@contextmanager
+def open_texture(path):
+    """
+    Opens a texture for reading, whether it is a regular file or a file inside an archive.
+    """
+    archive_location = split_archive_path(path)
+    if archive_location is None:
+        with open(path, "rb") as file:
+            yield file
+        return
+    with zipfile.ZipFile(archive_location[0]) as archive:
+        try:
+            info = archive.getinfo(archive_location[1])
+        except KeyError:
+            raise FileNotFoundError(path)
+        with archive.open(info) as entry:
+            yield entry
+
+
+def extract_archive_entry(path, cache_folder):
+    """
+    Extracts a single file of an archive into the local cache and returns its local path.
+
+    Files are cached per archive version (path, size and mtime), so each texture is only
+    extracted once and a replaced archive gets a fresh cache entry. Extraction goes through
+    a temporary file, a cached file is always complete.
+
+    Raises:
+    - ValueError: If the entry name would write the file outside the cache.
+    """
+    archive_path, entry_name = split_archive_path(path)
+    if not is_safe_entry_name(entry_name):
+        raise ValueError(f"Archive entry {entry_name} points outside its folder")
+    stat = os.stat(archive_path)
+    key = f"{os.path.normcase(os.path.abspath(archive_path))}|{stat.st_size}|{stat.st_mtime_ns}"
+    archive_folder = os.path.join(cache_folder, hashlib.sha1(key.encode("utf-8")).hexdigest()[:16])
+    target = os.path.join(archive_folder, *entry_name.split("/"))
+    # Checked on the resolved paths too, in case part of the cache is a symlink
+    if os.path.commonpath([os.path.realpath(target), os.path.realpath(archive_folder)]) != os.path.realpath(archive_folder):
+        raise ValueError(f"Archive entry {entry_name} points outside its folder")
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temporary = f"{target}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(archive_path) as archive, archive.open(entry_name) as source, open(temporary, "wb") as destination:
+        shutil.copyfileobj(source, destination, 1024 * 1024)
+    os.replace(temporary, target)
+    return target
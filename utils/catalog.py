@@ -1,9 +1,17 @@
 import uuid
 import bpy
 import os
+import time
+import tempfile
+from contextlib import contextmanager
 from .parsing import format_material_name
 from pathlib import Path
 
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
 def get_catalog_file_path():
     """
     Determines the path to the catalog file associated with the current Blender project.
@@ -19,11 +27,12 @@ def get_catalog_file_path():
     - FileNotFoundError: If the Blender file hasn't been saved or the directory doesn't exist.
     """
 
+    # An unsaved file has an empty path, which Path would turn into the current directory
+    if not bpy.data.filepath:
+        raise FileNotFoundError("Blender file has not been saved. Please save your work before running this script.")
+
     # Get the directory of the current Blender file
     blend_file_path = Path(bpy.data.filepath)
-    if not blend_file_path:
-        # Handle the case where the .blend file hasn't been saved yet
-        raise FileNotFoundError("Blender file has not been saved. Please save your work before running this script.")
 
     # Ensure the .blend file's directory exists (it should, but this is for safety)
     if not blend_file_path.parent.exists():
@@ -33,18 +42,188 @@ def get_catalog_file_path():
     catalog_file_path = blend_file_path.parent / "blender_assets.cats.txt"
     return catalog_file_path
 
-def get_or_create_catalog(full_path, base_path):
+@contextmanager
+def locked_catalog_file(catalog_file):
+    """
+    Holds an advisory, inter-process lock on the catalog file for the duration of the block.
+
+    The lock is taken on a sibling '.lock' file rather than on the catalog itself, so the
+    catalog can be replaced atomically while the lock is held. Every generator process
+    writing to the same library serialises its catalog updates through this lock.
+
+    Parameters:
+    - catalog_file (pathlib.Path): The path to the catalog file to protect.
+    """
+    lock_path = catalog_file.with_name(catalog_file.name + ".lock")
+    with open(lock_path, "a+b") as lock_file:
+        lock_file.seek(0)
+        if os.name == 'nt':
+            # msvcrt only retries for ~10 seconds, keep waiting like flock does
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            lock_file.seek(0)
+            if os.name == 'nt':
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def read_catalog_entries(catalog_file):
+    """
+    Reads the catalog file and returns its raw lines along with a mapping of catalog paths to UUIDs.
+
+    Lines are kept verbatim (comments, version header, entries written by Blender itself)
+    so that rewriting the file never drops anything another process or Blender added.
+
+    Parameters:
+    - catalog_file (pathlib.Path): The path to the catalog file.
+
+    Returns:
+    - tuple: (list of lines, dict mapping catalog path to UUID).
+    """
+    if not catalog_file.exists():
+        return [], {}
+
+    with open(catalog_file, "r", encoding="utf-8") as file:
+        lines = file.read().splitlines()
+
+    existing_catalogs = {}
+    for line in lines:
+        if ":" not in line or line.startswith("#"):
+            continue
+        # Entries are 'UUID:path' or, when written by Blender, 'UUID:path:simple name'
+        catalog_uuid, _, rest = line.partition(":")
+        catalog_path = rest.split(":", 1)[0].strip()
+        # First entry wins, duplicates left by older unlocked runs are ignored
+        existing_catalogs.setdefault(catalog_path, catalog_uuid.strip())
+    return lines, existing_catalogs
+
+def write_catalog_atomically(catalog_file, lines):
+    """
+    Writes the catalog file through a temporary file and an atomic rename.
+
+    Readers never observe a partially written catalog. Must be called while holding
+    the catalog lock.
+
+    Parameters:
+    - catalog_file (pathlib.Path): The path to the catalog file.
+    - lines (list): The lines to write, without line endings.
+    """
+    fd, temp_path = tempfile.mkstemp(prefix=catalog_file.name + ".", suffix=".tmp", dir=catalog_file.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        # On Windows the replace fails while another process has the catalog open, retry briefly
+        for attempt in range(50):
+            try:
+                os.replace(temp_path, catalog_file)
+                break
+            except PermissionError:
+                if attempt == 49:
+                    raise
+                time.sleep(0.1)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def merge_catalog_entries(catalog_file, new_entries):
+    """
+    Merges catalog entries into the catalog file under lock.
+
+    The file is re-read while the lock is held and entries are reconciled by catalog path:
+    a path that another process registered in the meantime keeps its existing UUID, and
+    only genuinely new paths are appended before the file is rewritten atomically.
+
+    Parameters:
+    - catalog_file (pathlib.Path): The path to the catalog file.
+    - new_entries (dict): Mapping of catalog path to the UUID to use if the path is new.
+
+    Returns:
+    - dict: Mapping of every requested catalog path to the UUID stored in the file.
+    """
+    with locked_catalog_file(catalog_file):
+        lines, existing_catalogs = read_catalog_entries(catalog_file)
+
+        resolved = {}
+        added = False
+        for catalog_path, catalog_uuid in new_entries.items():
+            if catalog_path in existing_catalogs:
+                resolved[catalog_path] = existing_catalogs[catalog_path]
+            else:
+                lines.append(f"{catalog_uuid}:{catalog_path}")
+                existing_catalogs[catalog_path] = catalog_uuid
+                resolved[catalog_path] = catalog_uuid
+                added = True
+
+        if added:
+            write_catalog_atomically(catalog_file, lines)
+    return resolved
+
+def get_catalog_path(full_path, base_path, prefix=None):
+    """
+    Returns the formatted catalog path of a material folder, or None for a folder at the root of the library.
+
+    Parameters:
+    - full_path (str): The full path to the material folder.
+    - base_path (str): The base path of the Blender project's assets.
+    - prefix (str): Optional catalog path the catalogs of the library are nested in, e.g. 'Vendors/Poliigon'.
+      The folders at the root of the library then go to this catalog.
+    """
+    # Trim the base path from the full path and exclude the material's own directory
+    trimmed_path_parts = Path(full_path).relative_to(base_path).parts[:-1]  # Excludes the last directory
+    prefix_parts = [part.strip() for part in prefix.split('/') if part.strip()] if prefix else []
+    if not trimmed_path_parts and not prefix_parts:
+        return None
+    return "/".join(prefix_parts + [format_material_name(part) for part in trimmed_path_parts])
+
+def get_deterministic_catalog_id(formatted_path, namespace):
+    """
+    Derives a catalog UUID from a library namespace and a formatted catalog path.
+
+    Any process can compute the ID of a catalog without reading the catalog file, and
+    catalogs created by separate runs of the same library end up with the same IDs.
+
+    Parameters:
+    - formatted_path (str): The formatted catalog path, e.g. 'Fabric/Rug'.
+    - namespace (str): The name identifying the library.
+
+    Returns:
+    - str: The UUID of the catalog.
+    """
+    namespace_uuid = uuid.uuid5(uuid.NAMESPACE_URL, "octane-library-generator:" + namespace)
+    return str(uuid.uuid5(namespace_uuid, formatted_path))
+
+def get_or_create_catalog(full_path, base_path, namespace=None, known_catalogs=None, prefix=None):
     """
     Retrieves or creates a catalog entry for a given path within a base path.
 
     This function checks for the existence of a catalog entry for the specified path.
     If the entry does not exist, a new one is created with a unique UUID. The function
     manages catalog entries by maintaining a simple text file, where each line represents
-    a catalog entry in the format 'UUID:path'.
+    a catalog entry in the format 'UUID:path'. Updates are made under an advisory file lock
+    and merged with whatever other generator processes wrote, so several runs can share
+    one library safely.
+
+    With a namespace, new catalogs get an ID derived from the namespace and the catalog path
+    instead of a random one. IDs already in the file are always honoured.
 
     Parameters:
     - full_path (str): The full path to the item for which a catalog entry is sought.
     - base_path (str): The base path of the Blender project's assets.
+    - namespace (str): Optional library namespace for deterministic IDs.
+    - known_catalogs (dict): Optional per-run memo of catalog path to UUID, so the file is read once per run.
+    - prefix (str): Optional catalog path the catalogs of the library are nested in, see get_catalog_path.
 
     Returns:
     - str: The UUID of the catalog entry, either retrieved or newly created.
@@ -55,25 +234,29 @@ def get_or_create_catalog(full_path, base_path):
         print(e)
         return None
 
-    if not catalog_file.exists():
-        catalog_file.touch()
-
-    # Trim the base path from the full path and exclude the material's own directory
-    trimmed_path_parts = Path(full_path).relative_to(base_path).parts[:-1]  # Excludes the last directory
-    if not trimmed_path_parts:
+    formatted_path = get_catalog_path(full_path, base_path, prefix)
+    if formatted_path is None:
         # If there are no directories left after trimming, return None to indicate no catalog should be created
         return None
 
-    with open(catalog_file, "r+", encoding="utf-8") as file:
-        existing_catalogs = {line.split(":", 1)[1].strip(): line.split(":", 1)[0] for line in file if ":" in line}
-        formatted_path = "/".join([format_material_name(part) for part in trimmed_path_parts])
+    if known_catalogs is not None and formatted_path in known_catalogs:
+        return known_catalogs[formatted_path]
 
-        if formatted_path in existing_catalogs:
-            return existing_catalogs[formatted_path]
-        else:
-            new_uuid = str(uuid.uuid4())
-            file.write(f"{new_uuid}:{formatted_path}\n")
-            return new_uuid
+    # Fast path: most catalogs already exist, no need to take the lock to read them
+    _, existing_catalogs = read_catalog_entries(catalog_file)
+    if known_catalogs is not None:
+        known_catalogs.update(existing_catalogs)
+    if formatted_path in existing_catalogs:
+        return existing_catalogs[formatted_path]
+
+    if namespace:
+        new_uuid = get_deterministic_catalog_id(formatted_path, namespace)
+    else:
+        new_uuid = str(uuid.uuid4())
+    catalog_uuid = merge_catalog_entries(catalog_file, {formatted_path: new_uuid})[formatted_path]
+    if known_catalogs is not None:
+        known_catalogs[formatted_path] = catalog_uuid
+    return catalog_uuid
 
 def set_material_preview_with_operator(context, material, image_path):
     """
@@ -8,6 +8,9 @@ OCTANE_NODE = {
   '3DTransform': 'Octane3DTransformation',
   'MaterialOutput': 'ShaderNodeOutputMaterial',
   'MultiplyTexture': 'OctaneMultiplyTexture',
+  'Group': 'ShaderNodeGroup',
+  'GroupInput': 'NodeGroupInput',
+  'GroupOutput': 'NodeGroupOutput',
 }
 
 # Defines socket names for the 'UniversalMaterial' node
@@ -24,6 +27,14 @@ UNIVERSAL_MATERIAL_SOCKET = {
   'Emission': 'Emission',
 }
 
+UNIVERSAL_MATERIAL_OUTPUT_SOCKET = {
+  'Out': 'Material out',
+}
+
+MATERIAL_OUTPUT_SOCKET = {
+  'Surface': 'Surface',
+}
+
 # More constants for other node and socket types follow...
 TEXTURE_EMISSION_SOCKET = {
   'Texture': 'Texture',
@@ -53,6 +64,39 @@ DISPLACEMENT_SOCKET = {
   'Out': 'Displacement out',
 }
 
+# Input and output sockets the generator uses on each node type, resolved once per session
+# against the installed Octane build (see utils/sockets.py)
+NODE_SOCKETS = {
+  'UniversalMaterial': (list(UNIVERSAL_MATERIAL_SOCKET.values()), [UNIVERSAL_MATERIAL_OUTPUT_SOCKET['Out']]),
+  'MaterialOutput': ([MATERIAL_OUTPUT_SOCKET['Surface']], []),
+  'ImageTexture': ([IMAGE_TEXTURE_SOCKET['Transform'], IMAGE_TEXTURE_SOCKET['Gamma']], [IMAGE_TEXTURE_SOCKET['Out']]),
+  'TextureEmission': ([TEXTURE_EMISSION_SOCKET['Texture']], [TEXTURE_EMISSION_SOCKET['Out']]),
+  'TextureDisplacement': ([DISPLACEMENT_SOCKET['Texture'], DISPLACEMENT_SOCKET['Midlevel'], DISPLACEMENT_SOCKET['Height']], [DISPLACEMENT_SOCKET['Out']]),
+  'VertexDisplacement': ([DISPLACEMENT_SOCKET['Texture'], DISPLACEMENT_SOCKET['Midlevel'], DISPLACEMENT_SOCKET['Height']], [DISPLACEMENT_SOCKET['Out']]),
+  '3DTransform': ([], [TRANSFORM_SOCKET['Out']]),
+  'MultiplyTexture': ([MULTIPLY_TEXTURE_SOCKET['In1'], MULTIPLY_TEXTURE_SOCKET['In2']], [MULTIPLY_TEXTURE_SOCKET['Out']]),
+}
+
+# Socket names of the shared texture setup node group, the outputs reuse the names of the nodes they expose
+TEXTURE_SETUP_SOCKET = {
+  'Albedo': 'Albedo',
+  'Ambient Occlusion': 'Ambient Occlusion',
+  'Displacement': 'Displacement',
+  'Emission': 'Emission',
+  'Midlevel': 'Mid level',
+  'Height': 'Height',
+  'TransformOut': 'Transform out',
+  'AlbedoOut': 'Albedo out',
+  'DisplacementOut': 'Displacement out',
+  'EmissionOut': 'Emission out',
+}
+
+# Socket type used for a group socket when the node socket it exposes can't be used as an interface type
+GROUP_SOCKET_FALLBACK_TYPE = 'NodeSocketShader'
+
+# Fallback for the value inputs set on each group instance, a shader socket has no default value
+GROUP_VALUE_SOCKET_FALLBACK_TYPE = 'NodeSocketFloat'
+
 # Defines a constant gap used for arranging nodes visually in the Blender node editor
 GAP = 300
 
@@ -75,4 +119,5 @@ NODE_POSITION = {
   'DisplacementNode': (-GAP, -1100),
   'Emission': (-GAP*2, -1450),
   'EmissionNode': (-GAP, -1350),
+  'TextureSetup': (-GAP*4, -500),
 }
\ No newline at end of file
@@ -0,0 +1,205 @@
+import bpy
+import os
+import glob
+import time
+from .generator import create_shaders_tree, iter_targeted_material_folders, get_search_index_path, clear_index_coverage
+from .materials import normalize_source_folder, remove_generated_materials, get_folders_source_folders, snapshot_datablocks, discard_new_datablocks, invalidate_image_index
+from .catalog import get_catalog_path, get_or_create_catalog
+from .filecache import FileMetadataCache
+from .search_index import open_search_index, index_material, remove_source_folders
+from .material_cache import load_cached_materials
+from .metrics import set_queue_depth, start_phase, end_phase
+from .jobqueue import (
+    SHARDS, PENDING, CLAIMED, DONE, get_worker_id, read_queue, claim_job, keep_claim_alive, get_shard_path, complete_job,
+    release_stale_claims, iter_done_jobs, get_queue_status
+)
+
+# A distributed build spreads the folders of a library over several machines. The coordinator
+# splits the material folders into jobs on a shared queue (see jobqueue.py), workers build them
+# into .blend shards, and the coordinator appends the shards to the library once they are done.
+
+
+def get_build_partitions(folder_path, patterns=None, job_size=25):
+    """
+    Splits the material folders of a library into jobs of job_size folders.
+
+    Folders keep their walk order, so a job holds neighbouring folders. They are given relative
+    to the library, '' for the library folder itself.
+    """
+    with FileMetadataCache() as file_cache:
+        folders = [
+            os.path.relpath(path, folder_path).replace(os.sep, '/') if root is not None else ''
+            for _, path, root in iter_targeted_material_folders(folder_path, file_cache, patterns)
+        ]
+    return [folders[index:index + job_size] for index in range(0, len(folders), job_size)]
+
+
+def get_job_folders(folder_path, job):
+    # The folders of a job, as paths on this machine
+    return [os.path.normpath(os.path.join(folder_path, *folder.split('/'))) for folder in job['folders']]
+
+
+def build_queue_job(folder_path, job):
+    """
+    Builds the materials of the folders of one job, as new materials of the current file.
+
+    Returns:
+    - tuple: The built materials, the snapshot of the file before the job and the run report.
+    """
+    folders = get_job_folders(folder_path, job)
+    # Materials of these folders already in the file would keep their names, the new ones would get a suffix
+    remove_generated_materials(get_folders_source_folders(folders))
+    snapshot = snapshot_datablocks()
+
+    # Only the subtrees of the job are walked, unless it holds the library folder itself
+    patterns = None if '' in job['folders'] else [glob.escape(folder) for folder in job['folders']]
+    report = create_shaders_tree(folder_path, only_folders=folders, update_existing=False, patterns=patterns)
+    materials = [mat for mat in bpy.data.materials if mat not in snapshot['materials']]
+    return materials, snapshot, report
+
+
+def record_queue_depths(status):
+    """
+    Records the jobs of a queue status, see get_queue_status, in the live metrics.
+    """
+    for state in (PENDING, CLAIMED, DONE):
+        set_queue_depth('jobs_' + state, status[state])
+
+
+def run_queue_worker(queue_folder, folder_path=None, stale_timeout=600, poll_interval=10):
+    """
+    Claims and builds the jobs of a distributed build until none is left.
+
+    The materials of each job are written to a shard on the queue, the opened file itself is
+    never saved. Once no job is pending, the worker keeps polling while other workers hold
+    claims, a claim can go stale and come back.
+
+    Parameters:
+    - queue_folder (str): The shared folder of the queue.
+    - folder_path (str): The library root on this machine, defaults to the one of the coordinator.
+    - stale_timeout (float): Seconds after which a claim that isn't touched anymore is released.
+    - poll_interval (float): Seconds between two looks at the queue while waiting.
+
+    Raises:
+    - FileNotFoundError: If the folder doesn't hold a job queue.
+
+    Returns:
+    - int: The number of jobs built by this worker.
+    """
+    queue = read_queue(queue_folder)
+    if queue is None:
+        raise FileNotFoundError(f"{queue_folder} doesn't hold a job queue")
+    folder_path = folder_path or queue['library']
+    worker_id = get_worker_id()
+
+    built = 0
+    while True:
+        release_stale_claims(queue_folder, stale_timeout)
+        claimed = claim_job(queue_folder, worker_id)
+        status = get_queue_status(queue_folder)
+        record_queue_depths(status)
+        if claimed is None:
+            if not status[CLAIMED]:
+                end_phase()
+                return built
+            start_phase('waiting')
+            time.sleep(poll_interval)
+            continue
+
+        job, claim_path = claimed
+        print(f"Building job {job['id']} ({len(job['folders'])} folders)")
+        # Touched several times per timeout, a single late heartbeat doesn't lose the claim
+        with keep_claim_alive(claim_path, stale_timeout / 4):
+            materials, snapshot, report = build_queue_job(folder_path, job)
+            shard_path = get_shard_path(queue_folder, claim_path)
+            start_phase('shard')
+            if materials:
+                bpy.data.libraries.write(shard_path, set(materials), path_remap='ABSOLUTE', fake_user=True, compress=True)
+
+        record = {
+            'worker': worker_id,
+            'shard': os.path.basename(shard_path) if materials else None,
+            'materials': len(materials),
+            'seconds': report['seconds'],
+            'failed_folders': [os.path.relpath(path, folder_path).replace(os.sep, '/') for path in report['failed_folders']],
+            'errors': [{key: error[key] for key in ('folder', 'error', 'message')} for error in report['errors']],
+        }
+        if complete_job(queue_folder, job, claim_path, record):
+            built += 1
+        else:
+            print(f"Job {job['id']} was released while it was built, its shard is dropped")
+
+        # The next job starts from the opened file again
+        discard_new_datablocks(snapshot)
+
+
+def merge_queue_shards(queue_folder, folder_path=None):
+    """
+    Appends the materials of the done jobs of a distributed build to the current file.
+
+    The materials previously generated from the folders of a job are replaced by the ones of its
+    shard, merging a job twice gives the same file. Catalogs are resolved against the catalog file
+    of the current file, the IDs the workers gave are replaced. The search index is updated when
+    it is enabled.
+    The jobs are only marked as merged by the caller, once the file is saved.
+
+    Returns:
+    - list: (completion record, record path) of every merged job.
+    """
+    props = bpy.context.scene.catalog_generator
+    queue = read_queue(queue_folder)
+    if queue is None:
+        raise FileNotFoundError(f"{queue_folder} doesn't hold a job queue")
+    folder_path = folder_path or queue['library']
+    start_phase('merge')
+    invalidate_image_index()
+
+    conn = None
+    if props.use_search_index:
+        try:
+            conn = open_search_index(get_search_index_path())
+        except FileNotFoundError as e:
+            print(e)
+    else:
+        # The merged materials aren't indexed, the index no longer covers the library
+        clear_index_coverage([folder_path])
+
+    # Same catalogs as a local build, see create_library_roots
+    namespace = None
+    if props.deterministic_catalog_ids:
+        namespace = props.catalog_namespace or os.path.basename(os.path.normpath(folder_path))
+    known_catalogs = {}
+
+    merged = []
+    for record, record_path in iter_done_jobs(queue_folder):
+        shard_path = os.path.join(queue_folder, SHARDS, record['shard']) if record['shard'] else None
+        if shard_path and not os.path.exists(shard_path):
+            print(f"Shard of job {record['id']} is missing, the job is left unmerged")
+            continue
+
+        folders = get_job_folders(folder_path, record)
+        source_folders = get_folders_source_folders(folders)
+        remove_generated_materials(source_folders)
+        if conn:
+            remove_source_folders(conn, source_folders)
+
+        materials = load_cached_materials(shard_path) if shard_path else []
+        # Texture sets of a flat folder share the catalog of the folder
+        job_folders = {normalize_source_folder(path): path for path in folders}
+        for mat in materials:
+            source_folder = mat['generator_source_folder']
+            path = job_folders.get(source_folder) or job_folders.get(os.path.dirname(source_folder))
+            # The library folder itself gets no catalog
+            is_library = path is None or os.path.normpath(path) == os.path.normpath(folder_path)
+            catalog_path = get_catalog_path(path, folder_path) if path else None
+            if props.use_catalog_tree and not is_library:
+                mat.asset_data.catalog_id = get_or_create_catalog(path, folder_path, namespace, known_catalogs)
+            if conn:
+                index_material(conn, mat, catalog_path, [tag.name for tag in mat.asset_data.tags])
+        merged.append((record, record_path))
+
+    if conn:
+        conn.commit()
+        conn.close()
+    end_phase()
+    return merged
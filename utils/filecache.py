@@ -0,0 +1,174 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class FileMetadataCache:
+    """
+    Per-run cache of directory listings and file metadata.
+
+    Every folder is listed once with os.scandir and the size and modification time of its
+    files are recorded in the same pass, so that later existence, size and mtime checks are
+    answered from memory instead of hitting the (possibly network) storage again. While the
+    generator works on a folder, the folders it is about to visit are scanned ahead of time
+    by a small thread pool.
+    """
+
+    def __init__(self, max_workers=8):
+        self._listings = {}  # folder -> (directory names, file names)
+        self._stats = {}  # path -> (size, mtime), or None when the path doesn't exist
+        self._pending = {}  # folder -> future of a scan in progress
+        self._links = set()  # directory symlinks, listed but not walked into
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="file-metadata")
+
+    def close(self):
+        """
+        Stops the prefetch threads. Cached metadata stays available.
+        """
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _scan(self, folder):
+        # Lists a folder and stats its files in a single pass
+        dirs = []
+        files = []
+        stats = {}
+        links = set()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            dirs.append(entry.name)
+                            if entry.is_symlink():
+                                links.add(entry.path)
+                        else:
+                            files.append(entry.name)
+                            stat = entry.stat()
+                            stats[entry.path] = (stat.st_size, stat.st_mtime)
+                    except OSError:
+                        # Entry vanished or is unreadable, skip it like os.walk does
+                        continue
+        except OSError:
+            dirs, files = [], []
+
+        # Sorted like os.listdir is on most platforms, so the walk order stays deterministic
+        dirs.sort()
+        files.sort()
+        with self._lock:
+            self._listings[folder] = (dirs, files)
+            self._stats.update(stats)
+            self._links.update(links)
+            self._pending.pop(folder, None)
+        return dirs, files
+
+    def prefetch(self, folders):
+        """
+        Schedules the scan of the given folders on the thread pool, skipping the ones already known.
+        """
+        with self._lock:
+            for folder in map(os.path.normpath, folders):
+                if folder in self._listings or folder in self._pending:
+                    continue
+                self._pending[folder] = self._pool.submit(self._scan, folder)
+
+    def listdir(self, folder):
+        """
+        Returns the (directory names, file names) of a folder, scanning it if needed.
+        """
+        folder = os.path.normpath(folder)
+        with self._lock:
+            listing = self._listings.get(folder)
+            future = self._pending.get(folder)
+        if listing is not None:
+            return listing
+        if future is not None:
+            return future.result()
+        return self._scan(folder)
+
+    def walk(self, top):
+        """
+        Top-down equivalent of os.walk served from the cache.
+
+        The directory names list can be modified in place to prune the walk, like with os.walk.
+        Subfolders of the folder being yielded are prefetched in the background. Like os.walk,
+        symlinked directories are listed but not walked into, a symlink loop can't trap the walk.
+        """
+        stack = [os.path.normpath(top)]
+        while stack:
+            root = stack.pop()
+            dirs, files = self.listdir(root)
+            dirs = list(dirs)
+            self.prefetch(self._walkable(root, dirs))
+            yield root, dirs, list(files)
+            stack.extend(reversed(self._walkable(root, dirs)))
+
+    def _walkable(self, root, dirs):
+        # The subfolders of root the walk goes into, all but the symlinked ones
+        with self._lock:
+            return [path for path in (os.path.join(root, name) for name in dirs) if path not in self._links]
+
+    def _stat(self, path):
+        # Looks the path up in its parent's listing, falling back to a single stat call
+        with self._lock:
+            if path in self._stats:
+                return self._stats[path]
+        parent = os.path.dirname(path)
+        self.listdir(parent)
+        with self._lock:
+            if path in self._stats:
+                return self._stats[path]
+        try:
+            stat = os.stat(path)
+            result = (stat.st_size, stat.st_mtime)
+        except OSError:
+            result = None
+        with self._lock:
+            self._stats[path] = result
+        return result
+
+    def exists(self, path):
+        """
+        Returns True if the file exists.
+        """
+        path = os.path.normpath(path)
+        parent = os.path.dirname(path)
+        dirs, files = self.listdir(parent)
+        name = os.path.basename(path)
+        return name in files or name in dirs
+
+    def size(self, path):
+        """
+        Returns the size of a file in bytes, or 0 if it doesn't exist.
+        """
+        stat = self._stat(os.path.normpath(path))
+        return stat[0] if stat else 0
+
+    def mtime(self, path):
+        """
+        Returns the modification time of a file, or 0 if it doesn't exist.
+        """
+        stat = self._stat(os.path.normpath(path))
+        return stat[1] if stat else 0
+
+    def record_written(self, path):
+        """
+        Updates the cache after the generator itself wrote a file, such as a rendered preview.
+        """
+        path = os.path.normpath(path)
+        parent = os.path.dirname(path)
+        name = os.path.basename(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        dirs, files = self.listdir(parent)
+        with self._lock:
+            if name not in files:
+                self._listings[parent] = (dirs, sorted(files + [name]))
+            self._stats[path] = (stat.st_size, stat.st_mtime)
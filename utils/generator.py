@@ -0,0 +1,641 @@
+import bpy
+import os
+import json
+import time
+import fnmatch
+import tempfile
+from pathlib import Path
+from .materials import build_folder_plans, create_materials_according_settings, index_generated_materials, normalize_source_folder, remove_generated_materials, snapshot_datablocks, discard_new_datablocks, invalidate_image_index
+from .parsing import format_material_name
+from .catalog import get_or_create_catalog, get_catalog_path, get_catalog_file_path, set_material_preview_with_operator
+from .render import render_material_preview
+from .preview_queue import queue_preview_render, clear_queued_preview
+from .filecache import FileMetadataCache
+from .search_index import INDEX_FILE_NAME, open_search_index, index_material, remove_source_folders, find_source_folder_materials, is_library_covered, set_library_coverage
+from .report import start_run_report, record_folder, record_error, record_invalid_textures, summarize_roots, save_run_report
+from .metrics import record_folder_discovered, start_folder, finish_folder, start_phase, end_phase
+from .proxy import parse_proxy_tiers, get_proxy_folder, get_material_images, get_full_resolution_path, generate_proxies
+from .archives import ARCHIVE_CACHE_FOLDER_NAME, is_archive
+from .sockets import get_socket_schema
+from .texture_validation import VALIDATION_CACHE_FILE_NAME, invalid_textures, load_validation_cache, save_validation_cache, validate_textures, get_bound_textures
+from .material_cache import get_material_cache_folder, get_settings_hash, get_folder_fingerprint, get_cache_entry_path, load_cached_materials, store_cached_materials, evict_cache_entries
+
+# The generation itself lives here rather than in interface.py so that enabling the add-on
+# doesn't import it: interface.py only imports this module once the operator first runs.
+
+# Generation settings a library root can override, its value for a setting left to the scene
+ROOT_SETTING_OVERRIDES = ('resolution_priority', 'alt_col_handling', 'preview_type')
+SCENE_SETTING = 'SCENE'
+
+def get_texture_naming_conventions(props):
+    """
+    Extracts the naming conventions of every texture type from the add-on settings.
+    """
+    return {
+        "transmission": props.transmission.split(' '),
+        "albedo": props.albedo.split(' '),
+        "ambiant_occlusion": props.ambiant_occlusion.split(' '),
+        "metallic": props.metallic.split(' '),
+        "specular": props.specular.split(' '),
+        "roughness": props.roughness.split(' '),
+        "opacity": props.opacity.split(' '),
+        "bump": props.bump.split(' '),
+        "normal": props.normal.split(' '),
+        "displacement": props.displacement.split(' '),
+        "emission": props.emission.split(' ')
+    }
+
+
+def get_generation_settings(props):
+    """
+    Compiles material and rendering settings from the add-on settings.
+    """
+    extensions_list = props.file_type.split(' ')
+    extensions_tuple = tuple(['.' + ext for ext in extensions_list])
+    return {
+        "file_types": extensions_tuple,
+        "resolution_priority": props.resolution_priority,
+        "target_resolution": int(props.target_resolution),
+        "alt_col_handling": props.alt_col_handling,
+        "texture_setup": props.default_texture_setup,
+        "displacement_type": props.texture_setup_displacement,
+        "displacement_midlevel": props.displacement_mid_level,
+        "displacement_height": props.displacement_height,
+        "gamma": props.texture_setup_default_gamma,
+        "node_groups": props.use_node_groups,
+        "flat_folders": props.flat_folders,
+        "preview_type": props.preview_type,
+        "archive_cache": get_archive_cache_folder(props.archive_cache_folder)
+    }
+
+
+def get_archive_cache_folder(archive_cache_folder):
+    """
+    Returns the folder textures are extracted to from archives.
+
+    Defaults to a folder next to the current .blend, or to the temporary folder for an unsaved file.
+    """
+    if archive_cache_folder:
+        return bpy.path.abspath(archive_cache_folder)
+    if bpy.data.filepath:
+        return os.path.join(os.path.dirname(bpy.data.filepath), ARCHIVE_CACHE_FOLDER_NAME)
+    return os.path.join(tempfile.gettempdir(), ARCHIVE_CACHE_FOLDER_NAME)
+
+
+def get_validation_cache_path():
+    """
+    Returns the path of the texture validation cache, next to the current .blend or in the temporary folder for an unsaved file.
+    """
+    if bpy.data.filepath:
+        return os.path.join(os.path.dirname(bpy.data.filepath), VALIDATION_CACHE_FILE_NAME)
+    return os.path.join(tempfile.gettempdir(), VALIDATION_CACHE_FILE_NAME)
+
+
+def validate_folders_textures(folders, texture_naming_conventions, file_cache, max_workers=4):
+    """
+    Validates the textures the materials of the given folders would load, see validate_textures.
+
+    The invalid textures are left out of the plans built until the end of the run. The plans of
+    a folder that had one are built again, so that the next candidate of the socket, which takes
+    its place, is validated in turn.
+
+    Parameters:
+    - folders (list): The (name, path, root, library) of the material folders of the run.
+
+    Returns:
+    - dict: The problem of each invalid texture.
+    """
+    cache_path = get_validation_cache_path()
+    cache = load_validation_cache(cache_path)
+    checked = set()
+    while folders:
+        textures = {}
+        for folder in folders:
+            name, path, root, library = folder
+            try:
+                plans = build_folder_plans(format_material_name(name), texture_naming_conventions, library['settings'], path, file_cache)
+            except Exception:
+                # The build fails on the same folder and records why
+                continue
+            for texture in get_bound_textures(plans) - checked:
+                textures.setdefault(texture, []).append(folder)
+        problems = validate_textures(textures, cache, file_cache, max_workers)
+        checked.update(problems)
+        invalid = [texture for texture, problem in problems.items() if problem]
+        invalid_textures.update((texture, problems[texture]) for texture in invalid)
+        folders = list({folder[1]: folder for texture in invalid for folder in textures[texture]}.values())
+    save_validation_cache(cache_path, cache)
+    return dict(invalid_textures)
+
+
+def get_preview_path(folder_path, texture_set=None, variant=0):
+    """
+    Returns the path of the rendered preview of a material folder.
+
+    An archive can't be written into, its preview sits next to it as '<archive name>_preview.png'.
+    Each texture set of a flat folder gets its own '<texture set>_preview.png' in the folder.
+    The materials created per color map after the first one get their own '..._preview_alt<n>.png'.
+    """
+    suffix = "_preview" + (f"_alt{variant}" if variant > 1 else "") + ".png"
+    if is_archive(folder_path):
+        return os.path.splitext(folder_path)[0] + ("_" + texture_set if texture_set else "") + suffix
+    if texture_set:
+        return os.path.join(folder_path, texture_set + suffix)
+    return os.path.join(folder_path, suffix[1:])
+
+
+def get_search_index_path():
+    """
+    Returns the path of the library search index, next to the catalog file of the current .blend.
+    """
+    return get_catalog_file_path().parent / INDEX_FILE_NAME
+
+
+def create_cached_materials(formatted_name, folder_path, texture_naming_conventions, settings, existing_materials, file_cache, material_cache):
+    """
+    Creates the materials of a folder from the built material cache, or builds and caches them.
+
+    The cache serves fresh builds, in update mode the materials already in the file are patched instead.
+    """
+    if existing_materials is not None:
+        return create_materials_according_settings(formatted_name, texture_naming_conventions, settings, folder_path, existing_materials, file_cache)
+
+    folder_fingerprint = get_folder_fingerprint(folder_path, settings['file_types'], file_cache, settings['archive_cache'])
+    # Textures the validation left out change the materials, the ones of the folder are part of the key
+    folder_prefix = os.path.join(folder_path, '')
+    invalid = sorted(path[len(folder_prefix):] for path in invalid_textures if path.startswith(folder_prefix))
+    if invalid:
+        folder_fingerprint += "|" + "|".join(invalid)
+    entry_path = get_cache_entry_path(material_cache['folder'], formatted_name, folder_fingerprint, material_cache['settings_hash'])
+    materials = load_cached_materials(entry_path)
+    if materials is not None:
+        data_array = []
+        for mat in materials:
+            plan = json.loads(mat.get('generator_plan', '{"sockets": []}'))
+            albedo = next((s['paths'][0] for s in plan['sockets'] if s['type'] == 'Albedo'), None)
+            data_array.append({'material': mat, 'albedo': albedo, 'status': 'cached', 'texture_set': mat.get('generator_texture_set'), 'variant': mat.get('generator_variant', 0)})
+        return data_array
+
+    data_array = create_materials_according_settings(formatted_name, texture_naming_conventions, settings, folder_path, existing_materials, file_cache)
+    # Cached before being marked as assets, catalogs and tags belong to each project
+    if data_array and all(data['material'] for data in data_array):
+        store_cached_materials(entry_path, [data['material'] for data in data_array])
+    return data_array
+
+
+def create_assets(name, folder_path, texture_naming_conventions, settings, catalog_id ,tags, existing_materials=None, file_cache=None, search_index=None, catalog_path=None, material_cache=None):
+    props = bpy.context.scene.catalog_generator
+    formatted_name = format_material_name(name)
+    if material_cache is not None:
+        data_array = create_cached_materials(formatted_name, folder_path, texture_naming_conventions, settings, existing_materials, file_cache, material_cache)
+    else:
+        data_array = create_materials_according_settings(formatted_name, texture_naming_conventions, settings, folder_path, existing_materials, file_cache)
+    mat_array = []
+    for data in data_array:
+        mat = data['material']
+        if not mat:
+            raise RuntimeError(f"No material could be created for {formatted_name}")
+        if search_index:
+            index_material(search_index['connection'], mat, catalog_path, tags, search_index['dimensions'])
+        # Materials left untouched by the update mode keep their asset data and preview
+        if data['status'] == 'unchanged':
+            mat_array.append(mat)
+            continue
+        mat.use_fake_user = True
+        mat.asset_mark()
+
+        if catalog_id:
+            mat.asset_data.catalog_id = catalog_id
+
+        for tag in tags:
+            mat.asset_data.tags.new(tag, skip_if_exists=True)
+
+        # Sets up the material preview based on the provided settings.
+        preview_image_path = data['albedo']
+        if settings['preview_type'] == 'UseColorMap' and preview_image_path:
+            set_material_preview_with_operator(bpy.context, mat, preview_image_path)
+
+        elif settings['preview_type'] == 'Render':
+            # For render previews, checks if a rerender is necessary and performs it if so.
+            preview_path = get_preview_path(folder_path, data.get('texture_set'), data.get('variant', 0))
+            preview_exist = file_cache.exists(preview_path) if file_cache else os.path.exists(preview_path)
+            # An updated material makes the existing preview stale
+            needs_render = not preview_exist or props.force_rerender or data['status'] not in ('created', 'cached')
+            if needs_render and props.deferred_previews:
+                # The color map stands in for the render until the preview queue gets to it
+                if preview_image_path:
+                    set_material_preview_with_operator(bpy.context, mat, preview_image_path)
+                queue_preview_render(mat, preview_path)
+            else:
+                if needs_render:
+                    render_material_preview(mat, preview_path)
+                    if file_cache:
+                        file_cache.record_written(preview_path)
+                set_material_preview_with_operator(bpy.context, mat, preview_path)
+                clear_queued_preview(mat)
+
+
+        mat_array.append(mat)
+
+    return mat_array
+
+
+def iter_material_folders(folder_path, file_cache, start_path=None):
+    """
+    Yields (name, path, parent folder) for every folder that can hold a material.
+
+    The selected folder itself comes first, with no parent, followed by all of its subfolders in walk order.
+    Zip archives are material folders too, named after the archive without its extension.
+    When a start path inside the library is given, only that folder and its subfolders are yielded.
+    """
+    if start_path is None or os.path.normpath(start_path) == os.path.normpath(folder_path):
+        start_path = folder_path
+        yield os.path.basename(os.path.normpath(folder_path)), folder_path, None
+    else:
+        yield os.path.basename(start_path), start_path, os.path.dirname(start_path)
+
+    for root, dirs, files in file_cache.walk(start_path):
+        for name in dirs:
+            yield name, os.path.join(root, name), root
+        for name in files:
+            if is_archive(name):
+                yield os.path.splitext(name)[0], os.path.join(root, name), root
+
+
+def parse_folder_patterns(text, folder_path):
+    """
+    Splits a list of folders to regenerate, separated by semicolons, into patterns relative to the library.
+
+    Patterns are sub-paths ('Vendor/Wood') or glob patterns ('Vendor/*/Oak*'), absolute paths
+    inside the library are accepted too.
+
+    Raises:
+    - ValueError: If an absolute path is outside of the library.
+    """
+    patterns = []
+    for pattern in text.split(';'):
+        pattern = pattern.strip()
+        if not pattern:
+            continue
+        if os.path.isabs(pattern):
+            relative_path = os.path.relpath(pattern, folder_path)
+            if relative_path.startswith(os.pardir):
+                raise ValueError(f"{pattern} is not inside the library folder")
+            pattern = relative_path
+        patterns.append(pattern.replace('\\', '/').strip('/'))
+    return patterns
+
+
+def get_targeted_roots(text, roots):
+    """
+    Restricts library roots to the folders to regenerate, see parse_folder_patterns.
+
+    The patterns are parsed for each root into its 'patterns'. A relative pattern applies to every
+    root, an absolute path only to the root it is inside. Roots no pattern applies to are left out
+    of the run, without patterns every root is returned as is.
+
+    Raises:
+    - ValueError: If an absolute path is inside none of the roots.
+    """
+    entries = [entry for entry in text.split(';') if entry.strip()]
+    if not entries:
+        return roots
+    root_patterns = [[] for _ in roots]
+    for entry in entries:
+        matched = False
+        for patterns, root in zip(root_patterns, roots):
+            try:
+                patterns += parse_folder_patterns(entry, root['folder'])
+                matched = True
+            except ValueError:
+                continue
+        if not matched:
+            raise ValueError(f"{entry.strip()} is not inside any library root")
+    return [dict(root, patterns=patterns) for patterns, root in zip(root_patterns, roots) if patterns]
+
+
+def match_folder_patterns(relative_path, patterns):
+    """
+    Returns True if a folder, given relative to the library, or one of its parents matches one of the patterns.
+    """
+    parts = relative_path.replace('\\', '/').split('/')
+    prefixes = ['/'.join(parts[:index]) for index in range(1, len(parts) + 1)]
+    return any(fnmatch.fnmatch(prefix, pattern) for prefix in prefixes for pattern in patterns)
+
+
+def get_pattern_start_paths(folder_path, patterns):
+    """
+    Returns the folders to walk to find the folders matching the patterns, their parts before the first wildcard.
+
+    Folders nested in another start path are left out, each folder is only walked once.
+    """
+    start_paths = set()
+    for pattern in patterns:
+        fixed_parts = []
+        for part in pattern.split('/'):
+            if any(character in part for character in '*?['):
+                break
+            fixed_parts.append(part)
+        start_path = os.path.normpath(os.path.join(folder_path, *fixed_parts))
+        if os.path.isdir(start_path) or (is_archive(start_path) and os.path.isfile(start_path)):
+            start_paths.add(start_path)
+    nested = {path for path in start_paths for other in start_paths if path != other and path.startswith(other + os.sep)}
+    return sorted(start_paths - nested)
+
+
+def iter_targeted_material_folders(folder_path, file_cache, patterns=None):
+    """
+    Yields the material folders of a library like iter_material_folders, restricted to the subtrees matching the patterns.
+
+    Only the subtrees of the patterns are walked. The library folder itself never matches a pattern.
+    """
+    if not patterns:
+        yield from iter_material_folders(folder_path, file_cache)
+        return
+    for start_path in get_pattern_start_paths(folder_path, patterns):
+        for name, path, root in iter_material_folders(folder_path, file_cache, start_path):
+            if root is not None and match_folder_patterns(os.path.relpath(path, folder_path), patterns):
+                yield name, path, root
+
+
+def remove_folders_materials(folder_paths):
+    """
+    Removes the materials generated from folders that no longer exist, and their search index entries.
+    """
+    props = bpy.context.scene.catalog_generator
+    source_folders = {normalize_source_folder(path) for path in folder_paths}
+    # The texture sets of a flat folder have their own source under the folder, a path that doesn't exist
+    source_folders |= {
+        source_folder for source_folder, _ in index_generated_materials()
+        if os.path.dirname(source_folder) in source_folders and not os.path.exists(source_folder)
+    }
+    removed = remove_generated_materials(source_folders)
+    if props.use_search_index:
+        try:
+            conn = open_search_index(get_search_index_path())
+        except FileNotFoundError as e:
+            print(e)
+        else:
+            remove_source_folders(conn, source_folders)
+            conn.commit()
+            conn.close()
+    return removed
+
+
+def clear_index_coverage(folder_paths):
+    """
+    Records that the search index no longer holds every generated material of the given libraries,
+    after they were generated without it. Nothing is done when there is no index yet.
+    """
+    try:
+        index_path = get_search_index_path()
+    except FileNotFoundError:
+        return
+    if not os.path.exists(index_path):
+        return
+    conn = open_search_index(index_path)
+    for folder_path in folder_paths:
+        set_library_coverage(conn, normalize_source_folder(folder_path), False)
+    conn.commit()
+    conn.close()
+
+
+def get_library_roots(props):
+    """
+    Returns the enabled library roots of the settings, to generate in a single run with create_library_roots.
+
+    Each root is a dictionary holding its 'folder', its 'catalog_prefix' and the generation
+    settings it 'overrides', the ones it doesn't leave to the scene setting.
+    """
+    roots = []
+    for library_root in props.library_roots:
+        if not library_root.enabled or not library_root.folder:
+            continue
+        overrides = {key: getattr(library_root, key) for key in ROOT_SETTING_OVERRIDES if getattr(library_root, key) != SCENE_SETTING}
+        roots.append({'folder': bpy.path.abspath(library_root.folder), 'catalog_prefix': library_root.catalog_prefix, 'overrides': overrides})
+    return roots
+
+
+def create_shaders_tree(folder_path, only_folders=None, update_existing=None, patterns=None):
+    """
+    Generates the materials of a library folder and of all its subfolders.
+
+    Catalogs and tags are always derived from folder_path, the library root. When only_folders
+    is given, only the materials of those folders are (re)generated. update_existing overrides
+    the update mode setting, so that incremental callers always patch instead of duplicating.
+
+    patterns restricts the run to the subtrees matching them, see parse_folder_patterns. Only
+    those subtrees are walked, and their existing materials are patched in place, found through
+    the search index when it is enabled.
+
+    A folder that raises is cleaned up and recorded in the run report, the others are still generated.
+
+    Raises:
+    - RuntimeError: If the installed Octane build lacks a node or socket the generator uses.
+
+    Returns:
+    - dict: The run report, with the 'errors' met and the 'failed_folders' left after the retry.
+    """
+    return create_library_roots([{'folder': folder_path, 'catalog_prefix': '', 'overrides': {}}], only_folders, update_existing, patterns)
+
+
+def create_library_roots(roots, only_folders=None, update_existing=None, patterns=None):
+    """
+    Generates the materials of several library roots in a single run, see create_shaders_tree.
+
+    The roots share what a run loads or reads once: the loaded images, the file metadata cache,
+    the catalogs of the catalog file, the index of the materials already generated and the
+    search index. Each root nests its catalogs in its own catalog prefix, and its settings
+    overrides replace the scene settings for its materials. A root is restricted by its own
+    'patterns' when it has some, see get_targeted_roots, and by patterns otherwise.
+
+    Parameters:
+    - roots (list): The roots to generate, dictionaries holding their 'folder', 'catalog_prefix' and 'overrides'.
+
+    Raises:
+    - RuntimeError: If the installed Octane build lacks a node or socket the generator uses.
+
+    Returns:
+    - dict: The run report, with a summary of each root in 'roots'.
+    """
+    props = bpy.context.scene.catalog_generator
+    use_catalog_tree = props.use_catalog_tree
+    use_tags = props.use_tags
+    start_phase('setup')
+    invalid_textures.clear()
+    invalidate_image_index()
+
+    # Fails before anything is built if the installed Octane renamed a node or socket the generator uses
+    get_socket_schema()
+
+    texture_naming_conventions = get_texture_naming_conventions(props)
+    settings = get_generation_settings(props)
+
+    # In update mode, existing generated materials are looked up by source folder and patched
+    targeted = any(root.get('patterns', patterns) for root in roots)
+    if update_existing is None:
+        update_existing = props.update_existing or targeted
+    if only_folders is not None:
+        only_folders = {normalize_source_folder(path) for path in only_folders}
+
+    # The search index sits next to the library .blend, it can't be written for an unsaved file
+    search_index = None
+    if props.use_search_index:
+        try:
+            search_index = {'connection': open_search_index(get_search_index_path()), 'dimensions': {}}
+        except FileNotFoundError as e:
+            print(e)
+    else:
+        # Materials built without the index aren't in it, it no longer covers these roots
+        clear_index_coverage([root['folder'] for root in roots])
+
+    # A targeted run looks up the materials of each folder in the search index instead of scanning
+    # all materials, once the index holds every generated material of the roots it targets
+    use_index_lookup = targeted and update_existing and search_index is not None and all(
+        is_library_covered(search_index['connection'], normalize_source_folder(root['folder'])) for root in roots
+    )
+    existing_materials = None
+    if update_existing:
+        existing_materials = {} if use_index_lookup else index_generated_materials()
+
+    def find_existing_materials(path):
+        nonlocal use_index_lookup
+        # A folder without rows has no materials. An indexed material renamed or removed since
+        # makes the file be scanned once instead
+        found = {}
+        for (source_folder, variant), material_name in find_source_folder_materials(search_index['connection'], normalize_source_folder(path)).items():
+            mat = bpy.data.materials.get(material_name)
+            if mat is None or mat.get('generator_source_folder') != source_folder:
+                use_index_lookup = False
+                existing_materials.update(index_generated_materials())
+                return
+            found[(source_folder, variant)] = mat
+        existing_materials.update(found)
+
+    generated_materials = []
+
+    # Catalogs are read from the catalog file once per run, new ones can get IDs derived from the library namespace
+    known_catalogs = {}
+    material_cache_folder = get_material_cache_folder(props.material_cache_folder) if props.use_material_cache else None
+    libraries = []
+    for library_root in roots:
+        library = dict(library_root, settings=dict(settings, **library_root['overrides']), patterns=library_root.get('patterns', patterns), namespace=None, material_cache=None)
+        if props.deterministic_catalog_ids:
+            library['namespace'] = props.catalog_namespace or os.path.basename(os.path.normpath(library['folder']))
+        # Built materials are shared between projects through a cache of .blend files
+        if material_cache_folder:
+            library['material_cache'] = {'folder': material_cache_folder, 'settings_hash': get_settings_hash(texture_naming_conventions, library['settings'])}
+        libraries.append(library)
+
+    report = start_run_report(roots[0]['folder'], settings, roots)
+
+    # Materials and images that existed before a folder started, what a failed folder created is removed
+    known_datablocks = snapshot_datablocks()
+
+    def create_folder_assets(name, path, root, file_cache, library):
+        folder_path = library['folder']
+        # The selected folder itself gets the formatted folder name and no catalog or tags
+        if root is None:
+            return create_assets(format_material_name(name), path, texture_naming_conventions, library['settings'], None, [], existing_materials, file_cache, search_index, None, library['material_cache'])
+
+        # Applies tags and possibly catalog IDs based on the folder hierarchy
+        tags = []
+        if use_tags:
+            relative_path = Path(root).relative_to(folder_path)
+            tags = [format_material_name(part) for part in relative_path.parts]
+
+        catalog_id = None
+        # Only modify blender_assets.cats.txt and set catalog_id if use_catalog_tree is True
+        if use_catalog_tree:
+            catalog_id = get_or_create_catalog(path, folder_path, library['namespace'], known_catalogs, library['catalog_prefix'])
+        catalog_path = get_catalog_path(path, folder_path, library['catalog_prefix'])
+        return create_assets(name, path, texture_naming_conventions, library['settings'], catalog_id, tags, existing_materials, file_cache, search_index, catalog_path, library['material_cache'])
+
+    def process_folder(name, path, root, file_cache, attempt, library):
+        # A failing folder is cleaned up and recorded, the run goes on with the next one
+        start = time.perf_counter()
+        start_folder(path)
+        if use_index_lookup:
+            find_existing_materials(path)
+        if search_index:
+            search_index['connection'].execute("SAVEPOINT folder")
+        try:
+            materials = create_folder_assets(name, path, root, file_cache, library)
+        except Exception as e:
+            if search_index:
+                search_index['connection'].execute("ROLLBACK TO folder")
+                search_index['connection'].execute("RELEASE folder")
+            discard_new_datablocks(known_datablocks, existing_materials)
+            record_error(report, path, e, attempt, library['folder'])
+            finish_folder(0, True, attempt)
+            print(f"Failed to generate {path}: {e!r}")
+            return False
+        if search_index:
+            search_index['connection'].execute("RELEASE folder")
+        known_datablocks['materials'].update(materials)
+        record_folder(report, path, time.perf_counter() - start, materials, library['folder'])
+        finish_folder(len(materials), False, attempt)
+        generated_materials.extend(materials)
+        return True
+
+    def iter_run_folders(file_cache):
+        # The material folders of every root this run generates
+        for library in libraries:
+            for name, path, root in iter_targeted_material_folders(library['folder'], file_cache, library['patterns']):
+                if only_folders is None or normalize_source_folder(path) in only_folders:
+                    record_folder_discovered()
+                    yield name, path, root, library
+
+    # Every listing and stat of this run goes through one metadata cache
+    with FileMetadataCache() as file_cache:
+        run_folders = iter_run_folders(file_cache)
+        # Textures are checked out of process before anything is built, a corrupt one can stall Blender or Octane
+        if props.validate_textures:
+            start_phase('validation')
+            run_folders = list(run_folders)
+            record_invalid_textures(report, validate_folders_textures(run_folders, texture_naming_conventions, file_cache, props.validation_workers))
+
+        start_phase('generate')
+        failed_folders = []
+        for name, path, root, library in run_folders:
+            if not process_folder(name, path, root, file_cache, 1, library):
+                failed_folders.append((name, path, root, library))
+
+        # Failures caused by a transient state (a file still being written, a busy share) get a second chance
+        if props.retry_failed_folders and failed_folders:
+            start_phase('retry')
+            failed_folders = [(name, path, root, library) for name, path, root, library in failed_folders if not process_folder(name, path, root, file_cache, 2, library)]
+        report['failed_folders'] = [path for _, path, _, _ in failed_folders]
+
+    # Timings are kept to calibrate the estimates of the preflight report
+    start_phase('finish')
+    invalid_textures.clear()
+    summarize_roots(report)
+    save_run_report(report)
+
+    if search_index:
+        # A full run without failures indexed every generated material of its roots
+        if not targeted and only_folders is None and not failed_folders:
+            for root in roots:
+                set_library_coverage(search_index['connection'], normalize_source_folder(root['folder']), True)
+        search_index['connection'].commit()
+        search_index['connection'].close()
+
+    if material_cache_folder:
+        start_phase('cache eviction')
+        evict_cache_entries(material_cache_folder, props.material_cache_max_size * 1024 * 1024, props.material_cache_max_age * 24 * 3600)
+
+    # Proxies of every bound texture are built by background processes once the materials exist
+    tiers = parse_proxy_tiers(props.proxy_tiers)
+    if props.build_proxies and tiers:
+        try:
+            proxy_folder = get_proxy_folder(props.proxy_folder)
+        except FileNotFoundError as e:
+            print(e)
+        else:
+            start_phase('proxies')
+            texture_paths = [get_full_resolution_path(image) for image in get_material_images(generated_materials)]
+            generate_proxies(texture_paths, tiers, proxy_folder, props.proxy_workers)
+
+    end_phase()
+    return report
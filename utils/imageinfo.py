@@ -0,0 +1,180 @@
+import os
+import struct
+from .archives import open_texture
+
+# Number of channels stored for each PNG colour type
+PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+
+# Bits per channel for each OpenEXR pixel type (UINT, HALF, FLOAT)
+EXR_BIT_DEPTH = {0: 32, 1: 16, 2: 32}
+
+# JPEG start-of-frame markers, the ones that carry the image dimensions
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def read_image_header(path):
+    """
+    Reads the dimensions, channel count and bit depth of an image from its header only.
+
+    Supports PNG, JPEG, OpenEXR, TIFF and Radiance HDR without decoding any pixel, so that
+    texture sizes can be known without loading the image in Blender. The path can point
+    inside a zip archive.
+
+    Returns:
+    - dict: {'format', 'width', 'height', 'channels', 'bit_depth'}, or None if the format isn't recognised.
+
+    Raises:
+    - ValueError: If the header is truncated or corrupt.
+    - OSError: If the file can't be read.
+    """
+    with open_texture(path) as file:
+        magic = file.read(8)
+        file.seek(0)
+        if magic.startswith(b"\x89PNG\r\n\x1a\n"):
+            return read_png_header(file)
+        if magic.startswith(b"\xff\xd8"):
+            return read_jpeg_header(file)
+        if magic.startswith(b"\x76\x2f\x31\x01"):
+            return read_exr_header(file)
+        if magic.startswith(b"II*\x00") or magic.startswith(b"MM\x00*"):
+            return read_tiff_header(file)
+        if magic.startswith(b"#?"):
+            return read_hdr_header(file)
+    return None
+
+
+def read_exactly(file, size):
+    # Reads size bytes, a shorter read means the file is truncated
+    data = file.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated image header")
+    return data
+
+
+def read_png_header(file):
+    data = read_exactly(file, 29)
+    if data[12:16] != b"IHDR":
+        raise ValueError("PNG without IHDR chunk")
+    width, height, bit_depth, color_type = struct.unpack(">IIBB", data[16:26])
+    if color_type not in PNG_CHANNELS:
+        raise ValueError(f"Unknown PNG colour type {color_type}")
+    # Palette images are expanded to 8 bits per channel once decoded
+    if color_type == 3:
+        bit_depth = 8
+    return {'format': 'PNG', 'width': width, 'height': height, 'channels': PNG_CHANNELS[color_type], 'bit_depth': bit_depth}
+
+
+def read_jpeg_header(file):
+    read_exactly(file, 2)
+    while True:
+        marker = read_exactly(file, 2)
+        if marker[0] != 0xFF:
+            raise ValueError("Corrupt JPEG marker")
+        # Fill bytes may precede a marker
+        while marker[1] == 0xFF:
+            marker = marker[1:] + read_exactly(file, 1)
+        code = marker[1]
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        if code == 0xD9:
+            raise ValueError("JPEG without frame header")
+        length = struct.unpack(">H", read_exactly(file, 2))[0]
+        if code in JPEG_SOF_MARKERS:
+            bit_depth, height, width, channels = struct.unpack(">BHHB", read_exactly(file, 6))
+            return {'format': 'JPEG', 'width': width, 'height': height, 'channels': channels, 'bit_depth': bit_depth}
+        file.seek(length - 2, os.SEEK_CUR)
+
+
+def read_exr_header(file):
+    read_exactly(file, 8)
+    width = height = None
+    channels = []
+    while True:
+        name = read_null_terminated(file)
+        # An empty attribute name ends the header
+        if not name:
+            break
+        attribute_type = read_null_terminated(file)
+        size = struct.unpack("<i", read_exactly(file, 4))[0]
+        value = read_exactly(file, size)
+        if name == b"dataWindow" and attribute_type == b"box2i":
+            x_min, y_min, x_max, y_max = struct.unpack("<iiii", value)
+            width, height = x_max - x_min + 1, y_max - y_min + 1
+        elif name == b"channels" and attribute_type == b"chlist":
+            offset = 0
+            while offset < len(value) and value[offset] != 0:
+                end = value.index(b"\x00", offset)
+                pixel_type = struct.unpack("<i", value[end + 1:end + 5])[0]
+                channels.append(pixel_type)
+                offset = end + 1 + 16
+    if width is None or not channels:
+        raise ValueError("EXR header without data window or channels")
+    return {'format': 'EXR', 'width': width, 'height': height, 'channels': len(channels), 'bit_depth': max(EXR_BIT_DEPTH.get(t, 32) for t in channels)}
+
+
+def read_null_terminated(file, limit=256):
+    # Reads a null terminated attribute name or type of an EXR header
+    data = bytearray()
+    while True:
+        byte = read_exactly(file, 1)
+        if byte == b"\x00":
+            return bytes(data)
+        data += byte
+        if len(data) > limit:
+            raise ValueError("Corrupt EXR attribute")
+
+
+def read_tiff_header(file):
+    order = "<" if read_exactly(file, 2) == b"II" else ">"
+    read_exactly(file, 2)
+    ifd_offset = struct.unpack(order + "I", read_exactly(file, 4))[0]
+    file.seek(ifd_offset)
+    entry_count = struct.unpack(order + "H", read_exactly(file, 2))[0]
+    entries = read_exactly(file, entry_count * 12)
+
+    tags = {}
+    for index in range(entry_count):
+        tag, field_type, count, value = struct.unpack(order + "HHI4s", entries[index * 12:index * 12 + 12])
+        # SHORT values are stored left-aligned in the value field, LONG fill it
+        if field_type == 3:
+            tags[tag] = struct.unpack(order + "H", value[:2])[0]
+        elif field_type == 4:
+            tags[tag] = struct.unpack(order + "I", value)[0]
+        if tag == 258 and count > 2:
+            # BitsPerSample for several samples points to an array, its first value is enough
+            position = file.tell()
+            file.seek(struct.unpack(order + "I", value)[0])
+            tags[tag] = struct.unpack(order + "H", read_exactly(file, 2))[0]
+            file.seek(position)
+        elif tag == 258 and count == 2:
+            tags[tag] = struct.unpack(order + "H", value[:2])[0]
+
+    if 256 not in tags or 257 not in tags:
+        raise ValueError("TIFF without dimensions")
+    return {'format': 'TIFF', 'width': tags[256], 'height': tags[257], 'channels': tags.get(277, 1), 'bit_depth': tags.get(258, 1)}
+
+
+def read_hdr_header(file):
+    # Text header lines until an empty line, followed by the resolution line
+    for _ in range(64):
+        line = file.readline(1024)
+        if not line:
+            raise ValueError("Truncated HDR header")
+        if line.strip() == b"":
+            break
+    parts = file.readline(256).split()
+    if len(parts) != 4:
+        raise ValueError("HDR without resolution line")
+    dimensions = {parts[0][-1:]: int(parts[1]), parts[2][-1:]: int(parts[3])}
+    if b"X" not in dimensions or b"Y" not in dimensions:
+        raise ValueError("HDR without resolution line")
+    return {'format': 'HDR', 'width': dimensions[b"X"], 'height': dimensions[b"Y"], 'channels': 3, 'bit_depth': 32}
+
+
+def get_decoded_size(info):
+    """
+    Returns the memory footprint in bytes of an image once decoded, from its header information.
+
+    Sub-byte depths (1 bit masks, palettes) are counted as 8 bits per channel, as they are once loaded.
+    """
+    return info['width'] * info['height'] * info['channels'] * max(info['bit_depth'], 8) // 8
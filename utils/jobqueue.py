@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import socket
+import threading
+from contextlib import contextmanager
+
+# The queue is a folder on a share every machine can reach, one subfolder per job state.
+# A job moves between them with os.rename, which is atomic on a single filesystem: the
+# worker whose rename succeeds owns the job, the others get a FileNotFoundError.
+QUEUE_FILE_NAME = "queue.json"
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+MERGED = "merged"
+SHARDS = "shards"
+
+# Separates the job ID from the worker ID in the name of a claim or a shard
+CLAIM_SEPARATOR = "@"
+# Suffix of a claim its worker is completing, only that worker writes to it
+COMPLETING = ".completing"
+
+
+def get_worker_id():
+    """
+    Returns an ID unique to this process among the machines sharing the queue.
+    """
+    return f"{socket.gethostname()}-{os.getpid()}".replace(CLAIM_SEPARATOR, "-")
+
+
+def write_json_atomically(path, data):
+    # Written to a temporary file first, a reader never sees a partial job or record
+    temporary = f"{path}.{get_worker_id()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=1)
+    os.replace(temporary, path)
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def list_jobs(queue_folder, state):
+    try:
+        names = os.listdir(os.path.join(queue_folder, state))
+    except FileNotFoundError:
+        return []
+    # Temporary files of a write in progress aren't jobs yet
+    return sorted(name for name in names if name.endswith(".json"))
+
+
+def create_job_queue(queue_folder, library_folder, partitions):
+    """
+    Writes the jobs of a distributed build, one per partition of material folders.
+
+    Parameters:
+    - queue_folder (str): The shared folder of the queue.
+    - library_folder (str): The library root, as seen by the coordinator.
+    - partitions (list): Lists of material folders relative to the library root, '' for the root itself.
+
+    Raises:
+    - FileExistsError: If the folder already holds a queue.
+
+    Returns:
+    - int: The number of jobs written.
+    """
+    if os.path.exists(os.path.join(queue_folder, QUEUE_FILE_NAME)):
+        raise FileExistsError(f"{queue_folder} already holds a job queue")
+    for state in (PENDING, CLAIMED, DONE, MERGED, SHARDS):
+        os.makedirs(os.path.join(queue_folder, state), exist_ok=True)
+
+    for index, folders in enumerate(partitions):
+        job_id = f"{index:06d}"
+        write_json_atomically(os.path.join(queue_folder, PENDING, job_id + ".json"), {'id': job_id, 'folders': folders})
+    # Written last, a queue file means every job is there
+    write_json_atomically(os.path.join(queue_folder, QUEUE_FILE_NAME), {
+        'library': library_folder,
+        'jobs': len(partitions),
+        'created': time.time(),
+    })
+    return len(partitions)
+
+
+def read_queue(queue_folder):
+    """
+    Returns the description of a queue, or None if the folder doesn't hold a complete one.
+    """
+    try:
+        return read_json(os.path.join(queue_folder, QUEUE_FILE_NAME))
+    except FileNotFoundError:
+        return None
+
+
+def claim_job(queue_folder, worker_id):
+    """
+    Claims the first pending job for a worker.
+
+    Returns:
+    - tuple: (job, claim path), or None when no job is pending.
+    """
+    for name in list_jobs(queue_folder, PENDING):
+        pending_path = os.path.join(queue_folder, PENDING, name)
+        claim_path = os.path.join(queue_folder, CLAIMED, f"{name[:-len('.json')]}{CLAIM_SEPARATOR}{worker_id}.json")
+        try:
+            # A rename keeps the modification time, the job is touched so that it isn't taken for a stale claim
+            os.utime(pending_path)
+            os.rename(pending_path, claim_path)
+            os.utime(claim_path)
+            return read_json(claim_path), claim_path
+        except FileNotFoundError:
+            # Another worker was faster
+            continue
+    return None
+
+
+@contextmanager
+def keep_claim_alive(claim_path, interval):
+    """
+    Touches a claim every interval seconds for the duration of the block, the heartbeat of its worker.
+
+    A worker that died stops touching its claims, they become stale and go back to the pending jobs.
+    """
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(interval):
+            try:
+                os.utime(claim_path)
+            except FileNotFoundError:
+                return
+
+    thread = threading.Thread(target=beat, name="job heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def get_shard_path(queue_folder, claim_path):
+    """
+    Returns the .blend file the materials of a claimed job are written to.
+    """
+    return os.path.join(queue_folder, SHARDS, os.path.basename(claim_path)[:-len('.json')] + ".blend")
+
+
+def complete_job(queue_folder, job, claim_path, record):
+    """
+    Marks a claimed job as done, with its completion record.
+
+    The claim is first renamed to a path private to its worker, so that it can't be released as
+    stale while the record is written over it, and then moves to the done jobs. A worker that
+    dies in between leaves a stale claim, and the job is built again.
+
+    Returns:
+    - bool: False if the claim was lost, released as stale while the job was built.
+    """
+    completing_path = claim_path[:-len('.json')] + COMPLETING + ".json"
+    try:
+        os.rename(claim_path, completing_path)
+    except FileNotFoundError:
+        return False
+    write_json_atomically(completing_path, dict(job, **record, finished=time.time()))
+    os.replace(completing_path, os.path.join(queue_folder, DONE, job['id'] + ".json"))
+    return True
+
+
+def release_stale_claims(queue_folder, timeout):
+    """
+    Puts back into the pending jobs the claims that haven't been touched for timeout seconds.
+
+    Any process can release stale claims. The timeout must be well above the heartbeat interval
+    and the clock difference between the machines.
+
+    Returns:
+    - list: The IDs of the released jobs.
+    """
+    released = []
+    now = time.time()
+    for name in list_jobs(queue_folder, CLAIMED):
+        claim_path = os.path.join(queue_folder, CLAIMED, name)
+        job_id = name.split(CLAIM_SEPARATOR)[0]
+        try:
+            if now - os.stat(claim_path).st_mtime < timeout:
+                continue
+            os.rename(claim_path, os.path.join(queue_folder, PENDING, job_id + ".json"))
+        except FileNotFoundError:
+            continue
+        released.append(job_id)
+    return released
+
+
+def iter_done_jobs(queue_folder):
+    """
+    Yields (record, record path) for every job done and not merged yet.
+    """
+    for name in list_jobs(queue_folder, DONE):
+        record_path = os.path.join(queue_folder, DONE, name)
+        try:
+            yield read_json(record_path), record_path
+        except FileNotFoundError:
+            continue
+
+
+def mark_job_merged(queue_folder, record_path):
+    """
+    Moves a done job to the merged ones, once its materials are saved in the library.
+    """
+    os.replace(record_path, os.path.join(queue_folder, MERGED, os.path.basename(record_path)))
+
+
+def get_queue_status(queue_folder):
+    """
+    Returns the number of jobs in each state.
+    """
+    return {state: len(list_jobs(queue_folder, state)) for state in (PENDING, CLAIMED, DONE, MERGED)}
@@ -0,0 +1,168 @@
+import bpy
+import os
+import re
+import json
+import time
+import hashlib
+from .materials import normalize_source_folder, image_index, index_loaded_images
+from .archives import is_archive
+
+CACHE_FOLDER_NAME = "material_cache"
+
+# Suffix Blender appends to the name of a datablock when the name is taken, e.g. 'Name.001'
+DUPLICATE_SUFFIX = re.compile(r"\.\d{3}$")
+
+# Settings that don't change the built materials and stay out of the cache key. The archive cache
+# only changes the materials of archives, it is part of their folder fingerprint instead.
+UNCACHED_SETTINGS = ('preview_type', 'archive_cache')
+
+
+def get_material_cache_folder(material_cache_folder):
+    """
+    Returns the folder of the built material cache, shared by every project of the user by default.
+    """
+    if material_cache_folder:
+        return bpy.path.abspath(material_cache_folder)
+    return bpy.utils.user_resource('DATAFILES', path=CACHE_FOLDER_NAME, create=True)
+
+
+def get_settings_hash(keys, settings):
+    """
+    Returns a hash of the naming conventions and generation settings that shape the built materials.
+    """
+    payload = {
+        'keys': keys,
+        'settings': {key: value for key, value in settings.items() if key not in UNCACHED_SETTINGS},
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def get_folder_fingerprint(folder_path, file_types, file_cache=None, archive_cache=None):
+    """
+    Returns a hash of the texture files of a material folder, their names, sizes and modification times.
+
+    An archive is fingerprinted by its own size and modification time, and by the archive cache
+    folder: its materials are bound to the textures extracted there, which belong to a project.
+    """
+    if is_archive(folder_path):
+        stat = os.stat(folder_path)
+        entries = [(os.path.basename(folder_path), stat.st_size, stat.st_mtime), os.path.normcase(os.path.abspath(archive_cache or ''))]
+    else:
+        files = file_cache.listdir(folder_path)[1] if file_cache else os.listdir(folder_path)
+        entries = []
+        for name in sorted(files):
+            if not name.lower().endswith(file_types):
+                continue
+            path = os.path.join(folder_path, name)
+            if file_cache:
+                entries.append((name, file_cache.size(path), file_cache.mtime(path)))
+            else:
+                stat = os.stat(path)
+                entries.append((name, stat.st_size, stat.st_mtime))
+    payload = {'folder': normalize_source_folder(folder_path), 'files': entries}
+    return hashlib.sha1(json.dumps(payload).encode('utf-8')).hexdigest()
+
+
+def get_cache_entry_path(cache_folder, mat_name, folder_fingerprint, settings_hash):
+    """
+    Returns the .blend file caching the materials of a folder built with the given settings.
+    """
+    key = hashlib.sha1(f"{mat_name}|{folder_fingerprint}|{settings_hash}".encode('utf-8')).hexdigest()
+    return os.path.join(cache_folder, key[:2], key + ".blend")
+
+
+def load_cached_materials(entry_path):
+    """
+    Appends the materials of a cache entry to the current file.
+
+    Images and node groups already in the file are used instead of the appended copies. Images
+    are found through the index of the loaded images, see materials.load_image.
+
+    Returns:
+    - list: The appended materials, or None if there is no such entry.
+    """
+    if not os.path.exists(entry_path):
+        return None
+
+    # Indexed before appending, the appended copies stay out of the index until they are kept
+    if image_index['stale']:
+        index_loaded_images()
+    with bpy.data.libraries.load(entry_path, link=False) as (data_from, data_to):
+        data_to.materials = list(data_from.materials)
+        data_to.images = list(data_from.images)
+        data_to.node_groups = list(data_from.node_groups)
+
+    appended_images = {image for image in data_to.images if image is not None}
+    for image in appended_images:
+        existing = image_index['images'].get(image.filepath)
+        try:
+            # An image removed or repointed since it was indexed isn't the texture anymore
+            existing = existing if existing is not None and existing.filepath == image.filepath else None
+        except ReferenceError:
+            existing = None
+        if existing is not None and existing not in appended_images:
+            image.user_remap(existing)
+            bpy.data.images.remove(image)
+        else:
+            image_index['images'][image.filepath] = image
+
+    appended_groups = {group for group in data_to.node_groups if group is not None}
+    for group in appended_groups:
+        existing = bpy.data.node_groups.get(DUPLICATE_SUFFIX.sub("", group.name))
+        if existing is not None and existing not in appended_groups:
+            group.user_remap(existing)
+            bpy.data.node_groups.remove(group)
+
+    # The modification time orders entries for eviction, least recently used first
+    os.utime(entry_path)
+    return [mat for mat in data_to.materials if mat is not None]
+
+
+def store_cached_materials(entry_path, materials):
+    """
+    Writes built materials, with the images and node groups they use, to a cache entry.
+
+    The entry is written to a temporary file first, a cache entry is always complete.
+    """
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    temporary = f"{entry_path[:-len('.blend')]}.{os.getpid()}.tmp.blend"
+    bpy.data.libraries.write(temporary, set(materials), path_remap='ABSOLUTE', fake_user=True, compress=True)
+    os.replace(temporary, entry_path)
+
+
+def evict_cache_entries(cache_folder, max_size, max_age):
+    """
+    Removes the cache entries unused for more than max_age seconds, then the least recently used
+    ones until the cache is below max_size bytes. A limit of 0 disables it.
+
+    Returns:
+    - int: The number of entries removed.
+    """
+    entries = []
+    for root, _, files in os.walk(cache_folder):
+        for name in files:
+            # Entries being written by another process are left alone
+            if name.endswith(".blend") and not name.endswith(".tmp.blend"):
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+
+    now = time.time()
+    total_size = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, path in entries:
+        too_old = max_age and now - mtime > max_age
+        too_big = max_size and total_size > max_size
+        if not too_old and not too_big:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+        removed += 1
+    return removed
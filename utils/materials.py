@@ -1,40 +1,48 @@
 import bpy
 import os
+import json
+import math
+import hashlib
 from pathlib import Path
-from .parsing import match_files_to_keys, fetch_files_at_path
-from .constants import GAP, OCTANE_NODE, UNIVERSAL_MATERIAL_SOCKET, TEXTURE_EMISSION_SOCKET, IMAGE_TEXTURE_SOCKET, DISPLACEMENT_SOCKET, MULTIPLY_TEXTURE_SOCKET, TRANSFORM_SOCKET, NODE_POSITION
+from .parsing import format_material_name, match_files_to_keys, fetch_files_at_path, parse_resolution_token, remove_resolution_token, group_texture_sets
+from .imageinfo import read_image_header
+from .archives import is_archive, get_archive_entry_size, extract_archive_entry
+from .constants import GAP, OCTANE_NODE, UNIVERSAL_MATERIAL_SOCKET, TEXTURE_EMISSION_SOCKET, IMAGE_TEXTURE_SOCKET, DISPLACEMENT_SOCKET, MULTIPLY_TEXTURE_SOCKET, TRANSFORM_SOCKET, TEXTURE_SETUP_SOCKET, UNIVERSAL_MATERIAL_OUTPUT_SOCKET, MATERIAL_OUTPUT_SOCKET, NODE_POSITION
+from .node_groups import get_texture_setup_parts, create_texture_setup_node
+from .texture_validation import invalid_textures
+from .sockets import get_input, get_output
 
 def create_link(links, from_node, from_socket_name, to_node, to_socket_name):
     """
     Check for existence of sockets on both nodes and create a link if both exist.
+
+    Sockets are found through the socket schema resolved once per node type, see utils/sockets.py.
     """
-    if to_socket_name in to_node.inputs and from_socket_name in from_node.outputs:
-        return links.new(to_node.inputs[to_socket_name], from_node.outputs[from_socket_name])
+    to_socket = get_input(to_node, to_socket_name)
+    from_socket = get_output(from_node, from_socket_name)
+    if to_socket is not None and from_socket is not None:
+        return links.new(to_socket, from_socket)
     return None
 
 
-def create_empty_material(mat_name):
+def create_empty_material(mat_name, material=None):
     """
     Creates a new material with no nodes except for an OctaneUniversalMaterial node
     and a MaterialOutput node.
-    """
-    unique_name = mat_name
-    i = 1  # Start counter for suffixes
-
-    # Loop to find a unique name by appending a number
-    while unique_name in bpy.data.materials:
-        unique_name = f"{mat_name}.{str(i).zfill(3)}"  # Append a suffix like .001, .002, etc.
-        i += 1
 
-    # Create a new material
-    mat = bpy.data.materials.new(name=unique_name)
+    If an existing material is given, its node tree is cleared and reused instead.
+    """
+    if material is None:
+        # Create a new material, Blender appends a suffix like .001, .002, etc. to a name already taken
+        mat = bpy.data.materials.new(name=mat_name)
+    else:
+        mat = material
     mat.use_nodes = True
     nodes = mat.node_tree.nodes
     links = mat.node_tree.links
 
-    # Clear default nodes
-    for node in nodes:
-        nodes.remove(node)
+    # Clear default nodes, or every node of a material being rebuilt
+    nodes.clear()
 
     # Create and configure the OctaneUniversalMaterial node
     universal_node = nodes.new(OCTANE_NODE['UniversalMaterial'])
@@ -45,37 +53,93 @@ def create_empty_material(mat_name):
     output_node.location = NODE_POSITION['MaterialOutput']
 
     # Link the OctaneUniversalMaterial node to the MaterialOutput node
-    create_link(links, universal_node, 'Material out', output_node, 'Surface')
+    create_link(links, universal_node, UNIVERSAL_MATERIAL_OUTPUT_SOCKET['Out'], output_node, MATERIAL_OUTPUT_SOCKET['Surface'])
 
     return {'material': mat, 'nodes': nodes, 'links': links, 'universal': universal_node, 'output': output_node}
 
 
-def create_texture_node(nodes, texture_type, texture_path, location, gamma = 2.2):
+# Loaded images by texture path, so that finding a loaded texture doesn't scan every image of the file.
+# A stale index is rebuilt on the next lookup miss, see invalidate_image_index.
+image_index = {'images': {}, 'stale': True}
+
+
+def index_loaded_images():
+    # Maps the path of every loaded image, and the full resolution path of the ones switched to a proxy, to the image
+    images = {}
+    for img in bpy.data.images:
+        images.setdefault(img.filepath, img)
+        full_path = img.get('generator_full_path')
+        if full_path:
+            images.setdefault(full_path, img)
+    image_index['images'] = images
+    image_index['stale'] = False
+
+
+def invalidate_image_index():
     """
-    Creates a texture node within a material's node tree.
+    Marks the index of the loaded images as stale, at the start of a run: images can have been
+    loaded or appended since the last one. Within a run, images are added through load_image and
+    the material cache, which keep the index up to date.
     """
+    image_index['stale'] = True
+
+
+def get_indexed_image(texture_path):
+    # The indexed image of a texture path, None if an image removed or repointed since it was indexed
+    image = image_index['images'].get(texture_path)
+    if image is None:
+        return None
+    try:
+        indexed = image.filepath == texture_path or image.get('generator_full_path') == texture_path
+    except ReferenceError:
+        indexed = False
+    return image if indexed else None
+
 
-    # Check if the texture is already loaded
-    image = next((img for img in bpy.data.images if img.filepath == texture_path), None)
+def load_image(texture_path):
+    """
+    Returns the image datablock for a texture path, loading it only if it isn't loaded yet.
+
+    Loaded images are found through an index of their paths, rebuilt on a lookup miss when it is
+    stale, see invalidate_image_index.
+    """
+    # Check if the texture is already loaded, possibly switched to one of its proxies
+    image = get_indexed_image(texture_path)
+    if image is None and image_index['stale']:
+        index_loaded_images()
+        image = get_indexed_image(texture_path)
 
     # If the texture is not loaded, load it
     if image is None:
         image = bpy.data.images.load(texture_path)
+        image_index['images'][texture_path] = image
+    return image
+
+
+def create_texture_node(nodes, texture_type, texture_path, location, gamma = 2.2):
+    """
+    Creates a texture node within a material's node tree.
+    """
+
+    image = load_image(texture_path)
 
     # Create a new ImageTexture node for the material
     texture_node = nodes.new(OCTANE_NODE['ImageTexture'])
     texture_node.location = location
     texture_node.label = texture_type
     texture_node.name = texture_type
-    texture_node.inputs[IMAGE_TEXTURE_SOCKET['Gamma']].default_value = float(gamma)
+    get_input(texture_node, IMAGE_TEXTURE_SOCKET['Gamma']).default_value = float(gamma)
     texture_node.image = image
 
     return texture_node
 
 
-def create_appropriate_node(texture_type, links, nodes, transform_node, universal_node, texture_path, settings, position_shift = (0, 0)):
+def create_appropriate_node(texture_type, links, nodes, transform_node, universal_node, texture_path, settings, position_shift = (0, 0), setup_node = None):
     """
     Creates and configures a texture node of the appropriate type, linking it to the material's node tree.
+
+    When a texture setup group node is given, it stands for the transform node and the
+    displacement and emission textures go through it instead of nodes of their own.
     """
 
     node_pos = (NODE_POSITION[texture_type][0] + position_shift[0], NODE_POSITION[texture_type][1] + position_shift[1])
@@ -90,11 +154,18 @@ def create_appropriate_node(texture_type, links, nodes, transform_node, universa
         create_link(links, transform_node, TRANSFORM_SOCKET['Out'], ao_node, IMAGE_TEXTURE_SOCKET['Transform'])
         link = create_link(links, ao_node, IMAGE_TEXTURE_SOCKET['Out'], universal_node, UNIVERSAL_MATERIAL_SOCKET['Albedo'])
         return {'node': ao_node, 'link': link}
+    elif texture_type in ('Displacement', 'Emission') and setup_node is not None:
+        texture_node = create_texture_node(nodes, texture_type, texture_path, node_pos, gamma)
+        create_link(links, transform_node, TRANSFORM_SOCKET['Out'], texture_node, IMAGE_TEXTURE_SOCKET['Transform'])
+        create_link(links, texture_node, IMAGE_TEXTURE_SOCKET['Out'], setup_node, TEXTURE_SETUP_SOCKET[texture_type])
+        link = create_link(links, setup_node, TEXTURE_SETUP_SOCKET[texture_type + 'Out'], universal_node, UNIVERSAL_MATERIAL_SOCKET[texture_type])
+        return {'node': setup_node, 'link': link}
     elif texture_type == 'Displacement':
         displacement_node = nodes.new(OCTANE_NODE[settings['displacement_type']])
+        displacement_node.name = 'DisplacementNode'
         displacement_node.location = (NODE_POSITION['DisplacementNode'][0] + position_shift[0], NODE_POSITION['DisplacementNode'][1] + position_shift[1])
-        displacement_node.inputs[DISPLACEMENT_SOCKET['Midlevel']].default_value = settings['displacement_midlevel']
-        displacement_node.inputs[DISPLACEMENT_SOCKET['Height']].default_value = settings['displacement_height']
+        get_input(displacement_node, DISPLACEMENT_SOCKET['Midlevel']).default_value = settings['displacement_midlevel']
+        get_input(displacement_node, DISPLACEMENT_SOCKET['Height']).default_value = settings['displacement_height']
         texture_node = create_texture_node(nodes, texture_type, texture_path, node_pos, gamma)
         create_link(links, transform_node, TRANSFORM_SOCKET['Out'], texture_node, IMAGE_TEXTURE_SOCKET['Transform'])
         create_link(links, texture_node, IMAGE_TEXTURE_SOCKET['Out'], displacement_node, DISPLACEMENT_SOCKET['Texture'])
@@ -102,6 +173,7 @@ def create_appropriate_node(texture_type, links, nodes, transform_node, universa
         return {'node': displacement_node, 'link': displacement_link}
     elif texture_type == 'Emission':
         emission_node = nodes.new(OCTANE_NODE['TextureEmission'])
+        emission_node.name = 'EmissionNode'
         emission_node.location = (NODE_POSITION['EmissionNode'][0] + position_shift[0], NODE_POSITION['EmissionNode'][1] + position_shift[1])
         texture_node = create_texture_node(nodes, texture_type, texture_path, node_pos, gamma)
         create_link(links, transform_node, TRANSFORM_SOCKET['Out'], texture_node, IMAGE_TEXTURE_SOCKET['Transform'])
@@ -110,21 +182,31 @@ def create_appropriate_node(texture_type, links, nodes, transform_node, universa
         return {'node': emission_node, 'link': link}
 
 
-def create_material_nodes(name, sockets, settings):
+def create_material_nodes(name, sockets, settings, material=None):
     """
     Creates a full material setup based on specified sockets and settings.
+
+    When an existing material is given, its node tree is rebuilt in place. With the node groups
+    setting, the transform, AO multiply, displacement and emission nodes are replaced by one
+    instance of a texture setup group shared by every material.
     """
 
     # Initialize a new material and retrieve its components (nodes, links, etc.)
-    data = create_empty_material(name)
+    data = create_empty_material(name, material)
     mat = data['material']
     nodes = data['nodes']
     links = data['links']
     universal_node = data['universal']
 
-    # Create a transform node for texture mapping adjustments
-    transform_node = nodes.new(OCTANE_NODE['3DTransform'])
-    transform_node.location = NODE_POSITION['3DTransform']
+    # Create a transform node for texture mapping adjustments, or the shared group holding it
+    setup_node = None
+    if settings.get('node_groups'):
+        setup_node = create_texture_setup_node(nodes, settings, get_texture_setup_parts({s['type'] for s in sockets}))
+        transform_node = setup_node
+    else:
+        transform_node = nodes.new(OCTANE_NODE['3DTransform'])
+        transform_node.name = '3DTransform'
+        transform_node.location = NODE_POSITION['3DTransform']
 
     # Initialize lists and variables to track created nodes and links
     albedo_nodes = []
@@ -143,7 +225,7 @@ def create_material_nodes(name, sockets, settings):
         if texture_type == 'Albedo':
             for index, path in enumerate(s['paths']):
                 position_shift = (0, 50 * index)
-                groupe = create_appropriate_node(texture_type, links, nodes, transform_node, universal_node, path, settings, position_shift)
+                groupe = create_appropriate_node(texture_type, links, nodes, transform_node, universal_node, path, settings, position_shift, setup_node)
                 node = groupe['node']
                 if index == 0:
                     albedo_text = path
@@ -157,7 +239,7 @@ def create_material_nodes(name, sockets, settings):
 
         else :
             # Create a texture node for other texture types and set up links
-            node_groupe = create_appropriate_node(texture_type, links, nodes, transform_node, universal_node, texture_path, settings)
+            node_groupe = create_appropriate_node(texture_type, links, nodes, transform_node, universal_node, texture_path, settings, setup_node=setup_node)
             texture_node = node_groupe['node']
             texture_link = node_groupe['link']
             # Track AO, bump, and displacement nodes and links for potential adjustments
@@ -166,11 +248,17 @@ def create_material_nodes(name, sockets, settings):
             elif texture_type == 'Bump':
                 bump_link = texture_link
             elif texture_type == 'Displacement':
-                displacement_link = texture_node
-
-    # If both AO and albedo nodes are present, mix them using a Multiply node
-    if ao_node and len(albedo_nodes) >= 1:
+                displacement_link = texture_link
+
+    # If both AO and albedo nodes are present, mix them in the shared group
+    if ao_node and len(albedo_nodes) >= 1 and setup_node is not None:
+        create_link(links, albedo_nodes[0], IMAGE_TEXTURE_SOCKET['Out'], setup_node, TEXTURE_SETUP_SOCKET['Albedo'])
+        create_link(links, ao_node, IMAGE_TEXTURE_SOCKET['Out'], setup_node, TEXTURE_SETUP_SOCKET['Ambient Occlusion'])
+        create_link(links, setup_node, TEXTURE_SETUP_SOCKET['AlbedoOut'], universal_node, UNIVERSAL_MATERIAL_SOCKET['Albedo'])
+    # Or using a Multiply node of their own
+    elif ao_node and len(albedo_nodes) >= 1:
         multiply_node = nodes.new(OCTANE_NODE['MultiplyTexture'])
+        multiply_node.name = 'MultiplyNode'
         multiply_node.location = NODE_POSITION['MultiplyNode']
         # Adjust the positions of albedo and AO nodes for clarity
         for albedo_node in albedo_nodes:
@@ -193,16 +281,252 @@ def create_material_nodes(name, sockets, settings):
     return {'material': mat, 'albedo': albedo_text}
 
 
-def create_materials_according_settings(mat_name, keys, settings, folder_path):
+# Settings that change the generated node tree, and therefore the plan fingerprint
+PLAN_SETTINGS = ('texture_setup', 'displacement_type', 'displacement_midlevel', 'displacement_height', 'gamma')
+
+
+def get_plan_settings(settings):
     """
-    Creates materials in Blender according to user-defined settings and paths.
+    Returns the settings recorded in the plan of a material.
+    """
+    plan_settings = {key: settings[key] for key in PLAN_SETTINGS}
+    # Only recorded when enabled, so materials built before the setting existed keep their fingerprint
+    if settings.get('node_groups'):
+        plan_settings['node_groups'] = True
+    return plan_settings
+
+
+def get_plan_fingerprint(plan, settings):
+    """
+    Returns a stable hash of a material plan and the settings that shape its node tree.
+    """
+    payload = {
+        'sockets': plan['sockets'],
+        'settings': get_plan_settings(settings),
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def create_color_variant(base_mat, plan, settings):
+    """
+    Creates the material of an albedo variant as a copy of the material built for another variant of the same folder.
+
+    Variants only differ by their albedo texture: the copy keeps the node tree of the base material
+    and shares every other image datablock, only the image of its albedo node is swapped.
+    """
+    mat = base_mat.copy()
+    mat.name = plan['name']
+    albedo = next(s['paths'][0] for s in plan['sockets'] if s['type'] == 'Albedo')
+    mat.node_tree.nodes['Albedo Alt-1'].image = load_image(albedo)
+    tag_generated_material(mat, plan, settings)
+    return {'material': mat, 'albedo': albedo}
+
+
+def tag_generated_material(mat, plan, settings):
+    """
+    Records the source folder, variant and plan fingerprint of a generated material as custom properties.
+    """
+    mat['generator_source_folder'] = plan['source_folder']
+    mat['generator_variant'] = plan['variant']
+    if plan.get('texture_set'):
+        mat['generator_texture_set'] = plan['texture_set']
+    mat['generator_plan'] = json.dumps({
+        'sockets': plan['sockets'],
+        'settings': get_plan_settings(settings),
+    }, sort_keys=True)
+    mat['generator_plan_fingerprint'] = get_plan_fingerprint(plan, settings)
+
+
+def normalize_source_folder(folder_path):
+    """
+    Normalizes a folder path so that it can be used as a stable material lookup key.
+    """
+    return os.path.normcase(os.path.normpath(os.path.abspath(folder_path)))
+
+
+def index_generated_materials():
+    """
+    Maps (source folder, variant) to the materials previously created by the generator.
+
+    Built once per run so that finding the existing material of a folder is a dictionary lookup.
+    """
+    index = {}
+    for mat in bpy.data.materials:
+        source_folder = mat.get('generator_source_folder')
+        if source_folder is not None:
+            index[(source_folder, mat.get('generator_variant', 0))] = mat
+    return index
+
+
+def remove_generated_materials(source_folders):
+    """
+    Removes the materials generated from the given (normalized) source folders.
+
+    Returns the number of materials removed.
+    """
+    removed = 0
+    for (source_folder, _), mat in index_generated_materials().items():
+        if source_folder in source_folders:
+            bpy.data.materials.remove(mat)
+            removed += 1
+    return removed
+
+
+def get_folders_source_folders(folder_paths):
+    """
+    Returns the source folders of the generated materials built from the given folders, texture sets of flat folders included.
+    """
+    folders = {normalize_source_folder(path) for path in folder_paths}
+    return {
+        source_folder for (source_folder, _), mat in index_generated_materials().items()
+        if source_folder in folders or (mat.get('generator_texture_set') and os.path.dirname(source_folder) in folders)
+    }
+
+
+def snapshot_datablocks():
+    """
+    Returns the materials and images currently in the file, to tell apart the ones created afterwards.
+    """
+    return {'materials': set(bpy.data.materials), 'images': set(bpy.data.images)}
+
+
+def discard_new_datablocks(snapshot, existing_materials=None):
+    """
+    Removes the materials created since the snapshot, and the images they left without users.
+
+    Used to clean up after a folder that failed half-way. Removed materials are also dropped from
+    the index of existing generated materials. An existing material patched by the update mode
+    can't be restored, but its fingerprint is only written once patched so the next run redoes it.
+
+    Returns:
+    - tuple: The number of (materials, images) removed.
+    """
+    new_materials = [mat for mat in bpy.data.materials if mat not in snapshot['materials']]
+    if existing_materials is not None:
+        for key, mat in list(existing_materials.items()):
+            if mat in new_materials:
+                del existing_materials[key]
+    for mat in new_materials:
+        bpy.data.materials.remove(mat)
+
+    # Images still used by other materials stay
+    new_images = [image for image in bpy.data.images if image not in snapshot['images'] and image.users == 0]
+    for image in new_images:
+        bpy.data.images.remove(image)
+    return len(new_materials), len(new_images)
+
+
+def relink_setup_choice(links, nodes, universal_node, settings):
+    """
+    Reconnects the bump and displacement inputs of the universal material according to the texture setup setting.
+    """
+    bump_node = nodes.get('Bump')
+    # The displacement output is on the shared group for materials using node groups, under the same name
+    displacement_node = nodes.get('DisplacementNode') or nodes.get('TextureSetup')
+    if not bump_node or not displacement_node or get_output(displacement_node, DISPLACEMENT_SOCKET['Out']) is None:
+        return
+
+    for socket_name in (UNIVERSAL_MATERIAL_SOCKET['Bump'], UNIVERSAL_MATERIAL_SOCKET['Displacement']):
+        for link in list(get_input(universal_node, socket_name).links):
+            links.remove(link)
+
+    if settings['texture_setup'] != 'Displacement':
+        create_link(links, bump_node, IMAGE_TEXTURE_SOCKET['Out'], universal_node, UNIVERSAL_MATERIAL_SOCKET['Bump'])
+    if settings['texture_setup'] != 'Bump':
+        create_link(links, displacement_node, DISPLACEMENT_SOCKET['Out'], universal_node, UNIVERSAL_MATERIAL_SOCKET['Displacement'])
 
-    This function iterates through a collection of settings that define how materials
-    should be created, including the paths to textures and other material properties.
-    For each setting, it generates a material with the specified characteristics,
-    linking textures and setting up nodes as defined. The base path parameter allows
-    the function to locate texture files relative to a specific directory.
-     """
+
+def update_material_nodes(mat, plan, settings):
+    """
+    Brings an existing generated material in line with a new plan.
+
+    Only what differs is touched: changed textures are relinked on their existing image nodes
+    and changed values (gamma, displacement mid level and height, bump or displacement choice)
+    are adjusted in place. When the set of sockets itself changed, the node tree is rebuilt on
+    the same material so that it keeps its name and asset data.
+
+    Returns the status of the material: 'unchanged', 'updated' or 'rebuilt'.
+    """
+    if mat.get('generator_plan_fingerprint') == get_plan_fingerprint(plan, settings):
+        return 'unchanged'
+
+    try:
+        old_plan = json.loads(mat.get('generator_plan', ''))
+    except ValueError:
+        old_plan = None
+
+    old_sockets = {s['type']: s['paths'] for s in old_plan['sockets']} if old_plan else None
+    new_sockets = {s['type']: s['paths'] for s in plan['sockets']}
+    same_layout = (
+        old_sockets is not None
+        and mat.node_tree is not None
+        and old_plan['settings']['displacement_type'] == settings['displacement_type']
+        and old_plan['settings'].get('node_groups', False) == bool(settings.get('node_groups'))
+        and {k: len(v) for k, v in old_sockets.items()} == {k: len(v) for k, v in new_sockets.items()}
+    )
+
+    if not same_layout:
+        create_material_nodes(mat.name, plan['sockets'], settings, material=mat)
+        tag_generated_material(mat, plan, settings)
+        return 'rebuilt'
+
+    nodes = mat.node_tree.nodes
+    links = mat.node_tree.links
+    old_settings = old_plan['settings']
+
+    # Relink only the image nodes whose texture changed
+    for texture_type, paths in new_sockets.items():
+        for index, path in enumerate(paths):
+            if old_sockets[texture_type][index] == path:
+                continue
+            node_name = texture_type + ' Alt-' + str(index + 1) if texture_type == 'Albedo' else texture_type
+            texture_node = nodes.get(node_name)
+            if texture_node is None:
+                continue
+            texture_node.image = load_image(path)
+
+    if old_settings['gamma'] != settings['gamma']:
+        for node in nodes:
+            if node.bl_idname == OCTANE_NODE['ImageTexture']:
+                get_input(node, IMAGE_TEXTURE_SOCKET['Gamma']).default_value = float(settings['gamma'])
+
+    # Mid level and height are on the displacement node, or exposed on the shared group under the same names
+    displacement_node = nodes.get('DisplacementNode') or nodes.get('TextureSetup')
+    if displacement_node and get_input(displacement_node, DISPLACEMENT_SOCKET['Midlevel']) is not None:
+        if old_settings['displacement_midlevel'] != settings['displacement_midlevel']:
+            get_input(displacement_node, DISPLACEMENT_SOCKET['Midlevel']).default_value = settings['displacement_midlevel']
+        if old_settings['displacement_height'] != settings['displacement_height']:
+            get_input(displacement_node, DISPLACEMENT_SOCKET['Height']).default_value = settings['displacement_height']
+
+    if old_settings['texture_setup'] != settings['texture_setup']:
+        universal_node = next((node for node in nodes if node.bl_idname == OCTANE_NODE['UniversalMaterial']), None)
+        if universal_node:
+            relink_setup_choice(links, nodes, universal_node, settings)
+
+    tag_generated_material(mat, plan, settings)
+    return 'updated'
+
+
+def build_material_plans(mat_name, keys, settings, folder_path, file_cache=None, files=None, texture_set=None):
+    """
+    Classifies the textures of a folder and decides which materials should be built from them.
+
+    No Blender data is created here. Each plan is a dictionary holding the material name,
+    the ordered sockets with their texture paths, the source folder and the variant index
+    (non-zero only for the materials created per color map).
+
+    File sizes used by the resolution priority come from the file metadata cache when given.
+
+    The folder can be a zip archive, its files are then classified from their entry names and
+    the plan paths point inside the archive, see extract_plan_textures.
+
+    When files is given, only those files of the folder are classified, the materials being
+    those of the texture set of a flat folder, see build_folder_plans.
+
+    Textures found invalid by the validation of the running generation are left out before the
+    resolution priority and color map handling choose between the candidates, so the next
+    candidate takes the place of an invalid texture.
+    """
 
     # Prepare a list to categorize texture types and their associated keys from the settings
     sockets = [
@@ -223,7 +547,9 @@ def create_materials_according_settings(mat_name, keys, settings, folder_path):
     all_keys = set()
     for k in keys.values():
         all_keys.update(k)
-    files_with_keys = match_files_to_keys(fetch_files_at_path(folder_path, settings['file_types']), all_keys)
+    if files is None:
+        files = fetch_files_at_path(folder_path, settings['file_types'], file_cache)
+    files_with_keys = match_files_to_keys(files, all_keys)
 
     # Populate the sockets list with files that match the keys for each texture type
     for s in sockets:
@@ -235,11 +561,11 @@ def create_materials_according_settings(mat_name, keys, settings, folder_path):
     # Clean up the sockets list to include only those with matching files
     clean_sockets = []
     for item in sockets:
-        if item[2]:
-            new_item = {'type' :item[0], 'paths' : []}
-            for path in item[2]:
-                new_item['paths'].append(os.path.join(folder_path, path))
-            clean_sockets.append(new_item)
+        paths = [os.path.join(folder_path, path) for path in item[2]]
+        # Invalid textures are left out before the candidates are ordered and chosen from
+        paths = [path for path in paths if path not in invalid_textures]
+        if paths:
+            clean_sockets.append({'type' : item[0], 'paths' : paths})
 
     # Exit if there are no textures to process
     if not clean_sockets:
@@ -252,6 +578,26 @@ def create_materials_according_settings(mat_name, keys, settings, folder_path):
                 return settings['file_types'].index(file_type)
         return len(settings['file_types'])
 
+    # Size of a texture file, served from memory when the metadata cache is available
+    def get_file_size(path):
+        if is_archive(folder_path):
+            return get_archive_entry_size(path)
+        return file_cache.size(path) if file_cache else Path(path).stat().st_size
+
+    # Distance of a texture to the target resolution, read from its name and only probed on disk without a token
+    def get_target_resolution_distance(path):
+        resolution = parse_resolution_token(os.path.basename(path))
+        if resolution is None:
+            try:
+                info = read_image_header(path)
+            except (OSError, ValueError):
+                info = None
+            if not info:
+                return (1, 0, False)
+            resolution = max(info['width'], info['height'])
+        # Equally distant tiers (1K and 4K for a 2K target) favour the bigger one
+        return (0, abs(math.log2(max(resolution, 1) / settings['target_resolution'])), resolution < settings['target_resolution'])
+
     # Order or sort the sockets list based on resolution priority settings
     ordered_sockets = []
     if settings['resolution_priority'] == 'FileType':
@@ -260,17 +606,27 @@ def create_materials_according_settings(mat_name, keys, settings, folder_path):
             ordered_sockets.append({'type' : item['type'], 'paths' : sorted_paths})
     elif settings['resolution_priority'] == 'SmallerRes':
         for item in clean_sockets:
-            sorted_paths = sorted(item['paths'], key=lambda x: Path(x).stat().st_size)
+            sorted_paths = sorted(item['paths'], key=get_file_size)
             ordered_sockets.append({'type' : item['type'], 'paths' : sorted_paths})
     elif settings['resolution_priority'] == 'BiggerRes':
         for item in clean_sockets:
-            sorted_paths = sorted(item['paths'], key=lambda x: Path(x).stat().st_size, reverse=True)
+            sorted_paths = sorted(item['paths'], key=get_file_size, reverse=True)
             ordered_sockets.append({'type' : item['type'], 'paths' : sorted_paths})
+    elif settings['resolution_priority'] == 'TargetRes':
+        for item in clean_sockets:
+            sorted_paths = sorted(item['paths'], key=get_target_resolution_distance)
+            # Other resolutions of the same texture aren't alternatives, only the closest tier is kept
+            kept_paths = {}
+            for sorted_path in sorted_paths:
+                kept_paths.setdefault(remove_resolution_token(os.path.basename(sorted_path)), sorted_path)
+            ordered_sockets.append({'type' : item['type'], 'paths' : list(kept_paths.values())})
     else:
         ordered_sockets = clean_sockets
 
     # Handle different scenarios for handling multiple Albedo textures
-    data_array = []
+    plans = []
+    # The materials of a texture set are told apart from the other sets of the folder by their source
+    source_folder = normalize_source_folder(os.path.join(folder_path, texture_set) if texture_set else folder_path)
     # Find all 'Albedo' items in ordered_sockets
     albedo_paths = [path for item in ordered_sockets if item['type'] == 'Albedo' for path in item['paths']]
     if len(albedo_paths) > 1 and settings['alt_col_handling'] == 'NewMaterial':
@@ -281,21 +637,103 @@ def create_materials_according_settings(mat_name, keys, settings, folder_path):
                 if socket['type'] == 'Albedo':
                     socket['paths'] = [path]
             unique_name = mat_name + ' Alt-' + str(index+1)
-            data = create_material_nodes(unique_name, unique_sockets, settings)
-            data_array.append(data)
+            plans.append({'name': unique_name, 'sockets': unique_sockets, 'source_folder': source_folder, 'variant': index + 1, 'texture_set': texture_set})
     # For 'First' or 'Last', adjust the Albedo path in the ordered sockets
     elif len(albedo_paths) > 1 and settings['alt_col_handling'] == 'First':
         ordered_sockets = [i for i in ordered_sockets if i['type'] != 'Albedo']
         ordered_sockets.append({'type' : 'Albedo', 'paths' : [albedo_paths[0]]})
-        data = create_material_nodes(mat_name, ordered_sockets, settings)
-        data_array.append(data)
+        plans.append({'name': mat_name, 'sockets': ordered_sockets, 'source_folder': source_folder, 'variant': 0, 'texture_set': texture_set})
     elif len(albedo_paths) > 1 and settings['alt_col_handling'] == 'Last':
         ordered_sockets = [i for i in ordered_sockets if i['type'] != 'Albedo']
         ordered_sockets.append({'type' : 'Albedo', 'paths' : [albedo_paths[-1]]})
-        data = create_material_nodes(mat_name, ordered_sockets, settings)
-        data_array.append(data)
+        plans.append({'name': mat_name, 'sockets': ordered_sockets, 'source_folder': source_folder, 'variant': 0, 'texture_set': texture_set})
     else :
-        data = create_material_nodes(mat_name, ordered_sockets, settings)
+        plans.append({'name': mat_name, 'sockets': ordered_sockets, 'source_folder': source_folder, 'variant': 0, 'texture_set': texture_set})
+
+    return plans
+
+
+def build_folder_plans(mat_name, keys, settings, folder_path, file_cache=None):
+    """
+    Builds the material plans of a folder, see build_material_plans.
+
+    With the flat folders setting, a folder holding several texture sets side by side
+    ('Brick01_Albedo.jpg', 'Brick01_Normal.jpg', 'Brick02_Albedo.jpg'...) is split into one
+    group of files per set, each classified on its own and named after the set.
+    """
+    if not settings.get('flat_folders'):
+        return build_material_plans(mat_name, keys, settings, folder_path, file_cache)
+
+    all_keys = set()
+    for k in keys.values():
+        all_keys.update(k)
+    files = fetch_files_at_path(folder_path, settings['file_types'], file_cache)
+    texture_sets = group_texture_sets(files, all_keys)
+    # A folder with a single texture set keeps the name and source of the folder
+    if len(texture_sets) <= 1:
+        return build_material_plans(mat_name, keys, settings, folder_path, file_cache, files)
+
+    plans = []
+    for texture_set, texture_set_files in texture_sets:
+        plans += build_material_plans(format_material_name(texture_set), keys, settings, folder_path, file_cache, texture_set_files, texture_set)
+    return plans
+
+
+def extract_plan_textures(plan, cache_folder):
+    """
+    Replaces the archive paths of a plan by local copies of the textures it binds.
+
+    Only the first texture of a socket is bound (albedo alternatives get disabled nodes), so only
+    those are extracted from the archive, the other candidates are dropped from the plan.
+    """
+    for socket in plan['sockets']:
+        paths = socket['paths'] if socket['type'] == 'Albedo' else socket['paths'][:1]
+        socket['paths'] = [extract_archive_entry(path, cache_folder) for path in paths]
+    return plan
+
+
+def create_materials_according_settings(mat_name, keys, settings, folder_path, existing_materials=None, file_cache=None):
+    """
+    Creates materials in Blender according to user-defined settings and paths.
+
+    This function iterates through a collection of settings that define how materials
+    should be created, including the paths to textures and other material properties.
+    For each setting, it generates a material with the specified characteristics,
+    linking textures and setting up nodes as defined. The base path parameter allows
+    the function to locate texture files relative to a specific directory.
+
+    When an index of existing generated materials is given (update mode), the material
+    built previously from the same folder is patched instead of creating a duplicate.
+    A zip archive is read in place, the textures its materials use are extracted to settings['archive_cache'].
+    The materials created per color map after the first one are copies of it, see create_color_variant.
+    """
+    data_array = []
+    # Material created in this call for the first variant of each source folder, copied for the other variants
+    variant_bases = {}
+    for plan in build_folder_plans(mat_name, keys, settings, folder_path, file_cache):
+        if is_archive(folder_path):
+            plan = extract_plan_textures(plan, settings['archive_cache'])
+        albedo = next((s['paths'][0] for s in plan['sockets'] if s['type'] == 'Albedo'), None)
+        existing = existing_materials.get((plan['source_folder'], plan['variant'])) if existing_materials is not None else None
+
+        if existing is not None:
+            status = update_material_nodes(existing, plan, settings)
+            data_array.append({'material': existing, 'albedo': albedo, 'status': status, 'texture_set': plan['texture_set'], 'variant': plan['variant']})
+            continue
+
+        base = variant_bases.get(plan['source_folder'])
+        if base is not None:
+            data = create_color_variant(base, plan, settings)
+        else:
+            data = create_material_nodes(plan['name'], plan['sockets'], settings)
+            tag_generated_material(data['material'], plan, settings)
+            if plan['variant']:
+                variant_bases[plan['source_folder']] = data['material']
+        data['status'] = 'created'
+        data['texture_set'] = plan['texture_set']
+        data['variant'] = plan['variant']
+        if existing_materials is not None:
+            existing_materials[(plan['source_folder'], plan['variant'])] = data['material']
         data_array.append(data)
 
     return data_array
\ No newline at end of file
@@ -0,0 +1,278 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+from .jobqueue import write_json_atomically
+
+try:
+    # Unavailable on Windows, the memory usage is then read from /proc or left out
+    import resource
+except ImportError:
+    resource = None
+
+# Live metrics of the generator, for monitoring long builds without parsing their output.
+# The build loop only updates this dictionary, under a lock held for a few assignments. The
+# endpoint and the status file are served from background threads working on snapshots of
+# it, a slow or stuck client never holds the build up.
+metrics = {
+    'started': time.time(),
+    'folders_discovered': 0,
+    'folders_processed': 0,
+    'folders_failed': 0,
+    'materials': 0,
+    'current_folder': None,
+    'current_folder_started': None,
+    'last_progress': None,
+    'phase': None,
+    'phase_started': None,
+    'phase_seconds': {},
+    'queue_depths': {},
+}
+metrics_lock = threading.Lock()
+
+# Seconds over which the recent throughput is measured
+THROUGHPUT_WINDOW = 60.0
+
+# (time, materials) of the folders finished within the throughput window
+recent_folders = deque()
+
+# The running endpoint and status file writer
+metrics_service = {'server': None, 'threads': [], 'stop': None, 'status_path': None}
+
+
+def record_folder_discovered():
+    """
+    Counts a material folder found by the walk of the library.
+    """
+    with metrics_lock:
+        metrics['folders_discovered'] += 1
+
+
+def start_folder(folder_path):
+    """
+    Records the folder being generated, a folder staying current for long is a stall.
+    """
+    with metrics_lock:
+        metrics['current_folder'] = folder_path
+        metrics['current_folder_started'] = time.time()
+
+
+def finish_folder(materials, failed, attempt=1):
+    """
+    Records the end of a folder, with the number of materials it produced.
+
+    A folder retried after a failure was counted as failed by its first attempt.
+    """
+    now = time.time()
+    with metrics_lock:
+        if attempt > 1:
+            metrics['folders_failed'] -= 1
+        if failed:
+            metrics['folders_failed'] += 1
+        else:
+            metrics['folders_processed'] += 1
+            metrics['materials'] += materials
+            recent_folders.append((now, materials))
+        metrics['current_folder'] = None
+        metrics['current_folder_started'] = None
+        metrics['last_progress'] = now
+
+
+def start_phase(name):
+    """
+    Ends the running phase and starts the given one, the time of each phase adds up over the runs.
+    """
+    now = time.time()
+    with metrics_lock:
+        if metrics['phase'] is not None:
+            phase_seconds = metrics['phase_seconds']
+            phase_seconds[metrics['phase']] = phase_seconds.get(metrics['phase'], 0.0) + now - metrics['phase_started']
+        metrics['phase'] = name
+        metrics['phase_started'] = now if name is not None else None
+
+
+def end_phase():
+    """
+    Ends the running phase.
+    """
+    start_phase(None)
+
+
+def set_queue_depth(name, depth):
+    """
+    Records the number of items waiting in one of the queues of the build.
+    """
+    with metrics_lock:
+        metrics['queue_depths'][name] = depth
+
+
+def get_memory_usage():
+    """
+    Returns the resident memory of the process in bytes, or None where it can't be read.
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # Only the peak is available, in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    return None
+
+
+def get_metrics_snapshot():
+    """
+    Returns a copy of the metrics, with the throughput, stall and memory figures derived from them.
+    """
+    now = time.time()
+    with metrics_lock:
+        snapshot = dict(metrics)
+        phase_seconds = dict(metrics['phase_seconds'])
+        snapshot['queue_depths'] = dict(metrics['queue_depths'])
+        while recent_folders and recent_folders[0][0] < now - THROUGHPUT_WINDOW:
+            recent_folders.popleft()
+        recent_materials = sum(materials for _, materials in recent_folders)
+
+    # The running phase counts up to now
+    if snapshot['phase'] is not None:
+        phase_seconds[snapshot['phase']] = phase_seconds.get(snapshot['phase'], 0.0) + now - snapshot['phase_started']
+    snapshot['phase_seconds'] = phase_seconds
+    snapshot['timestamp'] = now
+    snapshot['uptime_seconds'] = now - snapshot['started']
+    snapshot['materials_per_second'] = recent_materials / min(THROUGHPUT_WINDOW, max(snapshot['uptime_seconds'], 1e-6))
+    snapshot['current_folder_seconds'] = now - snapshot['current_folder_started'] if snapshot['current_folder_started'] else 0.0
+    snapshot['seconds_since_progress'] = now - (snapshot['last_progress'] or snapshot['started'])
+    snapshot['rss_bytes'] = get_memory_usage()
+    return snapshot
+
+
+def escape_label(value):
+    # Backslashes, quotes and line breaks are escaped in Prometheus label values
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_prometheus(snapshot):
+    """
+    Formats a metrics snapshot in the Prometheus text exposition format.
+    """
+    lines = []
+
+    def add(name, metric_type, description, samples):
+        lines.append(f"# HELP generator_{name} {description}")
+        lines.append(f"# TYPE generator_{name} {metric_type}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels.items())
+            lines.append(f"generator_{name}{{{label_text}}} {value}" if label_text else f"generator_{name} {value}")
+
+    add('folders_discovered_total', 'counter', "Material folders found by the walk of the library.", [({}, snapshot['folders_discovered'])])
+    add('folders_processed_total', 'counter', "Material folders generated.", [({}, snapshot['folders_processed'])])
+    add('folders_failed', 'gauge', "Material folders that failed and weren't recovered by a retry.", [({}, snapshot['folders_failed'])])
+    add('materials_total', 'counter', "Materials generated.", [({}, snapshot['materials'])])
+    add('materials_per_second', 'gauge', f"Materials generated per second over the last {THROUGHPUT_WINDOW:.0f} seconds.", [({}, f"{snapshot['materials_per_second']:.4f}")])
+    # The folder itself is only in the JSON, a label would make a new series for every folder
+    add('current_folder_seconds', 'gauge', "Seconds spent on the folder being generated.", [({}, f"{snapshot['current_folder_seconds']:.3f}")])
+    add('seconds_since_progress', 'gauge', "Seconds since the last folder was finished.", [({}, f"{snapshot['seconds_since_progress']:.3f}")])
+    add('phase_seconds_total', 'counter', "Seconds spent in each phase of the build.", [({'phase': phase}, f"{seconds:.3f}") for phase, seconds in sorted(snapshot['phase_seconds'].items())])
+    add('current_phase', 'gauge', "The phase running, 1 for the running one.", [({'phase': snapshot['phase']}, 1)] if snapshot['phase'] else [])
+    add('queue_depth', 'gauge', "Items waiting in each queue of the build.", [({'queue': name}, depth) for name, depth in sorted(snapshot['queue_depths'].items())])
+    add('uptime_seconds', 'gauge', "Seconds since the metrics started.", [({}, f"{snapshot['uptime_seconds']:.3f}")])
+    if snapshot['rss_bytes'] is not None:
+        add('resident_memory_bytes', 'gauge', "Resident memory of the process.", [({}, snapshot['rss_bytes'])])
+    return "\n".join(lines) + "\n"
+
+
+def write_status_file(status_path):
+    """
+    Writes a metrics snapshot to a JSON status file, replaced atomically so that readers never see it half-written.
+    """
+    write_json_atomically(status_path, get_metrics_snapshot())
+
+
+def start_metrics_server(port=None, host="127.0.0.1", status_path=None, status_interval=10.0):
+    """
+    Serves the live metrics from background threads until stop_metrics_server is called.
+
+    The endpoint answers '/metrics' in the Prometheus text format and '/metrics.json' in JSON.
+
+    Parameters:
+    - port (int): Port of the endpoint, 0 for any free port, None for no endpoint.
+    - host (str): Address the endpoint listens on, the local machine only by default.
+    - status_path (str): Optional JSON file the metrics are also written to.
+    - status_interval (float): Seconds between two writes of the status file.
+
+    Returns:
+    - int: The port of the endpoint, or None without one.
+    """
+    # Only imported when metrics are served, the generator itself doesn't need them
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    stop_metrics_server()
+    stop = threading.Event()
+    metrics_service['stop'] = stop
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == '/metrics':
+                body = format_prometheus(get_metrics_snapshot()).encode('utf-8')
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif path == '/metrics.json':
+                body = json.dumps(get_metrics_snapshot(), indent=1).encode('utf-8')
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Requests aren't logged, the build output stays readable
+            pass
+
+    bound_port = None
+    if port is not None:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        metrics_service['server'] = server
+        bound_port = server.server_address[1]
+        metrics_service['threads'].append(threading.Thread(target=server.serve_forever, name="generator-metrics", daemon=True))
+
+    if status_path:
+        def write_status():
+            while not stop.wait(status_interval):
+                try:
+                    write_status_file(status_path)
+                except OSError as e:
+                    print(f"Failed to write the status file {status_path}: {e}")
+        metrics_service['threads'].append(threading.Thread(target=write_status, name="generator-status", daemon=True))
+    metrics_service['status_path'] = status_path
+
+    for thread in metrics_service['threads']:
+        thread.start()
+    return bound_port
+
+
+def stop_metrics_server():
+    """
+    Stops serving the metrics, and writes the status file a last time.
+    """
+    if metrics_service['stop'] is not None:
+        metrics_service['stop'].set()
+    if metrics_service['server'] is not None:
+        metrics_service['server'].shutdown()
+        metrics_service['server'].server_close()
+    for thread in metrics_service['threads']:
+        thread.join()
+    if metrics_service['status_path']:
+        try:
+            write_status_file(metrics_service['status_path'])
+        except OSError as e:
+            print(f"Failed to write the status file {metrics_service['status_path']}: {e}")
+    metrics_service.update({'server': None, 'threads': [], 'stop': None, 'status_path': None})
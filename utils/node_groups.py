@@ -0,0 +1,114 @@
+import bpy
+from .constants import (
+    OCTANE_NODE, TRANSFORM_SOCKET, MULTIPLY_TEXTURE_SOCKET, DISPLACEMENT_SOCKET, TEXTURE_EMISSION_SOCKET,
+    TEXTURE_SETUP_SOCKET, GROUP_SOCKET_FALLBACK_TYPE, GROUP_VALUE_SOCKET_FALLBACK_TYPE, NODE_POSITION, GAP
+)
+from .sockets import get_input, get_output
+
+def get_texture_setup_parts(texture_types):
+    """
+    Returns the parts of the texture setup a material needs, from the texture types of its sockets.
+
+    The albedo and AO multiply is only needed when both textures are present.
+    """
+    parts = []
+    if 'Ambient Occlusion' in texture_types and 'Albedo' in texture_types:
+        parts.append('Ambient Occlusion')
+    if 'Displacement' in texture_types:
+        parts.append('Displacement')
+    if 'Emission' in texture_types:
+        parts.append('Emission')
+    return tuple(parts)
+
+
+def get_texture_setup_group_name(displacement_type, parts):
+    """
+    Returns the name of the shared node group for a displacement type and a set of parts.
+    """
+    return " ".join(["Generator Texture Setup", displacement_type] + [part.replace(" ", "") for part in parts])
+
+
+def expose_socket(group, name, in_out, socket, fallback_type=GROUP_SOCKET_FALLBACK_TYPE):
+    # Exposes a socket of a node on the group interface, with the same type when Blender accepts it
+    try:
+        return group.interface.new_socket(name, in_out=in_out, socket_type=socket.bl_idname)
+    except TypeError:
+        return group.interface.new_socket(name, in_out=in_out, socket_type=fallback_type)
+
+
+def build_texture_setup_group(name, displacement_type, parts):
+    """
+    Builds the node group holding the nodes every material repeats around its textures.
+
+    The group always holds the 3D transform shared by the image nodes. Depending on the parts,
+    it also holds the multiply of albedo and AO, the displacement node with its mid level and
+    height exposed, and the texture emission node. Textures come in through the group inputs.
+    """
+    group = bpy.data.node_groups.new(name, 'ShaderNodeTree')
+    nodes = group.nodes
+    links = group.links
+
+    group_input = nodes.new(OCTANE_NODE['GroupInput'])
+    group_input.location = (-GAP * 2, 0)
+    group_output = nodes.new(OCTANE_NODE['GroupOutput'])
+    group_output.location = (GAP, 0)
+
+    transform_node = nodes.new(OCTANE_NODE['3DTransform'])
+    transform_node.location = (0, 300)
+    expose_socket(group, TEXTURE_SETUP_SOCKET['TransformOut'], 'OUTPUT', get_output(transform_node, TRANSFORM_SOCKET['Out']))
+    links.new(group_output.inputs[TEXTURE_SETUP_SOCKET['TransformOut']], get_output(transform_node, TRANSFORM_SOCKET['Out']))
+
+    if 'Ambient Occlusion' in parts:
+        multiply_node = nodes.new(OCTANE_NODE['MultiplyTexture'])
+        multiply_node.location = (0, 100)
+        expose_socket(group, TEXTURE_SETUP_SOCKET['Albedo'], 'INPUT', get_input(multiply_node, MULTIPLY_TEXTURE_SOCKET['In1']))
+        expose_socket(group, TEXTURE_SETUP_SOCKET['Ambient Occlusion'], 'INPUT', get_input(multiply_node, MULTIPLY_TEXTURE_SOCKET['In2']))
+        expose_socket(group, TEXTURE_SETUP_SOCKET['AlbedoOut'], 'OUTPUT', get_output(multiply_node, MULTIPLY_TEXTURE_SOCKET['Out']))
+        links.new(get_input(multiply_node, MULTIPLY_TEXTURE_SOCKET['In1']), group_input.outputs[TEXTURE_SETUP_SOCKET['Albedo']])
+        links.new(get_input(multiply_node, MULTIPLY_TEXTURE_SOCKET['In2']), group_input.outputs[TEXTURE_SETUP_SOCKET['Ambient Occlusion']])
+        links.new(group_output.inputs[TEXTURE_SETUP_SOCKET['AlbedoOut']], get_output(multiply_node, MULTIPLY_TEXTURE_SOCKET['Out']))
+
+    if 'Displacement' in parts:
+        displacement_node = nodes.new(OCTANE_NODE[displacement_type])
+        displacement_node.location = (0, -100)
+        expose_socket(group, TEXTURE_SETUP_SOCKET['Displacement'], 'INPUT', get_input(displacement_node, DISPLACEMENT_SOCKET['Texture']))
+        expose_socket(group, TEXTURE_SETUP_SOCKET['Midlevel'], 'INPUT', get_input(displacement_node, DISPLACEMENT_SOCKET['Midlevel']), GROUP_VALUE_SOCKET_FALLBACK_TYPE)
+        expose_socket(group, TEXTURE_SETUP_SOCKET['Height'], 'INPUT', get_input(displacement_node, DISPLACEMENT_SOCKET['Height']), GROUP_VALUE_SOCKET_FALLBACK_TYPE)
+        expose_socket(group, TEXTURE_SETUP_SOCKET['DisplacementOut'], 'OUTPUT', get_output(displacement_node, DISPLACEMENT_SOCKET['Out']))
+        links.new(get_input(displacement_node, DISPLACEMENT_SOCKET['Texture']), group_input.outputs[TEXTURE_SETUP_SOCKET['Displacement']])
+        links.new(get_input(displacement_node, DISPLACEMENT_SOCKET['Midlevel']), group_input.outputs[TEXTURE_SETUP_SOCKET['Midlevel']])
+        links.new(get_input(displacement_node, DISPLACEMENT_SOCKET['Height']), group_input.outputs[TEXTURE_SETUP_SOCKET['Height']])
+        links.new(group_output.inputs[TEXTURE_SETUP_SOCKET['DisplacementOut']], get_output(displacement_node, DISPLACEMENT_SOCKET['Out']))
+
+    if 'Emission' in parts:
+        emission_node = nodes.new(OCTANE_NODE['TextureEmission'])
+        emission_node.location = (0, -300)
+        expose_socket(group, TEXTURE_SETUP_SOCKET['Emission'], 'INPUT', get_input(emission_node, TEXTURE_EMISSION_SOCKET['Texture']))
+        expose_socket(group, TEXTURE_SETUP_SOCKET['EmissionOut'], 'OUTPUT', get_output(emission_node, TEXTURE_EMISSION_SOCKET['Out']))
+        links.new(get_input(emission_node, TEXTURE_EMISSION_SOCKET['Texture']), group_input.outputs[TEXTURE_SETUP_SOCKET['Emission']])
+        links.new(group_output.inputs[TEXTURE_SETUP_SOCKET['EmissionOut']], get_output(emission_node, TEXTURE_EMISSION_SOCKET['Out']))
+
+    return group
+
+
+def create_texture_setup_node(nodes, settings, parts):
+    """
+    Adds an instance of the shared texture setup group to a material, building the group on first use.
+
+    Groups are shared by every material with the same displacement type and parts, the
+    displacement mid level and height are set on each instance.
+    """
+    name = get_texture_setup_group_name(settings['displacement_type'], parts)
+    group = bpy.data.node_groups.get(name)
+    if group is None:
+        group = build_texture_setup_group(name, settings['displacement_type'], parts)
+
+    setup_node = nodes.new(OCTANE_NODE['Group'])
+    setup_node.node_tree = group
+    setup_node.name = 'TextureSetup'
+    setup_node.label = 'Texture Setup'
+    setup_node.location = NODE_POSITION['TextureSetup']
+    if 'Displacement' in parts:
+        setup_node.inputs[TEXTURE_SETUP_SOCKET['Midlevel']].default_value = settings['displacement_midlevel']
+        setup_node.inputs[TEXTURE_SETUP_SOCKET['Height']].default_value = settings['displacement_height']
+    return setup_node
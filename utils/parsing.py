@@ -1,8 +1,10 @@
 import os
 import re
 import bpy
+from itertools import groupby
 from pathlib import Path
 from os import path
+from .archives import is_archive, list_archive_entries
 
 def format_material_name(name):
     """
@@ -13,7 +15,7 @@ def format_material_name(name):
     and inserting spaces between words and numbers. The specific transformations applied
     are determined by the user's settings in the Blender scene.
     """
-    scene = bpy.context.scene
+    scene = bpy.context.scene.catalog_generator
 
     # Check if name formatting is enabled
     if not scene.format_name:
@@ -37,13 +39,52 @@ def format_material_name(name):
     return name
 
 
+# Resolution written as a number of kilo-pixels, e.g. '2K', '_4k_', '8K-'
+RESOLUTION_K_TOKEN = re.compile(r"(?<![0-9])(\d{1,2})[kK](?![A-Za-z0-9])")
+# Resolution written in pixels, either alone ('2048') or as dimensions ('2048x1024')
+RESOLUTION_PIXEL_TOKEN = re.compile(r"(?<!\d)(256|512|1024|2048|4096|8192|16384)(?:[xX](\d{3,5}))?(?!\d)")
+# Previews rendered by the generator, see generator.get_preview_path: 'preview.png', 'Brick01_preview_alt2.png'...
+GENERATED_PREVIEW = re.compile(r"(?:^|_)preview(?:_alt\d+)?\.png$", re.IGNORECASE)
+
+
+def parse_resolution_token(fname):
+    """
+    Reads the resolution written in a texture file name, without touching the disk.
+
+    Understands kilo-pixel tokens ('Wall_Albedo_2K.jpg', 'wall_4k_diff.png') and pixel tokens
+    ('Wall_2048.jpg', 'wall_4096x4096_nrm.exr'). Returns the longest edge in pixels, or None
+    when the name doesn't carry a resolution.
+    """
+    stem = path.splitext(fname)[0]
+    match = RESOLUTION_K_TOKEN.search(stem)
+    if match:
+        return int(match.group(1)) * 1024
+    match = RESOLUTION_PIXEL_TOKEN.search(stem)
+    if match:
+        return max(int(match.group(1)), int(match.group(2) or 0))
+    return None
+
+
+def remove_resolution_token(fname):
+    """
+    Returns a file name without its extension and resolution token, lowercased.
+
+    Two textures differing only by resolution ('Wall_Albedo_2K.jpg', 'Wall_Albedo_8K.png') give the same result.
+    """
+    stem = path.splitext(fname)[0]
+    stem = RESOLUTION_K_TOKEN.sub("", stem, count=1) if RESOLUTION_K_TOKEN.search(stem) else RESOLUTION_PIXEL_TOKEN.sub("", stem, count=1)
+    return stem.lower()
+
+
 def split_into_components(fname):
     """
     Split filename into components
     'WallTexture_diff_2k.002.jpg' -> ['Wall', 'Texture', 'diff', 'k']
+
+    The folders of an archive entry ('Textures/Wall_diff.jpg') are left out, like those of a file on disk.
     """
-    # Remove extension
-    fname = path.splitext(fname)[0]
+    # Remove folders and extension
+    fname = path.splitext(path.basename(fname))[0]
     # Remove digits
     fname = "".join(i for i in fname if not i.isdigit())
     # Separate CamelCase by space
@@ -58,6 +99,55 @@ def split_into_components(fname):
     return components
 
 
+def get_texture_set_name(fname, keys):
+    """
+    Returns the name of the texture set a file belongs to: its name without extension,
+    resolution token and socket keywords.
+
+    'Brick01_Albedo_2K.jpg' and 'Brick01_Normal_4K.png' both give 'Brick01'. Unlike the
+    classification, digits are kept so that 'Brick01' and 'Brick02' stay apart.
+    """
+    return split_texture_set_name(fname, keys)[0]
+
+
+def split_texture_set_name(fname, keys):
+    # (texture set name, whether the name contained a socket keyword), see get_texture_set_name
+    stem = path.splitext(path.basename(fname))[0]
+    stem = RESOLUTION_K_TOKEN.sub("", stem, count=1) if RESOLUTION_K_TOKEN.search(stem) else RESOLUTION_PIXEL_TOKEN.sub("", stem, count=1)
+    # Separate CamelCase, and a number followed by a capital, by space
+    stem = re.sub(r"([a-z0-9])([A-Z])", r"\g<1> \g<2>", stem)
+    tokens = [token for token in re.split(r"[\s_.\-#]+", stem) if token]
+    # A keyword is matched without its digits, like in the classification ('Color2' is 'color')
+    kept = [token for token in tokens if "".join(c for c in token if not c.isdigit()).lower() not in keys]
+    return "_".join(kept), len(kept) < len(tokens)
+
+
+def group_texture_sets(files, keys):
+    """
+    Groups the files of a flat folder by texture set, see get_texture_set_name.
+
+    A single sort followed by a grouping pass, so that folders with tens of thousands of files
+    stay fast. Sets are compared case-insensitively and named after their first file. Only the
+    sets with at least one file named after a socket keyword are kept, so that a stray image
+    next to the textures doesn't make a set of its own.
+
+    Returns:
+    - list: (texture set name, files) tuples, sorted by name.
+    """
+    named_files = []
+    for file in files:
+        name, matched = split_texture_set_name(file, keys)
+        named_files.append((name.lower(), name, file, matched))
+    named_files.sort()
+
+    texture_sets = []
+    for _, group in groupby(named_files, key=lambda item: item[0]):
+        group = list(group)
+        if any(matched for _, _, _, matched in group):
+            texture_sets.append((group[0][1], [file for _, _, file, _ in group]))
+    return texture_sets
+
+
 def remove_common_prefix(names_to_key_lists):
     """
     Accepts a mapping of file names to key lists that should be used for socket
@@ -157,17 +247,24 @@ def match_files_to_keys(files, keys):
     return names_to_key_lists
 
 
-def fetch_files_at_path(path, valid_extensions):
+def fetch_files_at_path(path, valid_extensions, file_cache=None):
     """
     Splits a filename into components for easier processing and classification.
 
     This function removes file extensions and digits, separates CamelCase text, and
     replaces common separators with spaces, effectively breaking down a filename into
     its basic components for further processing.
+
+    When a file metadata cache is given, the listing made while walking the library is reused.
+    An archive is listed from its central directory, its files are returned as entry names.
+    The previews rendered by the generator aren't textures and are left out.
     """
-    all_files = os.listdir(path)
+    if is_archive(path):
+        all_files = list(list_archive_entries(path))
+    else:
+        all_files = file_cache.listdir(path)[1] if file_cache else os.listdir(path)
     filtered_files = [
         file for file in all_files
-        if file.lower().endswith(valid_extensions)
+        if file.lower().endswith(valid_extensions) and not GENERATED_PREVIEW.search(file)
     ]
     return filtered_files
@@ -0,0 +1,149 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from .filecache import FileMetadataCache
+from .materials import build_folder_plans
+from .catalog import get_catalog_path, get_catalog_file_path
+from .imageinfo import read_image_header, get_decoded_size
+from .report import load_run_history
+from .generator import iter_material_folders
+
+PREFLIGHT_FILE_NAME = "library_preflight.json"
+
+# Number of folders listed as the heaviest in the report
+HEAVIEST_FOLDERS_COUNT = 10
+
+
+def probe_texture(path):
+    # Header information of a texture, None for a format the header reader doesn't recognise,
+    # which is left to the loader, and False when the file or its header can't be read
+    try:
+        return read_image_header(path)
+    except (OSError, ValueError):
+        return False
+
+
+def format_bytes(size):
+    """
+    Formats a number of bytes for display, e.g. '1.5 GB'.
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def estimate_build_seconds(materials, preview_type, history):
+    """
+    Estimates the build time of a number of materials from the timings of previous runs.
+
+    Runs using the same preview type are preferred, as rendered previews dominate the build time.
+
+    Returns:
+    - tuple: (estimated seconds or None without history, number of runs the estimate is based on).
+    """
+    runs = [run for run in history if run.get('preview_type') == preview_type and run.get('materials')]
+    if not runs:
+        runs = [run for run in history if run.get('materials')]
+    if not runs:
+        return None, 0
+    seconds_per_material = sum(run['seconds'] for run in runs) / sum(run['materials'] for run in runs)
+    return materials * seconds_per_material, len(runs)
+
+
+def run_preflight(folder_path, keys, settings, max_workers=8):
+    """
+    Estimates what building a library will cost, without creating any Blender datablock.
+
+    The library is walked and classified exactly like a build would, then the header of every
+    unique texture is probed in a thread pool for its dimensions, channels and bit depth.
+
+    Returns:
+    - dict: Totals (materials, unique textures, disk size, decoded memory), the same totals per
+      catalog, the heaviest folders, the textures of an unrecognised format, the unreadable
+      ones and an estimated build time.
+    """
+    folders = []
+    with FileMetadataCache() as file_cache:
+        for name, path, root in iter_material_folders(folder_path, file_cache):
+            plans = build_folder_plans(name, keys, settings, path, file_cache)
+            if not plans:
+                continue
+            textures = {texture for plan in plans for socket in plan['sockets'] for texture in socket['paths']}
+            catalog = get_catalog_path(path, folder_path) if root is not None else None
+            folders.append({'folder': path, 'catalog': catalog or "Unassigned", 'materials': len(plans), 'textures': textures})
+
+        unique_textures = sorted(set().union(*[folder['textures'] for folder in folders]))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            infos = dict(zip(unique_textures, pool.map(probe_texture, unique_textures)))
+        disk_sizes = {texture: file_cache.size(texture) for texture in unique_textures}
+
+    decoded_sizes = {texture: get_decoded_size(info) if info else 0 for texture, info in infos.items()}
+
+    catalogs = {}
+    for folder in folders:
+        folder['disk_bytes'] = sum(disk_sizes[texture] for texture in folder['textures'])
+        folder['decoded_bytes'] = sum(decoded_sizes[texture] for texture in folder['textures'])
+        totals = catalogs.setdefault(folder['catalog'], {'materials': 0, 'textures': 0, 'disk_bytes': 0, 'decoded_bytes': 0})
+        totals['materials'] += folder['materials']
+        totals['textures'] += len(folder['textures'])
+        totals['disk_bytes'] += folder['disk_bytes']
+        totals['decoded_bytes'] += folder['decoded_bytes']
+
+    heaviest = sorted(folders, key=lambda folder: folder['decoded_bytes'], reverse=True)[:HEAVIEST_FOLDERS_COUNT]
+    materials = sum(folder['materials'] for folder in folders)
+    estimated_seconds, calibration_runs = estimate_build_seconds(materials, settings['preview_type'], load_run_history())
+
+    return {
+        'folder': folder_path,
+        'materials': materials,
+        'textures': len(unique_textures),
+        'disk_bytes': sum(disk_sizes.values()),
+        'decoded_bytes': sum(decoded_sizes.values()),
+        'unrecognised_textures': [texture for texture, info in infos.items() if info is None],
+        'unreadable_textures': [texture for texture, info in infos.items() if info is False],
+        'estimated_seconds': estimated_seconds,
+        'calibration_runs': calibration_runs,
+        'catalogs': catalogs,
+        'heaviest_folders': [
+            {'folder': folder['folder'], 'materials': folder['materials'], 'textures': len(folder['textures']),
+             'disk_bytes': folder['disk_bytes'], 'decoded_bytes': folder['decoded_bytes']}
+            for folder in heaviest
+        ],
+    }
+
+
+def print_preflight_report(report):
+    """
+    Prints a readable summary of a preflight report to the console.
+    """
+    print(f"Preflight of {report['folder']}")
+    print(f"  {report['materials']} materials, {report['textures']} unique textures")
+    print(f"  {format_bytes(report['disk_bytes'])} on disk, {format_bytes(report['decoded_bytes'])} decoded")
+    if report['estimated_seconds'] is None:
+        print("  No previous run to estimate the build time from")
+    else:
+        print(f"  Estimated build time {report['estimated_seconds'] / 60:.1f} min (from {report['calibration_runs']} runs)")
+    if report['unrecognised_textures']:
+        print(f"  {len(report['unrecognised_textures'])} textures of an unrecognised format, left out of the memory estimate")
+    if report['unreadable_textures']:
+        print(f"  {len(report['unreadable_textures'])} textures with an unreadable header")
+    print("  Per catalog:")
+    for catalog, totals in sorted(report['catalogs'].items()):
+        print(f"    {catalog}: {totals['materials']} materials, {totals['textures']} textures, {format_bytes(totals['decoded_bytes'])} decoded")
+    print("  Heaviest folders:")
+    for folder in report['heaviest_folders']:
+        print(f"    {format_bytes(folder['decoded_bytes'])}\t{folder['folder']}")
+
+
+def save_preflight_report(report):
+    """
+    Writes a preflight report next to the current .blend and returns its path, or None for an unsaved file.
+    """
+    try:
+        report_path = get_catalog_file_path().parent / PREFLIGHT_FILE_NAME
+    except FileNotFoundError:
+        return None
+    with open(report_path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=1)
+    return report_path
@@ -0,0 +1,214 @@
+import bpy
+import os
+import time
+from .render import render_material_preview, render_and_save, prepare_preview_render, restore_preview_render
+from .catalog import set_material_preview_with_operator
+from .metrics import set_queue_depth
+
+# Rendered previews can be left for later: the materials are built with their color map as
+# preview, and each one waiting for its render holds this custom property. The to-do list is
+# saved with the .blend, a queue interrupted by closing Blender resumes when the file is opened.
+QUEUED_PREVIEW_KEY = 'generator_queued_preview'
+
+# Seconds between two checks of the queue, a queued render runs as a job between them
+PREVIEW_QUEUE_INTERVAL = 0.5
+
+# Seconds to wait while the user renders
+PREVIEW_QUEUE_BUSY_INTERVAL = 5.0
+
+# Names of the materials the running queue still has to render
+queued_materials = []
+
+# The queued preview being rendered in the background: its material, preview path, what the
+# render changed in the file and its outcome, set by the render handlers
+active_render = {}
+
+
+def queue_preview_render(mat, preview_path):
+    """
+    Adds a material to the previews to render later, to the given preview file.
+    """
+    mat[QUEUED_PREVIEW_KEY] = {'path': preview_path, 'queued': time.time()}
+
+
+def clear_queued_preview(mat):
+    """
+    Removes a material from the previews to render, once it has its final preview.
+    """
+    if QUEUED_PREVIEW_KEY in mat:
+        del mat[QUEUED_PREVIEW_KEY]
+
+
+def get_queued_previews():
+    """
+    Returns the names of the materials of the file waiting for their rendered preview.
+    """
+    return sorted(mat.name for mat in bpy.data.materials if QUEUED_PREVIEW_KEY in mat)
+
+
+def needs_preview_render(mat):
+    # A preview rendered after it was queued, but whose file was closed unsaved, only needs to be applied again
+    entry = mat[QUEUED_PREVIEW_KEY]
+    return not os.path.exists(entry['path']) or os.path.getmtime(entry['path']) < entry['queued']
+
+
+def apply_queued_preview(mat):
+    # Applies the rendered preview of a queued material and removes it from the queue
+    set_material_preview_with_operator(bpy.context, mat, mat[QUEUED_PREVIEW_KEY]['path'])
+    clear_queued_preview(mat)
+
+
+def render_queued_preview(mat):
+    """
+    Renders the preview of a queued material, applies it and removes the material from the queue.
+    """
+    if needs_preview_render(mat):
+        render_material_preview(mat, mat[QUEUED_PREVIEW_KEY]['path'])
+    apply_queued_preview(mat)
+
+
+def on_preview_render_complete(scene, *args):
+    if active_render:
+        active_render['outcome'] = 'complete'
+
+
+def on_preview_render_cancel(scene, *args):
+    if active_render:
+        active_render['outcome'] = 'cancelled'
+
+
+def start_queued_preview_render(mat):
+    """
+    Starts rendering the preview of a queued material as a render job, which doesn't block the
+    interface. The render goes to no window, the user's render display is given back when it ends.
+    """
+    props = bpy.context.scene.catalog_generator
+    preview_path = mat[QUEUED_PREVIEW_KEY]['path']
+    preferences = bpy.context.preferences.view
+    state = prepare_preview_render(mat)
+    active_render.update(material=mat.name, state=state, display_type=preferences.render_display_type, outcome=None)
+    bpy.app.handlers.render_complete.append(on_preview_render_complete)
+    bpy.app.handlers.render_cancel.append(on_preview_render_cancel)
+    try:
+        preferences.render_display_type = 'NONE'
+        # Timers run without a window, the render operator needs one to start a job
+        with bpy.context.temp_override(window=bpy.context.window_manager.windows[0]):
+            render_and_save(os.path.dirname(preview_path), os.path.splitext(os.path.basename(preview_path))[0], props.resolution_x, props.resolution_y, state['scene'], invoke=True)
+    except Exception:
+        finish_queued_preview_render()
+        raise
+
+
+def finish_queued_preview_render():
+    """
+    Gives back what the render of a queued preview changed, once its job is over, and applies
+    the preview if it rendered.
+
+    Returns:
+    - str: 'complete', 'cancelled', or None if the render didn't run.
+    """
+    render = dict(active_render)
+    active_render.clear()
+    bpy.app.handlers.render_complete.remove(on_preview_render_complete)
+    bpy.app.handlers.render_cancel.remove(on_preview_render_cancel)
+    bpy.context.preferences.view.render_display_type = render['display_type']
+    restore_preview_render(render['state'])
+    mat = bpy.data.materials.get(render['material'])
+    if render['outcome'] == 'complete' and mat is not None and QUEUED_PREVIEW_KEY in mat:
+        apply_queued_preview(mat)
+    return render['outcome']
+
+
+def process_preview_queue():
+    """
+    Timer callback starting the render of one queued preview per call, as a job running in the
+    background of the interface, and applying it once the job is over.
+
+    Returns:
+    - float: Seconds until the next call, or None once the queue is empty, which stops the timer.
+    """
+    # Waits while a render is running, the queued one or one started by the user
+    if bpy.app.is_job_running('RENDER'):
+        return PREVIEW_QUEUE_INTERVAL if active_render else PREVIEW_QUEUE_BUSY_INTERVAL
+    if active_render:
+        try:
+            outcome = finish_queued_preview_render()
+        except Exception as e:
+            print(f"Failed to apply the rendered preview: {e!r}")
+            outcome = None
+        # A render cancelled by the user stops the queue, the remaining previews stay queued in the file
+        if outcome == 'cancelled':
+            queued_materials.clear()
+    set_queue_depth('previews', len(queued_materials))
+    while queued_materials:
+        mat = bpy.data.materials.get(queued_materials.pop(0))
+        if mat is None or QUEUED_PREVIEW_KEY not in mat:
+            continue
+        try:
+            if needs_preview_render(mat):
+                start_queued_preview_render(mat)
+            else:
+                apply_queued_preview(mat)
+        except Exception as e:
+            # The material stays queued in the file, the next session tries it again
+            print(f"Failed to render the preview of {mat.name}: {e!r}")
+        return PREVIEW_QUEUE_INTERVAL
+    return None
+
+
+def start_preview_queue():
+    """
+    Starts rendering the queued previews of the file in the background of the interface.
+
+    Returns:
+    - int: The number of previews to render.
+    """
+    queued_materials[:] = get_queued_previews()
+    if queued_materials and not bpy.app.timers.is_registered(process_preview_queue):
+        bpy.app.timers.register(process_preview_queue, first_interval=PREVIEW_QUEUE_INTERVAL)
+    return len(queued_materials)
+
+
+def stop_preview_queue():
+    """
+    Stops the background rendering of the queued previews, they stay queued in the file.
+
+    A preview being rendered is let finish, the timer stops once it gave back the render settings.
+    """
+    queued_materials.clear()
+    if not active_render and bpy.app.timers.is_registered(process_preview_queue):
+        bpy.app.timers.unregister(process_preview_queue)
+
+
+def is_preview_queue_running():
+    """
+    Returns True while queued previews are rendered in the background.
+    """
+    return bpy.app.timers.is_registered(process_preview_queue)
+
+
+def render_all_queued_previews(on_progress=None):
+    """
+    Renders every queued preview of the file at once, for background mode where timers don't run.
+
+    Parameters:
+    - on_progress (callable): Optional, called with the number of previews rendered so far.
+
+    Returns:
+    - int: The number of previews rendered.
+    """
+    rendered = 0
+    names = get_queued_previews()
+    for index, name in enumerate(names):
+        set_queue_depth('previews', len(names) - index)
+        mat = bpy.data.materials[name]
+        try:
+            render_queued_preview(mat)
+        except Exception as e:
+            print(f"Failed to render the preview of {name}: {e!r}")
+            continue
+        rendered += 1
+        if on_progress:
+            on_progress(rendered)
+    set_queue_depth('previews', 0)
+    return rendered
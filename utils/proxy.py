@@ -0,0 +1,190 @@
+import bpy
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from .constants import OCTANE_NODE
+
+PROXY_WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "proxy_worker.py")
+
+# Default proxy folder, next to the library .blend
+PROXY_FOLDER_NAME = "texture_proxies"
+
+
+def parse_proxy_tiers(text):
+    """
+    Parses the proxy tiers setting, a list of longest edges in pixels such as '512 1024 2048'.
+    """
+    return sorted({int(tier) for tier in text.split() if tier.isdigit() and int(tier) > 0})
+
+
+def get_proxy_folder(proxy_folder=""):
+    """
+    Returns the folder where texture proxies are cached, the configured one or the default next to the .blend.
+
+    Raises:
+    - FileNotFoundError: If no folder is configured and the Blender file hasn't been saved.
+    """
+    if proxy_folder:
+        return bpy.path.abspath(proxy_folder)
+    if not bpy.data.filepath:
+        raise FileNotFoundError("Blender file has not been saved. Please save your work or set a proxy folder.")
+    return os.path.join(os.path.dirname(bpy.data.filepath), PROXY_FOLDER_NAME)
+
+
+def get_source_hash(source_path):
+    """
+    Identifies a source texture by its path, size and modification time.
+
+    Cheaper than hashing the content of multi-hundred-megabyte textures, while still
+    invalidating the proxies whenever the source file is replaced or edited.
+    """
+    stat = os.stat(source_path)
+    key = f"{os.path.normcase(os.path.abspath(source_path))}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def get_proxy_path(proxy_folder, source_path, longest_edge, source_hash=None):
+    """
+    Returns where the proxy of a texture for a given longest edge is cached.
+    """
+    source_hash = source_hash or get_source_hash(source_path)
+    extension = os.path.splitext(source_path)[1].lower()
+    return os.path.join(proxy_folder, source_hash[:2], f"{source_hash}_{longest_edge}{extension}")
+
+
+def get_worker_command(job_file):
+    """
+    Returns the command line of a proxy worker process.
+
+    Workers run with this interpreter when it has OpenImageIO, and otherwise as Blender in
+    background mode so that they can scale images with bpy.
+    """
+    try:
+        import OpenImageIO
+        return [sys.executable, PROXY_WORKER_SCRIPT, job_file]
+    except ImportError:
+        return [bpy.app.binary_path, "-b", "--factory-startup", "--python", PROXY_WORKER_SCRIPT, "--", job_file]
+
+
+def run_proxy_batch(batch):
+    # Runs one worker process on a batch of textures, returns True on success
+    fd, job_file = tempfile.mkstemp(prefix="proxy_jobs_", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(batch, file)
+        result = subprocess.run(get_worker_command(job_file), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            print(result.stderr)
+        return result.returncode == 0
+    finally:
+        os.remove(job_file)
+
+
+def generate_proxies(texture_paths, tiers, proxy_folder, max_workers=4, batch_size=16):
+    """
+    Builds the missing proxy tiers of the given textures in a pool of worker processes.
+
+    Proxies are cached by source hash, so textures whose tiers already exist cost a stat.
+    Textures are handed out to the workers in batches to amortise the start of each process.
+
+    Parameters:
+    - texture_paths (iterable): The full resolution textures.
+    - tiers (list): The longest edge, in pixels, of every proxy tier.
+    - proxy_folder (str): The proxy cache folder.
+    - max_workers (int): The number of worker processes running at once.
+    - batch_size (int): The number of textures handled by one worker process.
+
+    Returns:
+    - tuple: (number of textures sent to the workers, number of failed batches).
+    """
+    jobs = []
+    for source_path in sorted(set(texture_paths)):
+        if not os.path.isfile(source_path):
+            continue
+        source_hash = get_source_hash(source_path)
+        targets = [
+            [get_proxy_path(proxy_folder, source_path, tier, source_hash), tier]
+            for tier in tiers
+        ]
+        targets = [target for target in targets if not os.path.exists(target[0])]
+        if targets:
+            jobs.append({'source': source_path, 'targets': targets})
+
+    batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+    # Threads only wait on the worker processes, the scaling itself happens out of process
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(run_proxy_batch, batches))
+    return len(jobs), results.count(False)
+
+
+def get_generated_materials(context, scope):
+    """
+    Returns the materials created by the generator, all of them or the ones on the selected objects.
+    """
+    if scope == 'Selected':
+        materials = {
+            slot.material for obj in context.selected_objects
+            for slot in obj.material_slots if slot.material
+        }
+    else:
+        materials = bpy.data.materials
+    return [mat for mat in materials if mat.get('generator_source_folder') is not None]
+
+
+def get_material_images(materials):
+    """
+    Returns the unique images bound to the image texture nodes of the given materials.
+    """
+    images = {}
+    for mat in materials:
+        if not mat.node_tree:
+            continue
+        for node in mat.node_tree.nodes:
+            if node.bl_idname == OCTANE_NODE['ImageTexture'] and node.image:
+                images[node.image.name] = node.image
+    return list(images.values())
+
+
+def get_full_resolution_path(image):
+    """
+    Returns the full resolution file of an image, remembering it before the image is first switched to a proxy.
+    """
+    if 'generator_full_path' not in image:
+        image['generator_full_path'] = bpy.path.abspath(image.filepath)
+    return image['generator_full_path']
+
+
+def switch_texture_resolution(materials, longest_edge, proxy_folder):
+    """
+    Repoints the images of the given materials to a proxy tier, or back to full resolution.
+
+    Parameters:
+    - materials (list): The materials whose images are switched.
+    - longest_edge (int): The proxy tier to use, or None for full resolution.
+    - proxy_folder (str): The proxy cache folder.
+
+    Returns:
+    - tuple: (number of images switched, number of images without the requested proxy).
+    """
+    switched = 0
+    missing = 0
+    for image in get_material_images(materials):
+        full_path = get_full_resolution_path(image)
+        if longest_edge is None:
+            target = full_path
+        else:
+            try:
+                target = get_proxy_path(proxy_folder, full_path, longest_edge)
+            except OSError:
+                target = None
+            if target is None or not os.path.exists(target):
+                missing += 1
+                continue
+        if image.filepath != target:
+            image.filepath = target
+            switched += 1
+    return switched, missing
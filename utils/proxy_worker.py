@@ -0,0 +1,71 @@
+# Standalone script building downscaled proxies of textures, run in a separate process by proxy.py.
+#
+# It receives a JSON job file listing, for each source texture, the proxy files to write and
+# the size of their longest edge. It uses OpenImageIO when the interpreter running it has it,
+# and otherwise must be run by Blender in background mode to use bpy:
+#   python proxy_worker.py jobs.json
+#   blender -b --factory-startup --python proxy_worker.py -- jobs.json
+#
+# Every finished proxy is written to a temporary name and renamed, so a proxy on disk is always complete.
+
+import os
+import sys
+import json
+
+def scaled_size(width, height, longest_edge):
+    # Keeps the aspect ratio, never upscales
+    scale = min(1.0, longest_edge / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def temporary_path(target):
+    # Keeps the extension last so that both backends pick the output format from it
+    root, ext = os.path.splitext(target)
+    return f"{root}.{os.getpid()}.tmp{ext}"
+
+def build_with_oiio(job):
+    import OpenImageIO as oiio
+    source = oiio.ImageBuf(job['source'])
+    spec = source.spec()
+    for target, longest_edge in job['targets']:
+        width, height = scaled_size(spec.width, spec.height, longest_edge)
+        resized = oiio.ImageBufAlgo.resize(source, roi=oiio.ROI(0, width, 0, height, 0, 1, 0, spec.nchannels))
+        temporary = temporary_path(target)
+        if not resized.write(temporary):
+            raise RuntimeError(resized.geterror())
+        os.replace(temporary, target)
+
+def build_with_bpy(job):
+    import bpy
+    for target, longest_edge in job['targets']:
+        # Reload the source for every tier, scaling is destructive
+        image = bpy.data.images.load(job['source'])
+        width, height = scaled_size(image.size[0], image.size[1], longest_edge)
+        image.scale(width, height)
+        temporary = temporary_path(target)
+        image.filepath_raw = temporary
+        image.save()
+        bpy.data.images.remove(image)
+        os.replace(temporary, target)
+
+def main(argv):
+    with open(argv[0], encoding="utf-8") as file:
+        jobs = json.load(file)
+    try:
+        import OpenImageIO
+        build = build_with_oiio
+    except ImportError:
+        build = build_with_bpy
+
+    failures = 0
+    for job in jobs:
+        try:
+            os.makedirs(os.path.dirname(job['targets'][0][0]), exist_ok=True)
+            build(job)
+        except Exception as e:
+            failures += 1
+            print(f"Proxy failed for {job['source']}: {e}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    arguments = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    sys.exit(main(arguments))
@@ -1,23 +1,87 @@
 import bpy
 import os
 
-def render_and_save(output_dir, output_filename, resolution_x, resolution_y):
+# Render settings of the scene a preview render changes, given back once the preview is rendered
+RENDER_SETTINGS = ('resolution_x', 'resolution_y', 'resolution_percentage', 'filepath')
+
+def render_and_save(output_dir, output_filename, resolution_x, resolution_y, scene=None, invoke=False):
     """
     Renders the current scene to an image and saves it to the specified directory.
 
     This function sets up the render settings according to the provided resolution parameters,
     defines the output path for the rendered image, and executes the render operation. It is
     typically used to create preview images for materials.
+
+    With invoke, the render runs as a job in the background of the interface and this function
+    returns as soon as it started, see bpy.app.handlers.render_complete.
     """
+    scene = scene or bpy.context.scene
 
     # Set the render settings (optional, customize as needed)
-    bpy.context.scene.render.image_settings.file_format = 'PNG'  # Set the image format to JPEG (or another)
-    bpy.context.scene.render.resolution_x = resolution_x
-    bpy.context.scene.render.resolution_y = resolution_y
-    bpy.context.scene.render.resolution_percentage = 100
+    scene.render.image_settings.file_format = 'PNG'  # Set the image format to JPEG (or another)
+    scene.render.resolution_x = resolution_x
+    scene.render.resolution_y = resolution_y
+    scene.render.resolution_percentage = 100
 
     # Define the render output path
-    bpy.context.scene.render.filepath = os.path.join(output_dir, output_filename)
+    scene.render.filepath = os.path.join(output_dir, output_filename)
 
     # Execute render operation
-    bpy.ops.render.render(write_still=True)
\ No newline at end of file
+    if invoke:
+        bpy.ops.render.render('INVOKE_DEFAULT', write_still=True, scene=scene.name)
+    else:
+        bpy.ops.render.render(write_still=True, scene=scene.name)
+
+def prepare_preview_render(mat):
+    """
+    Puts a material on the mock object, to render its preview.
+
+    The scene rendered is the one holding the mock object, not necessarily the open one.
+
+    Returns:
+    - dict: The scene to render, and the material and render settings to give back to the user
+      once the preview is rendered, see restore_preview_render.
+    """
+    props = bpy.context.scene.catalog_generator
+    obj = props.object_mock
+    scene = obj.users_scene[0] if obj.users_scene else bpy.context.scene
+    state = {
+        'scene': scene,
+        'object': obj,
+        'slots': len(obj.data.materials),
+        'material': obj.data.materials[0] if obj.data.materials else None,
+        'file_format': scene.render.image_settings.file_format,
+        'settings': {name: getattr(scene.render, name) for name in RENDER_SETTINGS},
+    }
+    if obj.data.materials:
+        obj.data.materials[0] = mat
+    else:
+        obj.data.materials.append(mat)
+    return state
+
+def restore_preview_render(state):
+    """
+    Gives back the mock object its material and the scene its render settings, see prepare_preview_render.
+    """
+    obj = state['object']
+    if state['slots']:
+        obj.data.materials[0] = state['material']
+    else:
+        obj.data.materials.pop()
+    render = state['scene'].render
+    render.image_settings.file_format = state['file_format']
+    for name, value in state['settings'].items():
+        setattr(render, name, value)
+
+def render_material_preview(mat, preview_path):
+    """
+    Renders a material on the mock object and saves the image as its preview file.
+
+    The material of the mock object and the render settings are restored afterwards.
+    """
+    props = bpy.context.scene.catalog_generator
+    state = prepare_preview_render(mat)
+    try:
+        render_and_save(os.path.dirname(preview_path), os.path.splitext(os.path.basename(preview_path))[0], props.resolution_x, props.resolution_y, state['scene'])
+    finally:
+        restore_preview_render(state)
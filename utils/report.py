@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import traceback
+from .catalog import get_catalog_file_path
+
+REPORT_FILE_NAME = "library_generator_report.json"
+
+# Number of past runs kept in the report file, used to calibrate time estimates
+REPORT_HISTORY_SIZE = 20
+
+
+def get_report_file_path():
+    """
+    Returns the path of the run report, next to the catalog file of the current .blend.
+
+    Raises:
+    - FileNotFoundError: If the Blender file hasn't been saved.
+    """
+    return get_catalog_file_path().parent / REPORT_FILE_NAME
+
+
+def start_run_report(folder_path, settings, roots=None):
+    """
+    Creates the report of a generator run.
+
+    A run over several library roots gets the first one as folder, and a summary per root, see summarize_roots.
+    """
+    return {
+        'folder': folder_path,
+        'preview_type': settings['preview_type'],
+        'started': time.time(),
+        'seconds': 0.0,
+        'materials': 0,
+        'textures': 0,
+        'nodes': 0,
+        'folders': [],
+        'errors': [],
+        'failed_folders': [],
+        'invalid_textures': [],
+        'roots': [{'folder': root['folder'], 'catalog_prefix': root['catalog_prefix'], 'overrides': root['overrides']} for root in roots or []],
+    }
+
+
+def record_folder(report, folder_path, seconds, materials, root=None):
+    """
+    Records the time spent on one material folder, the materials it produced and their node count.
+
+    The library root of the folder is recorded when given, for the summary of each root.
+    """
+    textures = 0
+    nodes = 0
+    for mat in materials:
+        plan = json.loads(mat.get('generator_plan', '{"sockets": []}'))
+        textures += sum(len(socket['paths']) for socket in plan['sockets'])
+        nodes += len(mat.node_tree.nodes) if mat.node_tree else 0
+    entry = {'folder': folder_path, 'seconds': seconds, 'materials': len(materials), 'textures': textures, 'nodes': nodes}
+    if root is not None:
+        entry['root'] = root
+    report['folders'].append(entry)
+    report['materials'] += len(materials)
+    report['textures'] += textures
+    report['nodes'] += nodes
+
+
+def record_error(report, folder_path, exception, attempt=1, root=None):
+    """
+    Records a folder that failed, with the exception and its traceback.
+
+    Must be called from the except block handling the exception.
+    """
+    error = {
+        'folder': folder_path,
+        'attempt': attempt,
+        'error': type(exception).__name__,
+        'message': str(exception),
+        'traceback': traceback.format_exc(),
+    }
+    if root is not None:
+        error['root'] = root
+    report['errors'].append(error)
+
+
+def record_invalid_textures(report, problems):
+    """
+    Records the textures the validation excluded from the run, with the problem found with each.
+    """
+    report['invalid_textures'] = [{'path': path, 'problem': problem} for path, problem in sorted(problems.items())]
+
+
+def summarize_roots(report):
+    """
+    Adds up the folders, materials, textures, nodes, seconds and failures of each library root of a run.
+    """
+    failed_folders = set(report['failed_folders'])
+    for summary in report['roots']:
+        folders = [folder for folder in report['folders'] if folder.get('root') == summary['folder']]
+        errors = [error for error in report['errors'] if error.get('root') == summary['folder']]
+        summary['folders'] = len(folders)
+        for key in ('seconds', 'materials', 'textures', 'nodes'):
+            summary[key] = sum(folder[key] for folder in folders)
+        summary['errors'] = len(errors)
+        summary['failed_folders'] = sorted({error['folder'] for error in errors} & failed_folders)
+
+
+def load_run_history():
+    """
+    Returns the reports of the previous runs, most recent last. Empty when there is no report file yet.
+    """
+    try:
+        with open(get_report_file_path(), encoding="utf-8") as file:
+            return json.load(file).get('history', [])
+    except (FileNotFoundError, ValueError):
+        return []
+
+
+def save_run_report(report):
+    """
+    Finishes a run report and appends it to the report file, keeping the last runs as history.
+
+    Only the totals of the previous runs are kept, the per-folder details and errors of the latest one.
+    """
+    report['seconds'] = time.time() - report['started']
+    try:
+        report_file = get_report_file_path()
+    except FileNotFoundError as e:
+        print(e)
+        return
+
+    details = ('folders', 'errors', 'failed_folders', 'invalid_textures', 'roots')
+    history = load_run_history()
+    history.append({key: value for key, value in report.items() if key not in details})
+    history[-1]['failed'] = len(report['failed_folders'])
+    # Several processes can finish a run at once, each writes its own temporary file
+    temp_path = f"{report_file}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump({'last_run': report, 'history': history[-REPORT_HISTORY_SIZE:]}, file, indent=1)
+    os.replace(temp_path, report_file)
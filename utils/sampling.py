@@ -0,0 +1,195 @@
+import bpy
+import os
+import re
+import json
+import time
+import random
+import tempfile
+from collections import Counter
+from .filecache import FileMetadataCache
+from .materials import build_folder_plans, create_materials_according_settings, snapshot_datablocks, discard_new_datablocks, invalidate_image_index
+from .parsing import fetch_files_at_path, format_material_name, remove_resolution_token
+from .catalog import get_catalog_file_path
+from .generator import iter_material_folders
+
+SAMPLE_REPORT_FILE_NAME = "library_sample.json"
+
+# The sampled materials are written outside of the library, where the asset browser doesn't look
+SAMPLE_BLEND_NAME = "library_sample.blend"
+
+# Separators texture names are split on, the most used one is the naming style of a folder
+NAME_SEPARATORS = ("_", "-", " ", ".")
+
+TEXTURE_TYPES = ('Transmission', 'Albedo', 'Ambient Occlusion', 'Metallic', 'Specular', 'Roughness', 'Opacity', 'Bump', 'Normal', 'Displacement', 'Emission')
+
+# Number of examples kept per statistic in the report
+SAMPLE_EXAMPLES_COUNT = 10
+
+
+def get_naming_style(files):
+    """
+    Returns the naming style of the textures of a folder: the separator its names use the most,
+    'CamelCase' for names without separator but with inner capitals, 'Plain' otherwise.
+    """
+    stems = [os.path.splitext(os.path.basename(file))[0] for file in files]
+    counts = Counter({separator: sum(stem.count(separator) for stem in stems) for separator in NAME_SEPARATORS})
+    separator, count = counts.most_common(1)[0]
+    if count:
+        return separator
+    if any(re.search(r"[a-z][A-Z]", stem) for stem in stems):
+        return 'CamelCase'
+    return 'Plain'
+
+
+def pick_sample_folders(folder_path, settings, size, seed, file_cache):
+    """
+    Picks a stratified sample of the material folders of a library.
+
+    Folders are grouped by top-level catalog and naming style, and picked from each group in turn,
+    so that small groups are represented as well as large ones. The same seed picks the same folders.
+
+    Returns:
+    - tuple: The sampled (name, path, parent folder), and the number of folders per group.
+    """
+    strata = {}
+    for name, path, root in iter_material_folders(folder_path, file_cache):
+        files = fetch_files_at_path(path, settings['file_types'], file_cache)
+        if not files:
+            continue
+        top_level = os.path.relpath(path, folder_path).replace('\\', '/').split('/')[0] if root is not None else ''
+        strata.setdefault((top_level, get_naming_style(files)), []).append((name, path, root))
+
+    generator = random.Random(seed)
+    queues = []
+    for key in sorted(strata):
+        folders = strata[key][:]
+        generator.shuffle(folders)
+        queues.append(folders)
+
+    sample = []
+    while len(sample) < size and any(queues):
+        for folders in queues:
+            if folders and len(sample) < size:
+                sample.append(folders.pop())
+    return sample, {f"{top_level or '(root)'} [{style}]": len(folders) for (top_level, style), folders in strata.items()}
+
+
+def classify_sample_folder(name, path, keys, settings, file_cache):
+    """
+    Classifies the textures of a sampled folder and collects what a tuning session looks at.
+
+    The candidates are classified once more with every texture kept (all albedos, all
+    resolutions), to tell unmatched files and alternative albedos from textures dropped on purpose.
+    """
+    plans = build_folder_plans(name, keys, settings, path, file_cache)
+    candidate_settings = dict(settings, resolution_priority='FileType', alt_col_handling='NewNode')
+    candidates = build_folder_plans(name, keys, candidate_settings, path, file_cache)
+
+    matched = {texture for plan in candidates for socket in plan['sockets'] for texture in socket['paths']}
+    files = [os.path.join(path, file) for file in fetch_files_at_path(path, settings['file_types'], file_cache)]
+    albedo_names = {
+        remove_resolution_token(os.path.basename(texture))
+        for plan in candidates for socket in plan['sockets'] if socket['type'] == 'Albedo' for texture in socket['paths']
+    }
+    return {
+        'folder': path,
+        'materials': len(plans),
+        'unmatched_files': [file for file in files if file not in matched],
+        'empty_sockets': [[texture_type for texture_type in TEXTURE_TYPES if texture_type not in {socket['type'] for socket in plan['sockets']}] for plan in plans],
+        'albedos': len(albedo_names),
+    }
+
+
+def run_sample_build(folder_path, keys, settings, size=50, seed=0, build=True):
+    """
+    Classifies, and builds, a stratified sample of the library to tune the naming conventions and settings.
+
+    The sampled materials are built without previews or assets, written to a temporary .blend
+    and removed from the current file. Folders that fail to build are reported with their error.
+
+    Returns:
+    - dict: The sample, its classification statistics, the build errors and the path of the sample .blend.
+    """
+    start = time.perf_counter()
+    invalidate_image_index()
+    with FileMetadataCache() as file_cache:
+        sample, strata = pick_sample_folders(folder_path, settings, size, seed, file_cache)
+        folders = [classify_sample_folder(name, path, keys, settings, file_cache) for name, path, _ in sample]
+
+        materials = []
+        errors = []
+        snapshot = snapshot_datablocks()
+        if build:
+            for name, path, _ in sample:
+                try:
+                    data_array = create_materials_according_settings(format_material_name(name), keys, settings, path, None, file_cache)
+                except Exception as e:
+                    errors.append({'folder': path, 'error': type(e).__name__, 'message': str(e)})
+                    continue
+                materials += [data['material'] for data in data_array if data['material']]
+
+    sample_path = None
+    if materials:
+        sample_path = os.path.join(tempfile.gettempdir(), SAMPLE_BLEND_NAME)
+        bpy.data.libraries.write(sample_path, set(materials), path_remap='ABSOLUTE', fake_user=True)
+    # The library only gets materials from real builds
+    discard_new_datablocks(snapshot)
+
+    empty_sockets = Counter(texture_type for folder in folders for plan_sockets in folder['empty_sockets'] for texture_type in plan_sockets)
+    unmatched_folders = [folder for folder in folders if folder['unmatched_files']]
+    multi_albedo_folders = [folder for folder in folders if folder['albedos'] > 1]
+    return {
+        'folder': folder_path,
+        'seed': seed,
+        'seconds': time.perf_counter() - start,
+        'strata': strata,
+        'sampled_folders': len(folders),
+        'library_folders': sum(strata.values()),
+        'materials': sum(folder['materials'] for folder in folders),
+        'empty_folders': [folder['folder'] for folder in folders if not folder['materials']],
+        'unmatched_files': sum(len(folder['unmatched_files']) for folder in folders),
+        'unmatched_examples': [file for folder in unmatched_folders for file in folder['unmatched_files']][:SAMPLE_EXAMPLES_COUNT],
+        'empty_sockets': dict(empty_sockets),
+        'multi_albedo_folders': [folder['folder'] for folder in multi_albedo_folders],
+        'errors': errors,
+        'sample_blend': sample_path,
+    }
+
+
+def print_sample_report(report):
+    """
+    Prints a readable summary of a sample build report to the console.
+    """
+    print(f"Sample of {report['folder']} (seed {report['seed']}, {report['seconds']:.1f} s)")
+    print(f"  {report['sampled_folders']} of {report['library_folders']} folders, {report['materials']} materials")
+    print("  Strata:")
+    for stratum, count in sorted(report['strata'].items()):
+        print(f"    {stratum}: {count} folders")
+    print(f"  {report['unmatched_files']} unmatched files")
+    for file in report['unmatched_examples']:
+        print(f"    {file}")
+    print(f"  {len(report['empty_folders'])} folders without any material")
+    print(f"  {len(report['multi_albedo_folders'])} folders with several albedos")
+    for folder in report['multi_albedo_folders'][:SAMPLE_EXAMPLES_COUNT]:
+        print(f"    {folder}")
+    print("  Materials without:")
+    for texture_type in TEXTURE_TYPES:
+        if texture_type in report['empty_sockets']:
+            print(f"    {texture_type}: {report['empty_sockets'][texture_type]}")
+    for error in report['errors']:
+        print(f"  Failed {error['folder']}: {error['error']}: {error['message']}")
+    if report['sample_blend']:
+        print(f"  Sampled materials written to {report['sample_blend']}")
+
+
+def save_sample_report(report):
+    """
+    Writes a sample build report next to the current .blend and returns its path, or None for an unsaved file.
+    """
+    try:
+        report_path = get_catalog_file_path().parent / SAMPLE_REPORT_FILE_NAME
+    except FileNotFoundError:
+        return None
+    with open(report_path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=1)
+    return report_path
@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import sqlite3
+from .imageinfo import read_image_header
+
+INDEX_FILE_NAME = "library_index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS materials (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    source_folder TEXT NOT NULL,
+    variant INTEGER NOT NULL,
+    catalog_path TEXT,
+    tags TEXT,
+    fingerprint TEXT,
+    updated REAL,
+    UNIQUE (source_folder, variant)
+);
+CREATE TABLE IF NOT EXISTS maps (
+    material_id INTEGER NOT NULL REFERENCES materials (id) ON DELETE CASCADE,
+    socket TEXT NOT NULL,
+    texture_path TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER
+);
+CREATE INDEX IF NOT EXISTS maps_material ON maps (material_id);
+CREATE INDEX IF NOT EXISTS maps_texture ON maps (texture_path);
+CREATE INDEX IF NOT EXISTS materials_name ON materials (name);
+CREATE TABLE IF NOT EXISTS coverage (
+    library TEXT PRIMARY KEY
+);
+"""
+
+
+def open_search_index(index_path):
+    """
+    Opens (and creates if needed) the SQLite search index of a library.
+
+    The index holds one row per generated material with its source folder, catalog path
+    and tags, the texture bound to each socket with its dimensions, and a full-text table
+    on names, tags and catalog paths. Falls back to plain LIKE searches when the SQLite
+    build has no FTS5.
+
+    Parameters:
+    - index_path (str or pathlib.Path): The path of the index file.
+
+    Returns:
+    - sqlite3.Connection: The open index.
+    """
+    conn = sqlite3.connect(str(index_path), timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS materials_fts USING fts5(name, tags, catalog_path)")
+    except sqlite3.OperationalError:
+        pass
+    conn.commit()
+    return conn
+
+
+def has_full_text_search(conn):
+    """
+    Returns True if the index has its FTS5 table.
+    """
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'materials_fts'").fetchone() is not None
+
+
+def get_texture_dimensions(texture_path, dimension_cache=None):
+    """
+    Returns the (width, height) of a texture from its header, or (None, None) if it can't be read.
+
+    Dimensions are memoised in the given dictionary, textures shared by several materials are probed once.
+    """
+    if dimension_cache is not None and texture_path in dimension_cache:
+        return dimension_cache[texture_path]
+    try:
+        info = read_image_header(texture_path)
+    except (OSError, ValueError):
+        info = None
+    dimensions = (info['width'], info['height']) if info else (None, None)
+    if dimension_cache is not None:
+        dimension_cache[texture_path] = dimensions
+    return dimensions
+
+
+def index_material(conn, mat, catalog_path, tags, dimension_cache=None):
+    """
+    Records a generated material in the search index.
+
+    The update is incremental: a material whose fingerprint, name, catalog path and tags
+    didn't change since the last run costs a single lookup, and its texture rows are only
+    rewritten when its plan changed.
+
+    Parameters:
+    - conn (sqlite3.Connection): The open index.
+    - mat (bpy.types.Material): A material created by the generator.
+    - catalog_path (str): The catalog path of the material, or None.
+    - tags (list): The tags of the material.
+    - dimension_cache (dict): Optional memo of texture dimensions for the run.
+
+    Returns:
+    - bool: True if the index was modified.
+    """
+    source_folder = mat.get('generator_source_folder')
+    if source_folder is None:
+        return False
+    variant = mat.get('generator_variant', 0)
+    fingerprint = mat.get('generator_plan_fingerprint')
+    tags_text = ", ".join(tags)
+
+    row = conn.execute(
+        "SELECT id, name, catalog_path, tags, fingerprint FROM materials WHERE source_folder = ? AND variant = ?",
+        (source_folder, variant)
+    ).fetchone()
+    if row and (row['name'], row['catalog_path'], row['tags'], row['fingerprint']) == (mat.name, catalog_path, tags_text, fingerprint):
+        return False
+
+    if row:
+        material_id = row['id']
+        conn.execute(
+            "UPDATE materials SET name = ?, catalog_path = ?, tags = ?, fingerprint = ?, updated = ? WHERE id = ?",
+            (mat.name, catalog_path, tags_text, fingerprint, time.time(), material_id)
+        )
+    else:
+        material_id = conn.execute(
+            "INSERT INTO materials (name, source_folder, variant, catalog_path, tags, fingerprint, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (mat.name, source_folder, variant, catalog_path, tags_text, fingerprint, time.time())
+        ).lastrowid
+
+    # Texture rows only change with the plan
+    if not row or row['fingerprint'] != fingerprint:
+        conn.execute("DELETE FROM maps WHERE material_id = ?", (material_id,))
+        plan = json.loads(mat.get('generator_plan', '{"sockets": []}'))
+        for socket in plan['sockets']:
+            for texture_path in socket['paths']:
+                width, height = get_texture_dimensions(texture_path, dimension_cache)
+                conn.execute(
+                    "INSERT INTO maps (material_id, socket, texture_path, width, height) VALUES (?, ?, ?, ?, ?)",
+                    (material_id, socket['type'], texture_path, width, height)
+                )
+
+    if has_full_text_search(conn):
+        conn.execute("DELETE FROM materials_fts WHERE rowid = ?", (material_id,))
+        conn.execute(
+            "INSERT INTO materials_fts (rowid, name, tags, catalog_path) VALUES (?, ?, ?, ?)",
+            (material_id, mat.name, tags_text, catalog_path or "")
+        )
+    return True
+
+
+def find_source_folder_materials(conn, source_folder):
+    """
+    Returns the names of the materials indexed for a source folder and its texture sets, by
+    (source folder, variant). The texture sets of a flat folder are indexed as its direct children.
+    """
+    prefix = os.path.join(source_folder, '')
+    rows = conn.execute(
+        "SELECT source_folder, variant, name FROM materials WHERE source_folder = ? "
+        "OR (substr(source_folder, 1, ?) = ? AND instr(substr(source_folder, ?), ?) = 0)",
+        (source_folder, len(prefix), prefix, len(prefix) + 1, os.sep)
+    )
+    return {(row['source_folder'], row['variant']): row['name'] for row in rows}
+
+
+def is_library_covered(conn, library):
+    """
+    Returns True if every material generated from a library is in the index, see set_library_coverage.
+
+    A library is covered once it was fully generated with the index enabled, so that a folder
+    without rows has no materials.
+    """
+    return conn.execute("SELECT 1 FROM coverage WHERE library = ?", (library,)).fetchone() is not None
+
+
+def set_library_coverage(conn, library, covered):
+    """
+    Records whether every material generated from a library is in the index.
+
+    Set by a full run of the library with the index enabled, and cleared by runs generating it
+    without the index.
+    """
+    if covered:
+        conn.execute("INSERT OR IGNORE INTO coverage (library) VALUES (?)", (library,))
+    else:
+        conn.execute("DELETE FROM coverage WHERE library = ?", (library,))
+
+
+def remove_source_folders(conn, source_folders):
+    """
+    Removes from the index the materials built from the given source folders.
+    """
+    fts = has_full_text_search(conn)
+    for source_folder in source_folders:
+        for row in conn.execute("SELECT id FROM materials WHERE source_folder = ?", (source_folder,)).fetchall():
+            conn.execute("DELETE FROM maps WHERE material_id = ?", (row['id'],))
+            if fts:
+                conn.execute("DELETE FROM materials_fts WHERE rowid = ?", (row['id'],))
+        conn.execute("DELETE FROM materials WHERE source_folder = ?", (source_folder,))
+
+
+def parse_search_query(query):
+    """
+    Splits a search query into its free text and its filters.
+
+    'texture:<text>' keeps materials using a texture whose path contains the text,
+    'missing:<socket>' keeps materials without a texture on that socket (e.g. missing:Normal)
+    and 'socket:<socket>' keeps materials with one, underscores standing for spaces in socket
+    names (missing:Ambient_Occlusion). Everything else is searched in names, tags and catalog paths.
+    """
+    terms = []
+    filters = {'texture': [], 'missing': [], 'socket': []}
+    for token in query.split():
+        key, separator, value = token.partition(":")
+        if separator and key.lower() in filters and value:
+            filters[key.lower()].append(value if key.lower() == 'texture' else value.replace('_', ' '))
+        else:
+            terms.append(token)
+    return terms, filters
+
+
+def search_materials(conn, query, limit=200):
+    """
+    Searches the index, see parse_search_query for the query syntax.
+
+    Returns:
+    - list: One dict per material with its name, source folder, catalog path and tags.
+    """
+    terms, filters = parse_search_query(query)
+    clauses = []
+    parameters = []
+
+    if terms:
+        if has_full_text_search(conn):
+            # Every term must match, as a prefix, in the name, tags or catalog path
+            clauses.append("m.id IN (SELECT rowid FROM materials_fts WHERE materials_fts MATCH ?)")
+            parameters.append(" ".join('"' + term.replace('"', '""') + '"*' for term in terms))
+        else:
+            for term in terms:
+                clauses.append("(m.name LIKE ? OR m.tags LIKE ? OR m.catalog_path LIKE ?)")
+                parameters += ['%' + term + '%'] * 3
+
+    for texture in filters['texture']:
+        clauses.append("m.id IN (SELECT material_id FROM maps WHERE texture_path LIKE ?)")
+        parameters.append('%' + texture + '%')
+    for socket in filters['socket']:
+        clauses.append("m.id IN (SELECT material_id FROM maps WHERE socket = ? COLLATE NOCASE)")
+        parameters.append(socket)
+    for socket in filters['missing']:
+        clauses.append("m.id NOT IN (SELECT material_id FROM maps WHERE socket = ? COLLATE NOCASE)")
+        parameters.append(socket)
+
+    sql = "SELECT m.name, m.source_folder, m.catalog_path, m.tags FROM materials m"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY m.name LIMIT ?"
+    parameters.append(limit)
+    return [dict(row) for row in conn.execute(sql, parameters)]
@@ -0,0 +1,70 @@
+import bpy
+from functools import lru_cache
+from .constants import OCTANE_NODE, NODE_SOCKETS
+
+
+@lru_cache(maxsize=None)
+def get_socket_schema():
+    """
+    Resolves the sockets of every node type the generator builds into socket indices.
+
+    Done once per session on a temporary material, so that building thousands of materials
+    doesn't search sockets by name, and so that a node or socket renamed by an Octane update
+    is reported before anything is built.
+
+    Returns:
+    - dict: Node type (bl_idname) to a ({input name: index}, {output name: index}) tuple.
+
+    Raises:
+    - RuntimeError: If a node type or one of the sockets in NODE_SOCKETS is missing from the installed Octane build.
+    """
+    mat = bpy.data.materials.new(".generator_socket_schema")
+    mat.use_nodes = True
+    schema = {}
+    problems = []
+    try:
+        for node_key, (input_names, output_names) in NODE_SOCKETS.items():
+            try:
+                node = mat.node_tree.nodes.new(OCTANE_NODE[node_key])
+            except RuntimeError:
+                problems.append(f"node type {OCTANE_NODE[node_key]} is missing")
+                continue
+            # Like a lookup by name, a name used twice resolves to its first socket
+            inputs = {}
+            for index, socket in enumerate(node.inputs):
+                inputs.setdefault(socket.name, index)
+            outputs = {}
+            for index, socket in enumerate(node.outputs):
+                outputs.setdefault(socket.name, index)
+            problems += [f"{node.bl_idname} has no input '{name}'" for name in input_names if name not in inputs]
+            problems += [f"{node.bl_idname} has no output '{name}'" for name in output_names if name not in outputs]
+            schema[node.bl_idname] = (inputs, outputs)
+    finally:
+        bpy.data.materials.remove(mat)
+
+    if problems:
+        raise RuntimeError("The installed Octane version isn't supported: " + ", ".join(problems))
+    return schema
+
+
+def get_input(node, name):
+    """
+    Returns an input socket of a node, or None if the node doesn't have it.
+    """
+    sockets = get_socket_schema().get(node.bl_idname)
+    # Group nodes get the sockets of their group, they are looked up by name
+    if sockets is None:
+        return node.inputs.get(name)
+    index = sockets[0].get(name)
+    return node.inputs[index] if index is not None else None
+
+
+def get_output(node, name):
+    """
+    Returns an output socket of a node, or None if the node doesn't have it.
+    """
+    sockets = get_socket_schema().get(node.bl_idname)
+    if sockets is None:
+        return node.outputs.get(name)
+    index = sockets[1].get(name)
+    return node.outputs[index] if index is not None else None
@@ -0,0 +1,296 @@
+import os
+import sys
+import json
+import math
+import struct
+import zipfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from .archives import split_archive_path, get_archive_entry_size, open_texture
+from .imageinfo import read_image_header, read_exactly, read_null_terminated
+from .jobqueue import read_json, write_json_atomically
+
+VALIDATION_WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "texture_validation_worker.py")
+
+VALIDATION_CACHE_FILE_NAME = "texture_validation.json"
+
+# Seconds a worker process gets per texture of its batch before it is considered stalled
+TEXTURE_TIMEOUT = 20.0
+
+# Bits per channel Blender loads for each format
+SUPPORTED_BIT_DEPTHS = {'PNG': {1, 2, 4, 8, 16}, 'JPEG': {8}, 'EXR': {16, 32}, 'TIFF': {1, 8, 16, 32}, 'HDR': {32}}
+
+# Most channels Blender loads for each format, EXR layers can hold any number of channels
+MAX_CHANNELS = {'PNG': 4, 'JPEG': 4, 'TIFF': 4, 'HDR': 3}
+
+# The IEND chunk closing every complete PNG: its length, type and CRC
+PNG_END = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+# Bytes at the end of a JPEG searched for its end of image marker, some writers pad the file
+JPEG_TAIL_SIZE = 1024
+
+# OpenEXR version flags: tiled, deep and multi-part files
+EXR_TILED = 0x200
+EXR_DEEP = 0x800
+EXR_MULTIPART = 0x1000
+
+# TIFF tags locating the image data: strip offsets and byte counts, tile offsets and byte counts
+TIFF_DATA_TAGS = (273, 279, 324, 325)
+
+# Problems of the invalid textures found by the validation of the running generation, left out of the plans it builds
+invalid_textures = {}
+
+
+def get_texture_size(path):
+    # The file size, or the uncompressed size of a file inside an archive
+    if split_archive_path(path) is not None:
+        return get_archive_entry_size(path)
+    return os.path.getsize(path)
+
+
+def validate_texture(path):
+    """
+    Checks that a texture can be loaded, without decoding it.
+
+    The file must be readable, with a complete header, a bit depth and channel count Blender
+    supports, and a size matching the image data its header announces, so that a truncated
+    file is caught before Blender or Octane stall on it. Formats the header reader doesn't
+    recognise (TGA, BMP, WebP...) are left to the loader.
+
+    Returns:
+    - str: The problem found, or None for a valid or unrecognised texture.
+    """
+    try:
+        info = read_image_header(path)
+        if info is None:
+            return None
+        if info['width'] <= 0 or info['height'] <= 0:
+            return f"Empty {info['format']} image"
+        if info['bit_depth'] not in SUPPORTED_BIT_DEPTHS[info['format']]:
+            return f"Unsupported {info['format']} with {info['bit_depth']} bits per channel"
+        max_channels = MAX_CHANNELS.get(info['format'])
+        if info['channels'] < 1 or (max_channels and info['channels'] > max_channels):
+            return f"Unsupported {info['format']} with {info['channels']} channels"
+        size = get_texture_size(path)
+        with open_texture(path) as file:
+            return DATA_CHECKS[info['format']](file, size, info)
+    except ValueError as e:
+        return str(e)
+    except (OSError, zipfile.BadZipFile) as e:
+        return f"Unreadable file: {e}"
+
+
+def check_png_data(file, size, info):
+    # A complete PNG ends with its IEND chunk
+    file.seek(max(size - len(PNG_END), 0))
+    if file.read(len(PNG_END)) != PNG_END:
+        return "Truncated PNG, the file doesn't end with an IEND chunk"
+    return None
+
+
+def check_jpeg_data(file, size, info):
+    # A complete JPEG ends with an end of image marker, which can't occur in its compressed data
+    file.seek(max(size - JPEG_TAIL_SIZE, 0))
+    if b"\xff\xd9" not in file.read(JPEG_TAIL_SIZE):
+        return "Truncated JPEG, the file doesn't end with an end of image marker"
+    return None
+
+
+def check_exr_data(file, size, info):
+    # Only single part flat images are checked, the others are left to the loader
+    version = struct.unpack("<I", read_exactly(file, 8)[4:])[0]
+    if version & (EXR_DEEP | EXR_MULTIPART):
+        return None
+    while read_null_terminated(file):
+        read_null_terminated(file)
+        file.seek(struct.unpack("<i", read_exactly(file, 4))[0], os.SEEK_CUR)
+
+    # The offset table follows the header and ends where the first chunk starts, whatever the line order
+    table_start = file.tell()
+    offsets = []
+    first_chunk = size
+    while file.tell() < first_chunk:
+        offset = struct.unpack("<Q", read_exactly(file, 8))[0]
+        if offset < table_start or offset >= size:
+            return "Truncated EXR, its offset table points past the end of the file"
+        offsets.append(offset)
+        first_chunk = min(first_chunk, offset)
+
+    # The last chunk of the file must be complete: its coordinates, then the size of its data
+    last_chunk = max(offsets)
+    file.seek(last_chunk)
+    coordinates = 16 if version & EXR_TILED else 4
+    data_size = struct.unpack("<i", read_exactly(file, coordinates + 4)[coordinates:])[0]
+    if last_chunk + coordinates + 4 + data_size > size:
+        return "Truncated EXR, its last chunk ends past the end of the file"
+    return None
+
+
+def read_tiff_values(file, order, field_type, count, value):
+    # SHORT or LONG values, stored in the value field when they fit and pointed to otherwise
+    item = {3: "H", 4: "I"}.get(field_type)
+    if item is None:
+        raise ValueError(f"Unexpected TIFF field type {field_type}")
+    data_size = struct.calcsize(item) * count
+    if data_size <= 4:
+        data = value[:data_size]
+    else:
+        file.seek(struct.unpack(order + "I", value)[0])
+        data = read_exactly(file, data_size)
+    return struct.unpack(f"{order}{count}{item}", data)
+
+
+def check_tiff_data(file, size, info):
+    # The strips or tiles of the first image must lie within the file
+    order = "<" if read_exactly(file, 2) == b"II" else ">"
+    read_exactly(file, 2)
+    file.seek(struct.unpack(order + "I", read_exactly(file, 4))[0])
+    entry_count = struct.unpack(order + "H", read_exactly(file, 2))[0]
+    entries = read_exactly(file, entry_count * 12)
+
+    values = {}
+    for index in range(entry_count):
+        tag, field_type, count, value = struct.unpack(order + "HHI4s", entries[index * 12:index * 12 + 12])
+        if tag in TIFF_DATA_TAGS:
+            values[tag] = read_tiff_values(file, order, field_type, count, value)
+
+    offsets = values.get(273) or values.get(324)
+    byte_counts = values.get(279) or values.get(325)
+    if not offsets or not byte_counts or len(offsets) != len(byte_counts):
+        return "TIFF without strip or tile locations"
+    if max(offset + count for offset, count in zip(offsets, byte_counts)) > size:
+        return "Truncated TIFF, its image data ends past the end of the file"
+    return None
+
+
+def check_hdr_data(file, size, info):
+    # Header lines until an empty line, then the resolution line
+    while file.readline(1024).strip():
+        pass
+    file.readline(256)
+    # Run-length encoded scanlines take at least their 4 byte marker and 2 bytes per run of each
+    # channel, the other scanlines at least 4 bytes
+    if 8 <= info['width'] <= 0x7fff:
+        scanline_size = 4 + 4 * 2 * math.ceil(info['width'] / 127)
+    else:
+        scanline_size = 4
+    if size - file.tell() < info['height'] * scanline_size:
+        return "Truncated HDR, the file is too small for its resolution"
+    return None
+
+
+DATA_CHECKS = {'PNG': check_png_data, 'JPEG': check_jpeg_data, 'EXR': check_exr_data, 'TIFF': check_tiff_data, 'HDR': check_hdr_data}
+
+
+def get_texture_stat(path, file_cache):
+    # (size, mtime) a texture is cached by, those of its archive for a file inside an archive, None if missing
+    archive_location = split_archive_path(path)
+    stat_path = archive_location[0] if archive_location else path
+    if not file_cache.exists(stat_path):
+        return None
+    return [file_cache.size(stat_path), file_cache.mtime(stat_path)]
+
+
+def load_validation_cache(cache_path):
+    """
+    Returns the cached validation results, {path: [size, mtime, problem]}, empty when there is no cache yet.
+    """
+    try:
+        return read_json(cache_path)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_validation_cache(cache_path, cache):
+    """
+    Writes the validation results, replaced atomically so that concurrent runs never read it half-written.
+    """
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        write_json_atomically(cache_path, cache)
+    except OSError as e:
+        print(f"Failed to write the texture validation cache {cache_path}: {e}")
+
+
+def run_validation_batch(batch):
+    # Validates a batch of textures in one worker process, which prints a JSON line per texture as
+    # it goes. A worker stalled on a file is killed, that file is reported as stalled and the rest
+    # of the batch goes to a new worker. Returns (problems by path, stalled paths).
+    problems = {}
+    stalled = []
+    while batch:
+        try:
+            result = subprocess.run([sys.executable, VALIDATION_WORKER_SCRIPT], input=json.dumps(batch), capture_output=True, text=True, timeout=TEXTURE_TIMEOUT * len(batch))
+            output = result.stdout
+        except subprocess.TimeoutExpired as e:
+            result = None
+            output = e.stdout.decode("utf-8", "replace") if isinstance(e.stdout, bytes) else e.stdout or ""
+        for line in output.splitlines():
+            try:
+                path, problem = json.loads(line)
+            except ValueError:
+                continue
+            problems[path] = problem
+        batch = [path for path in batch if path not in problems]
+        if result is not None:
+            # A worker that couldn't run leaves its textures unchecked rather than excluded
+            if batch:
+                print(f"Texture validation worker failed: {result.stderr}")
+            break
+        if batch:
+            stalled.append(batch.pop(0))
+    return problems, stalled
+
+
+def validate_textures(paths, cache, file_cache, max_workers=4, batch_size=8):
+    """
+    Validates textures in a pool of worker processes, see validate_texture.
+
+    Results are cached by texture size and modification time, so only new or changed textures
+    are read. Textures are handed out to the workers in batches to amortise the start of each
+    process, and a worker stalled on a file (e.g. on a network share) is killed and replaced.
+
+    Parameters:
+    - paths (iterable): The textures to validate, they can point inside an archive.
+    - cache (dict): The validation cache, see load_validation_cache, updated in place.
+    - file_cache (FileMetadataCache): The metadata cache of the run.
+    - max_workers (int): The number of worker processes running at once.
+    - batch_size (int): The number of textures handled by one worker process.
+
+    Returns:
+    - dict: The problem found with each texture, None for a valid one.
+    """
+    problems = {}
+    jobs = {}
+    for path in sorted(set(paths)):
+        stat = get_texture_stat(path, file_cache)
+        entry = cache.get(path)
+        if stat is None:
+            problems[path] = "File not found"
+        elif entry and entry[:2] == stat:
+            problems[path] = entry[2]
+        else:
+            jobs[path] = stat
+
+    pending = list(jobs)
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    # Threads only wait on the worker processes, the files are read out of process
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for batch_problems, stalled in pool.map(run_validation_batch, batches):
+            for path, problem in batch_problems.items():
+                problems[path] = problem
+                cache[path] = jobs[path] + [problem]
+            # A stall can be a transient state of the share, it isn't cached
+            for path in stalled:
+                problems[path] = f"Reading the file took more than {TEXTURE_TIMEOUT:.0f} seconds"
+    # Textures a failed worker left unchecked are loaded as usual
+    for path in jobs:
+        problems.setdefault(path, None)
+    return problems
+
+
+def get_bound_textures(plans):
+    """
+    Returns the textures the materials of the given plans load: every color map, and the first candidate of the other sockets.
+    """
+    return {path for plan in plans for socket in plan['sockets'] for path in (socket['paths'] if socket['type'] == 'Albedo' else socket['paths'][:1])}
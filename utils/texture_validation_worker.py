@@ -0,0 +1,30 @@
+# Standalone script validating textures in a separate process, run by texture_validation.py.
+#
+# It reads a JSON list of texture paths on its standard input and prints, for each of them, a
+# JSON line [path, problem] with problem null for a valid texture:
+#   python texture_validation_worker.py < textures.json
+#
+# Lines are printed as soon as each texture is checked, so that when the process is killed on a
+# stalled file, the textures already checked aren't checked again.
+
+import os
+import sys
+import json
+import types
+import importlib
+
+def import_texture_validation():
+    # The utils folder is imported as a package of its own, the add-on itself needs Blender
+    utils_dir = os.path.dirname(os.path.abspath(__file__))
+    package = types.ModuleType("generator_utils")
+    package.__path__ = [utils_dir]
+    sys.modules[package.__name__] = package
+    return importlib.import_module(package.__name__ + ".texture_validation")
+
+def main():
+    texture_validation = import_texture_validation()
+    for path in json.load(sys.stdin):
+        print(json.dumps([path, texture_validation.validate_texture(path)]), flush=True)
+
+if __name__ == "__main__":
+    main()
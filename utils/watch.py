@@ -0,0 +1,180 @@
+import os
+import time
+from .filecache import FileMetadataCache
+from .archives import is_archive
+from .metrics import set_queue_depth
+
+try:
+    # Optional: wakes the watcher as soon as something changes instead of at the next poll
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+# Seconds between two polls at least, however many changes inotify reports meanwhile
+MIN_POLL_INTERVAL = 5.0
+
+
+def snapshot_library(folder_path, file_types):
+    """
+    Takes a snapshot of the texture files of every folder of a library.
+
+    Returns:
+    - dict: Folder path to a signature, the sorted (name, size, mtime) of its texture files.
+      Folders without textures are left out, a zip archive is an entry of its own signed by its size and mtime.
+    """
+    snapshot = {}
+    with FileMetadataCache() as file_cache:
+        for root, _, files in file_cache.walk(folder_path):
+            signature = tuple(
+                (name, file_cache.size(os.path.join(root, name)), file_cache.mtime(os.path.join(root, name)))
+                for name in files if name.lower().endswith(file_types)
+            )
+            if signature:
+                snapshot[root] = signature
+            for name in files:
+                if is_archive(name):
+                    archive_path = os.path.join(root, name)
+                    snapshot[archive_path] = ((name, file_cache.size(archive_path), file_cache.mtime(archive_path)),)
+    return snapshot
+
+
+def diff_snapshots(previous, current):
+    """
+    Compares two library snapshots.
+
+    Returns:
+    - tuple: Sets of (added, changed, removed) folders.
+    """
+    added = {folder for folder in current if folder not in previous}
+    removed = {folder for folder in previous if folder not in current}
+    changed = {folder for folder in current if folder in previous and current[folder] != previous[folder]}
+    return added, changed, removed
+
+
+class FolderWatcher:
+    """
+    Detects material folders added, changed or removed under a library folder.
+
+    The library is compared against the snapshot of the previous poll. A folder is only
+    reported once its content has stopped changing for the debounce delay, so packs still
+    being copied aren't ingested half-way. When inotify is available it wakes the watcher
+    early, polling remains the source of truth. The watcher must be closed once done with.
+    """
+
+    def __init__(self, folder_path, file_types, interval=10.0, debounce=30.0):
+        self.folder_path = folder_path
+        self.file_types = file_types
+        self.interval = interval
+        self.debounce = debounce
+        self.snapshot = snapshot_library(folder_path, file_types)
+        self.pending = {}  # folder -> (signature or None when removed, time the signature was first seen)
+        self.last_poll = time.time()
+        self.inotify = None
+        self.watched = {}  # inotify watch descriptor -> folder
+        if inotify_simple is not None:
+            self.inotify = inotify_simple.INotify()
+            self.watch_tree(folder_path)
+
+    def close(self):
+        """
+        Releases the inotify file descriptor.
+        """
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+            self.watched = {}
+
+    def watch_tree(self, top):
+        # Registers an inotify watch on a folder and all its subfolders
+        flags = inotify_simple.flags
+        mask = flags.CREATE | flags.DELETE | flags.MODIFY | flags.CLOSE_WRITE | flags.MOVED_FROM | flags.MOVED_TO
+        for root, _, _ in os.walk(top):
+            try:
+                self.watched[self.inotify.add_watch(root, mask)] = root
+            except OSError:
+                continue
+
+    def handle_events(self, events):
+        # Watches the folders created or moved into the library, forgets the ones removed
+        flags = inotify_simple.flags
+        for event in events:
+            if event.mask & flags.IGNORED:
+                self.watched.pop(event.wd, None)
+            elif event.mask & flags.ISDIR and event.mask & (flags.CREATE | flags.MOVED_TO) and event.wd in self.watched:
+                self.watch_tree(os.path.join(self.watched[event.wd], event.name))
+
+    def wait(self):
+        """
+        Waits until the next poll, or until inotify reports a change.
+
+        The events reported within the minimum interval after the last poll are drained and
+        coalesced into the next one, a large copy doesn't make the watcher poll back to back.
+        """
+        if self.inotify is None:
+            time.sleep(max(self.last_poll + self.interval - time.time(), 0))
+            return
+        deadline = self.last_poll + self.interval
+        self.handle_events(self.inotify.read(timeout=max(int((deadline - time.time()) * 1000), 0)))
+        earliest = self.last_poll + min(MIN_POLL_INTERVAL, self.interval)
+        while time.time() < earliest:
+            self.handle_events(self.inotify.read(timeout=max(int((earliest - time.time()) * 1000), 1)))
+
+    def poll(self):
+        """
+        Takes a new snapshot and returns the folders whose change has settled.
+
+        Returns:
+        - tuple: Sets of (added, changed, removed) folders ready to be processed.
+        """
+        now = time.time()
+        self.last_poll = now
+        current = snapshot_library(self.folder_path, self.file_types)
+
+        added, changed, removed = diff_snapshots(self.snapshot, current)
+        differing = added | changed | removed
+        for folder in differing:
+            signature = current.get(folder)
+            # Any further change restarts the debounce delay of the folder
+            if folder not in self.pending or self.pending[folder][0] != signature:
+                self.pending[folder] = (signature, now)
+        # Folders back to their last processed state have nothing left to do
+        for folder in list(self.pending):
+            if folder not in differing:
+                del self.pending[folder]
+
+        ready_added, ready_changed, ready_removed = set(), set(), set()
+        for folder, (signature, since) in list(self.pending.items()):
+            if now - since < self.debounce:
+                continue
+            del self.pending[folder]
+            if signature is None:
+                if folder in self.snapshot:
+                    ready_removed.add(folder)
+                    del self.snapshot[folder]
+            elif folder in self.snapshot:
+                if self.snapshot[folder] != signature:
+                    ready_changed.add(folder)
+                    self.snapshot[folder] = signature
+            else:
+                ready_added.add(folder)
+                self.snapshot[folder] = signature
+        return ready_added, ready_changed, ready_removed
+
+
+def watch_library(folder_path, file_types, on_change, interval=10.0, debounce=30.0, should_stop=None):
+    """
+    Watches a library and calls on_change(added, changed, removed) with every batch of settled folders.
+
+    Runs until should_stop() returns True, or forever when it isn't given.
+    """
+    watcher = FolderWatcher(folder_path, file_types, interval, debounce)
+    try:
+        while not (should_stop and should_stop()):
+            watcher.wait()
+            added, changed, removed = watcher.poll()
+            # Folders still being copied, waiting for their debounce delay
+            set_queue_depth('watch_pending', len(watcher.pending))
+            if added or changed or removed:
+                on_change(added, changed, removed)
+    finally:
+        watcher.close()